@@ -1,5 +1,6 @@
 # ignore numba warnings
 import warnings
+import importlib
 import importlib.util
 
 import os
@@ -7,13 +8,27 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # Silencia logs do TensorFlow
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Evita conflitos com OneDNN
 os.environ['XLA_FLAGS'] = '--xla_gpu_autotune_level=0'  # Reduz logs do XLA
 
-from sklearn.exceptions import DataConversionWarning
-warnings.filterwarnings("ignore", category=DataConversionWarning)
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 
-from ml_exp.ml_exp import MLExp
+# the public classes are imported on first access, so importing the package (and the console --help) does not load sklearn, scipy or the model backends
+_LAZY_ATTRIBUTES = {
+    "MLExp": "ml_exp.ml_exp",
+    "ScoringWorkerPool": "ml_exp.service.scoring_worker_pool",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
 
 
 spec_numba = importlib.util.find_spec("numba")
@@ -25,6 +40,7 @@ if spec_numba is not None:
 __all__ = [
     "pandas_decorator",
     "MLExp",
+    "ScoringWorkerPool",
     "__version__",
     "compare",
 ]
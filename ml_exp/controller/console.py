@@ -2,8 +2,6 @@
 import argparse
 from typing import Any, List, Optional
 
-from ml_exp.__init__ import MLExp
-
 
 def parse_args(args: Optional[List[Any]] = None) -> argparse.Namespace:
     """Parse the command line arguments for the `ml_exp` binary.
@@ -71,6 +69,9 @@ def main(args: Optional[List[Any]] = None) -> None:
 
     # Parse the arguments
     parsed_args = parse_args(args)
+    # imported after parsing, so --help does not load the experiment dependencies
+    from ml_exp import MLExp
+
     kwargs = vars(parsed_args)
 
     test_data_paths = kwargs["test_data_paths"]
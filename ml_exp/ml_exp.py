@@ -1,17 +1,28 @@
+import warnings
 import pandas as pd
 from datetime import datetime
 from typing import Union
+from concurrent.futures import Executor
 from sklearn.base import BaseEstimator
+from sklearn.exceptions import DataConversionWarning
 from pathlib import Path
 import numpy as np
 
 from ml_exp.repository.pandas_data_file_repository import PandasDataFileRepository
+from ml_exp.repository.prediction_cache_repository import PredictionCacheRepository
+from ml_exp.utils.fingerprint import model_fingerprint
 
-from ml_exp.service.prepare_context_service import PrepareContextService
+from ml_exp.service.prepare_context_service import PrepareContextService, SCORES_REGRESSION
 from ml_exp.service.experimental_pipeline_service import ExperimentalPipelineService
 from ml_exp.service.report_generator_service import ReportGeneratorService
 from ml_exp.service.generate_score_service import GenerateScoreService
 from ml_exp.service.load_test_data_service import LoadTestDataService
+from ml_exp.service.fold_assignment_service import FoldAssignmentService
+from ml_exp.service.sequential_experiment_service import SequentialExperimentService
+from ml_exp.service.racing_experiment_service import RacingExperimentService
+
+# set here instead of in the package __init__, which does not import sklearn
+warnings.filterwarnings("ignore", category=DataConversionWarning)
 
 class MLExp:
 
@@ -22,8 +33,35 @@ class MLExp:
                  report_name: str = None,
                  export_json_data: bool = True,
                  export_html_report: bool = True,
+                 export_scores_data: bool = False,
                  return_best_context: bool = False,
                  random_state: int = 42,
+                 predict_once: bool = True,
+                 onnx_batch_size: int = 1024,
+                 n_jobs: int = 1,
+                 executor: Union[str, Executor] = "thread",
+                 prediction_cache_dir: str = None,
+                 prediction_cache_max_bytes: int = None,
+                 fold_cache_dir: str = None,
+                 lazy_model_loading: bool = False,
+                 max_resident_models: int = None,
+                 max_resident_bytes: int = None,
+                 alpha: float = 0.05,
+                 sequential: bool = False,
+                 sequential_folds_per_check: int = 10,
+                 sequential_min_folds: int = 20,
+                 sequential_patience: int = 2,
+                 racing: bool = False,
+                 racing_min_folds: int = 5,
+                 racing_folds_per_step: int = 1,
+                 baseline_context: str = None,
+                 resampling: str = "kfold",
+                 share_test_data: bool = True,
+                 read_engine: str = "c",
+                 downcast_test_data: bool = False,
+                 read_cache_dir: str = None,
+                 deduplicate_test_data: bool = True,
+                 fold_strategy: str = "sklearn",
                  **kwargs) -> None:
         """It will apply the logic of continuous experimentation to a set of models, using test data, around performance metrics.
 
@@ -33,22 +71,79 @@ class MLExp:
             report_path (str, optional): Folder where all reports to be generated will be stored. A None value will generate in the default /reports folder. Defaults to None.
             report_name (str, optional): Name of the folder that will be generated within the report_path containing all reports related to the given report, separated by timestamp. A value of None will use the default name of general_report. Defaults to None.
             export_json_data (bool, optional): It will save in report_path/report_name inside the timestamp folder the JSON containing all the performance metric values ​​collected before the application of the statistical tests. For each performance metric we will have a json. Defaults to True.
+            export_scores_data (bool, optional): It will save in report_path/report_name inside the timestamp folder the scores.npz file with the metric values of every context and fold for all performance metrics, the size of each fold and the settings of the run. ExperimentalPipelineService.from_scores_file re-runs the statistical tests from it alone. Defaults to False.
             export_html_report (bool, optional): It will generate the HTML report (n report_path/report_name) containing a summary of the results of the statistical tests for all selected performance metrics, as well as the best model around each metric (if any). Defaults to True.
             return_best_context (bool, optional): When the function that activates the pipeline is executed, the best model around the performance metric will be returned to the API. This only works if you define only one performance metric. Defaults to False.
+            random_state (int, optional): Seed used to shuffle the test data before generating the groups. Defaults to 42.
+            predict_once (bool, optional): Runs the inference over the full test data once per context and generates the performance metric of every group from that prediction, instead of one inference per group. The metric values are the same in both modes. Defaults to True.
+            onnx_batch_size (int, optional): Number of rows sent to ONNX models in each inference call. Models exported with a fixed batch dimension use that dimension, padding the last batch. Defaults to 1024.
+            n_jobs (int, optional): Number of contexts scored concurrently. -1 uses all CPUs. The folds are generated before the contexts are dispatched, so the results are the same as in a serial run. Defaults to 1.
+            executor (Union[str, Executor], optional): Pool used to score contexts when n_jobs is not 1. "thread" suits models that release the GIL during inference (ONNX, most sklearn predict) and "process" needs picklable models. An already created Executor can also be given, it is reused and not shut down. A ScoringWorkerPool keeps its worker processes, their imports and the last models they scored across runs, for services that run many small experiments. Defaults to "thread".
+            prediction_cache_dir (str, optional): Folder of a persistent cache with the predictions of each model over each test data, keyed by the hash of the model artifact and the content hash of the test data. Running again after changing one model only runs the inference of that model. None disables the cache. Defaults to None.
+            prediction_cache_max_bytes (int, optional): Maximum size of the prediction cache, the least recently used predictions are evicted beyond it. None keeps every entry. Defaults to None.
+            fold_cache_dir (str, optional): Folder where the fold of each row of every test data is persisted, keyed by the content hash of the test data, n_splits and random_state. The folds are always generated once per test data and shared by its contexts; with this folder later runs also skip generating them. None keeps them only during the run. Defaults to None.
+            lazy_model_loading (bool, optional): Contexts added by path keep only the model path, loading the model right before its scoring and unloading it once its predictions are done, so the memory holds the models being scored instead of all of them. The model type is validated when the model is loaded. Defaults to False.
+            max_resident_models (int, optional): With lazy_model_loading, number of already scored models kept loaded to be reused in later runs. Defaults to None.
+            max_resident_bytes (int, optional): With lazy_model_loading, total size of the model files kept loaded, the least recently used models are unloaded beyond it. Defaults to None.
+            alpha (float, optional): Significance level of the statistical tests. Defaults to 0.05.
+            sequential (bool, optional): Scores the folds in increments and stops once the best context and its significance are the same in sequential_patience consecutive checks, so clear wins need only part of the folds and of the inference. Each check tests at a level given by an O'Brien-Fleming alpha spending function, keeping the overall error rate at alpha. The final decision tests at alpha when every fold was scored, and at the alpha spent up to the stopping check when the run stopped early. Not available for streaming test data. Defaults to False.
+            sequential_folds_per_check (int, optional): With sequential, folds scored between two checks. Defaults to 10.
+            sequential_min_folds (int, optional): With sequential, folds scored before the first check. Defaults to 20.
+            sequential_patience (int, optional): With sequential, number of consecutive checks with the same significant decision needed to stop. Defaults to 2.
+            racing (bool, optional): Races the contexts over the folds (F-Race): after each step a Friedman test with post-hoc comparison against the leader, on the first performance metric, drops the contexts significantly worse from the later folds. Dropped contexts stay in the report with the number of folds they raced. Not available for streaming test data nor together with sequential. Defaults to False.
+            racing_min_folds (int, optional): With racing, folds scored by every context before the first test. Defaults to 5.
+            racing_folds_per_step (int, optional): With racing, folds scored between two tests. Defaults to 1.
+            baseline_context (str, optional): Name of the champion context. Each challenger is compared only against it, k - 1 tests with the multiple comparison correction sized to them instead of every pair, and a challenger is reported as best only if it significantly beats the champion; otherwise the champion is kept. Defaults to None.
+            resampling (str, optional): How the metric values of each context are drawn from its test data. "kfold" splits it in n_splits disjoint groups; "bootstrap" draws n_splits bootstrap replicates (samples of the same size, with replacement) of the whole test data, all scored from a single inference with weighted metrics, so small test data still give many metric values. Streaming test data use the Poisson bootstrap, each row weighted in every replicate as it is read, in a single pass. Defaults to "kfold".
+            share_test_data (bool, optional): When contexts are scored in worker processes ("process" executor or a ScoringWorkerPool), places each numeric test data once in shared memory and lets the workers read it in place, instead of pickling a copy of it for every context. Defaults to True.
+            read_engine (str, optional): Parser of test data given as CSV files, "c" or "pyarrow" (multithreaded). Defaults to "c".
+            downcast_test_data (bool, optional): Stores the columns of test data read from files in the smallest types that keep every value exactly. Defaults to False.
+            read_cache_dir (str, optional): Folder where test data read from text files (.csv, .tsv, .data, .json, .jsonl) are cached as Feather, keyed by file path, size and modification time, so later runs over unchanged files skip the parsing. None disables the cache. Defaults to None.
+            deduplicate_test_data (bool, optional): Test data added under several names from the same file (same path, size and modification time) or with equal frames share one stored frame and one fold assignment. Defaults to True.
+            fold_strategy (str, optional): How the folds of in-memory test data are generated. "sklearn" uses StratifiedKFold (KFold for regression); "fast" assigns the folds in linear time with a seeded shuffle and a round-robin per class, keeping every class balanced across folds, for test data with millions of rows, many classes or many folds. Defaults to "sklearn".
         """
 
         self.__export_json_data = export_json_data
         self.__export_html_report = export_html_report
+        self.__export_scores_data = export_scores_data
         self.__return_best_context = return_best_context
         self.__n_splits = n_splits
         self.__random_state = random_state
+        self.__predict_once = predict_once
+        self.__onnx_batch_size = onnx_batch_size
+        self.__n_jobs = n_jobs
+        self.__executor = executor
+        self.__fold_cache_dir = fold_cache_dir
+        self.__alpha = alpha
+        self.__sequential = sequential
+        self.__sequential_folds_per_check = sequential_folds_per_check
+        self.__sequential_min_folds = sequential_min_folds
+        self.__sequential_patience = sequential_patience
+        self.__racing = racing
+        self.__racing_min_folds = racing_min_folds
+        self.__racing_folds_per_step = racing_folds_per_step
+        self.__baseline_context = baseline_context
+        self.__resampling = resampling
+        self.__share_test_data = share_test_data
+        self.__fold_strategy = fold_strategy
 
         # Repositories
-        self.pandas_data_file_repository = PandasDataFileRepository()
+        self.pandas_data_file_repository = PandasDataFileRepository(engine=read_engine,
+                                                                    downcast=downcast_test_data,
+                                                                    cache_dir=read_cache_dir)
+        self.prediction_cache_repository = (
+            PredictionCacheRepository(cache_dir=prediction_cache_dir, max_bytes=prediction_cache_max_bytes)
+            if prediction_cache_dir
+            else None
+        )
         
         # Services
-        self.load_test_data_service_using_pandas = LoadTestDataService(self.pandas_data_file_repository)
-        self.prepare_context_service = PrepareContextService(scores_target=scores_target)
+        self.load_test_data_service_using_pandas = LoadTestDataService(self.pandas_data_file_repository,
+                                                                       deduplicate=deduplicate_test_data)
+        self.prepare_context_service = PrepareContextService(scores_target=scores_target,
+                                                             lazy_loading=lazy_model_loading,
+                                                             max_resident_models=max_resident_models,
+                                                             max_resident_bytes=max_resident_bytes)
 
         self.scores_target = None
         self.report_base_path = None
@@ -68,6 +163,9 @@ class MLExp:
         if self.__return_best_context and len(self.scores_target) > 1:
             raise ValueError("To find the best model of all, you only need to define one score_target to be evaluated and be the central parameter to define the best model. If you want to generate a report comparing the models around different metrics (score_target), disable the return_best_context parameter.")
 
+        if self.__sequential and self.__racing:
+            raise ValueError("sequential and racing modes can not be used together. Choose one of them.")
+
         # check report_path
         if not report_path:
             report_base_path = "reports"
@@ -97,6 +195,39 @@ class MLExp:
             y_test=y_test
         )
     
+    def add_test_data_many(self, test_data: dict, max_workers: int = None) -> dict:
+        """Add several test data by name, reading their files concurrently on a bounded thread pool. Every test data is tried before the failures are raised together.
+
+        Args:
+            test_data (dict): X_test and y_test pair (DataFrames or string paths to files) by test data name
+            max_workers (int, optional): Number of threads reading files. None uses the ThreadPoolExecutor default. Defaults to None.
+
+        Returns:
+            dict: Seconds spent reading each test data, by name
+        """
+        return self.load_test_data_service_using_pandas.add_test_data_many(test_data=test_data, max_workers=max_workers)
+
+    def add_streaming_test_data(self,
+                                test_data_name: str,
+                                X_test: str,
+                                y_test: str,
+                                chunk_size: int = 100_000):
+        """Add test data larger than memory by name. The files are read chunk by chunk during the run, the folds are assigned on the fly and only per-fold statistics are kept, so the whole data is never loaded.
+        roc_auc and precision_recall are computed from the predicted labels, as in the in-memory scoring.
+
+        Args:
+            test_data_name (str): Name of the test data to be added
+            X_test (str): Path to the file with the model inputs (.csv, .tsv, .data, .jsonl or .parquet)
+            y_test (str): Path to the file with the expected values, with the same rows and order as X_test
+            chunk_size (int, optional): Maximum number of rows read at a time. Defaults to 100_000.
+        """
+        self.load_test_data_service_using_pandas.add_streaming_test_data(
+            test_data_name=test_data_name,
+            X_test=X_test,
+            y_test=y_test,
+            chunk_size=chunk_size
+        )
+
     def add_context(self,
                    context_name: str,
                    model_trained: list[str, BaseEstimator],
@@ -112,23 +243,134 @@ class MLExp:
             ref_data_test=ref_test_data
         )
 
+    def add_contexts_many(self, contexts: dict, max_workers: int = None) -> dict:
+        """Add several contexts by name, loading their models (pickle files, ONNX sessions) concurrently on a bounded thread pool. Every context is tried before the failures are raised together.
+
+        Args:
+            contexts (dict): Pair of trained model (object or path to file) and name of the test data referenced, by context name
+            max_workers (int, optional): Number of threads loading models. None uses the ThreadPoolExecutor default. Defaults to None.
+
+        Returns:
+            dict: Seconds spent loading the model of each context, by name
+        """
+        return self.prepare_context_service.add_contexts_many(contexts=contexts, max_workers=max_workers)
+
+    def invalidate_prediction_cache(self,
+                                    context_name: str = None,
+                                    test_data_name: str = None) -> int:
+        """Removes cached predictions of the model of a context, of a test data, of the pair of both, or the whole cache when none is given
+
+        Args:
+            context_name (str, optional): Name of the context whose model predictions will be removed. Defaults to None.
+            test_data_name (str, optional): Name of the test data whose predictions will be removed. Defaults to None.
+
+        Returns:
+            int: Number of cached predictions removed
+        """
+        if self.prediction_cache_repository is None:
+            raise ValueError("The prediction cache is disabled. Define prediction_cache_dir to use it.")
+
+        model_fp = None
+        if context_name is not None:
+            contexts = self.prepare_context_service.get_contexts()
+            if context_name not in contexts:
+                raise ValueError(f"Context '{context_name}' not found. Please add the context before invalidating its predictions.")
+            model_fp = model_fingerprint(contexts[context_name]["ml_model"], refresh=True)
+            if model_fp is None:
+                return 0
+
+        data_fp = None
+        if test_data_name is not None:
+            data_fp = self.load_test_data_service_using_pandas.get_fingerprint(test_data_name)
+
+        return self.prediction_cache_repository.invalidate(model_fingerprint=model_fp, data_fingerprint=data_fp)
+
     def run(self):
         """Runs the continuous experimentation pipeline and Generates Reports
         """
-        self.scores = GenerateScoreService(
+        if self.__baseline_context is not None and self.__baseline_context not in self.prepare_context_service.get_contexts():
+            raise ValueError(f"baseline_context need to be the name of an added context. Current baseline_context: {self.__baseline_context}")
+
+        data_fingerprints = None
+        if self.prediction_cache_repository is not None or self.__fold_cache_dir:
+            in_memory_test_data = self.load_test_data_service_using_pandas.get_all_test_data()
+            data_fingerprints = {
+                context["test_data_name"]: self.load_test_data_service_using_pandas.get_fingerprint(context["test_data_name"])
+                for context in self.prepare_context_service.get_contexts().values()
+                if context["test_data_name"] in in_memory_test_data
+            }
+
+        generate_score_service = GenerateScoreService(
             experiments=self.prepare_context_service.get_contexts(),
             test_data=self.load_test_data_service_using_pandas.get_all_test_data(),
             scores_target=self.scores_target,
             n_splits=self.__n_splits,
-            random_state=self.__random_state).get_scores_data()
-        
-        exp_pipe = ExperimentalPipelineService(scores_data=self.scores)
+            random_state=self.__random_state,
+            predict_once=self.__predict_once,
+            onnx_batch_size=self.__onnx_batch_size,
+            n_jobs=self.__n_jobs,
+            executor=self.__executor,
+            prediction_cache=self.prediction_cache_repository,
+            data_fingerprints=data_fingerprints,
+            streaming_test_data_service=self.load_test_data_service_using_pandas,
+            fold_assignment_service=FoldAssignmentService(
+                n_splits=self.__n_splits,
+                random_state=self.__random_state,
+                stratified=not all(score in SCORES_REGRESSION for score in self.scores_target),
+                cache_dir=self.__fold_cache_dir,
+                fold_strategy=self.__fold_strategy),
+            prepare_context_service=self.prepare_context_service,
+            defer_scoring=self.__sequential or self.__racing,
+            resampling=self.__resampling,
+            share_test_data=self.__share_test_data)
+
+        alpha = self.__alpha
+        sequential_summary = None
+        if self.__sequential:
+            sequential_experiment = SequentialExperimentService(generate_score_service=generate_score_service,
+                                                                n_splits=self.__n_splits,
+                                                                alpha=self.__alpha,
+                                                                folds_per_check=self.__sequential_folds_per_check,
+                                                                min_folds=self.__sequential_min_folds,
+                                                                patience=self.__sequential_patience,
+                                                                baseline_context=self.__baseline_context)
+            sequential_experiment.run()
+            alpha = sequential_experiment.decision_alpha
+            sequential_summary = (f"Sequential mode {'stopped early' if sequential_experiment.stopped_early else 'finished'} "
+                                  f"after {sequential_experiment.n_folds_scored} of {self.__n_splits} folds, "
+                                  f"last check at significance level {sequential_experiment.alpha_level:.3g}, "
+                                  f"final decision at significance level {alpha:.3g} "
+                                  f"({'alpha spent up to the stopping check' if sequential_experiment.stopped_early else 'full alpha'}).")
+        eliminated_contexts = {}
+        if self.__racing:
+            racing_experiment = RacingExperimentService(generate_score_service=generate_score_service,
+                                                        n_splits=self.__n_splits,
+                                                        alpha=self.__alpha,
+                                                        min_folds=self.__racing_min_folds,
+                                                        folds_per_step=self.__racing_folds_per_step)
+            racing_experiment.run()
+            eliminated_contexts = racing_experiment.eliminated_contexts
+        self.scores = generate_score_service.get_scores_data()
+
+        exp_pipe = ExperimentalPipelineService(scores_data=self.scores, alpha=alpha, baseline_context=self.__baseline_context)
         
         exp_pipe.run_pipeline()
+        exp_pipe.get_general_report().sequential_summary = sequential_summary
+        exp_pipe.get_general_report().eliminated_contexts = eliminated_contexts
 
         if self.__export_json_data:
             exp_pipe.export_json_results(report_path=self.report_base_path)
 
+        if self.__export_scores_data:
+            exp_pipe.export_scores_data(report_path=self.report_base_path,
+                                        fold_sizes=generate_score_service.get_fold_sizes(),
+                                        metadata={"scores_target": self.scores_target,
+                                                  "n_splits": self.__n_splits,
+                                                  "random_state": self.__random_state,
+                                                  "resampling": self.__resampling,
+                                                  "sequential": self.__sequential,
+                                                  "racing": self.__racing})
+
         general_report_generated = exp_pipe.get_general_report()
         
         if self.__export_html_report:
@@ -1,9 +1,8 @@
-from pydantic import BaseModel
+import sys
+from pydantic import BaseModel, field_validator
 from enum import Enum
-from typing import Union
+from typing import Any, Union
 from sklearn.base import BaseEstimator
-import onnxruntime
-import mlflow.pyfunc
 
 
 class ModelTechnology(str, Enum):
@@ -24,9 +23,29 @@ class MLModel(BaseModel):
     """A generic representation of a trained and loaded model
     """
     context_name: str
-    model_object: Union[BaseEstimator, onnxruntime.InferenceSession, mlflow.pyfunc.PyFuncModel]
+    # BaseEstimator, onnxruntime.InferenceSession, mlflow.pyfunc.PyFuncModel or None, checked without importing the backends
+    model_object: Any
     model_technology: ModelTechnology
     model_type: ModelType
+    model_path: Union[str, None] = None
+    model_fingerprint: Union[str, None] = None
+    # cheap version of the artifact the fingerprint was computed for, see fingerprint.model_version
+    fingerprint_version: Any = None
+    lazy: bool = False
 
     class Config:
-        arbitrary_types_allowed = True
\ No newline at end of file
+        arbitrary_types_allowed = True
+
+    @field_validator("model_object")
+    @classmethod
+    def check_model_object(cls, model_object):
+        if model_object is None or isinstance(model_object, BaseEstimator):
+            return model_object
+        # an object of a backend exists only if its module was imported, so sys.modules is enough to check it
+        onnxruntime = sys.modules.get("onnxruntime")
+        if onnxruntime is not None and isinstance(model_object, onnxruntime.InferenceSession):
+            return model_object
+        pyfunc = sys.modules.get("mlflow.pyfunc")
+        if pyfunc is not None and isinstance(model_object, pyfunc.PyFuncModel):
+            return model_object
+        raise ValueError(f"model_object need to be a BaseEstimator, an onnxruntime InferenceSession, a mlflow PyFuncModel or None. Current model_object type: {type(model_object)}")
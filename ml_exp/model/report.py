@@ -53,4 +53,6 @@ class GeneralReport(BaseModel):
     better_context_by_score: list[str] = []
     best_context_index: Union[int, None] = None
     message_about_significancy: list[str] = []
+    sequential_summary: Union[str, None] = None
+    eliminated_contexts: dict[str, int] = {}
     created_at: datetime.datetime = datetime.datetime.now()
\ No newline at end of file
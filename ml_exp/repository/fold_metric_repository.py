@@ -0,0 +1,336 @@
+import numpy as np
+from scipy import sparse
+
+from ml_exp.repository.interfaces.fold_metric_repository import IFoldMetricRepository
+from ml_exp.utils.fold_statistics import SCORES_FROM_CLASS_COUNTS, metric_from_class_counts, check_label_values, check_label_count
+
+
+class FoldMetricRepository(IFoldMetricRepository):
+    """Repository responsible to compute performance metrics for all folds at once, using segment sums over the fold of each row instead of one sklearn call per fold. The results match sklearn metrics up to floating point rounding.
+
+    Label metrics (accuracy, precision, recall, f1, specificity, balanced_accuracy and mcc) are all derived from the same per-fold class counts, collected once per prediction vector.
+
+    Bootstrap replicates are scored by compute_weighted, where each replicate is a row of weights over the test data and every statistic is a product of the weight matrix with a sparse indicator matrix of the rows.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.metrics = {
+            "precision_recall": self.average_precision,
+            "roc_auc": self.roc_auc,
+            "mae": self.mean_absolute_error,
+            "mse": self.mean_squared_error,
+            "r2": self.r2
+        }
+        self.weighted_metrics = {
+            "precision_recall": self.weighted_average_precision,
+            "roc_auc": self.weighted_roc_auc,
+            "mae": self.weighted_mean_absolute_error,
+            "mse": self.weighted_mean_squared_error,
+            "r2": self.weighted_r2
+        }
+
+    def compute(self, score_target: str, y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> np.ndarray:
+        """Computes the performance metric of every fold in a single pass over the predictions
+
+        Args:
+            score_target (str): Performance metric to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            fold_ids (np.ndarray): Fold of each row, between 0 and n_folds - 1
+            n_folds (int): Number of folds
+
+        Raises:
+            ValueError: If the metric is not supported
+
+        Returns:
+            np.ndarray: Metric value of each fold
+        """
+        return self.compute_many([score_target], y_true, y_pred, fold_ids, n_folds)[score_target]
+
+    def compute_many(self, scores_target: list[str], y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> dict:
+        """Computes several performance metrics of every fold, collecting the class counts shared by the label metrics only once
+
+        Args:
+            scores_target (list[str]): Performance metrics to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            fold_ids (np.ndarray): Fold of each row, between 0 and n_folds - 1
+            n_folds (int): Number of folds
+
+        Raises:
+            ValueError: If some metric is not supported
+
+        Returns:
+            dict: Metric value of each fold by performance metric
+        """
+        self._check_supported(scores_target)
+        y_true, y_pred, fold_ids = np.asarray(y_true), np.asarray(y_pred), np.asarray(fold_ids)
+
+        class_counts = None
+        results = {}
+        for score_target in scores_target:
+            if score_target in SCORES_FROM_CLASS_COUNTS:
+                if class_counts is None:
+                    class_counts = self.class_counts(y_true, y_pred, fold_ids, n_folds)
+                results[score_target] = metric_from_class_counts(score_target, *class_counts)
+            else:
+                results[score_target] = self.metrics[score_target](y_true, y_pred, fold_ids, n_folds)
+        return results
+
+    def compute_weighted(self, scores_target: list[str], y_true: np.ndarray, y_pred: np.ndarray, weights: np.ndarray) -> dict:
+        """Computes several performance metrics of every replicate of a weighted resampling (bootstrap), from a single prediction vector. A replicate with integer weights scores the same as the test data with each row repeated as many times as its weight.
+
+        Args:
+            scores_target (list[str]): Performance metrics to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            weights (np.ndarray): Weight of each row in each replicate, with shape (n_replicates, n_rows)
+
+        Raises:
+            ValueError: If some metric is not supported
+
+        Returns:
+            dict: Metric value of each replicate by performance metric
+        """
+        self._check_supported(scores_target)
+        y_true, y_pred, weights = np.asarray(y_true), np.asarray(y_pred), np.asarray(weights, dtype=np.float64)
+
+        class_counts = None
+        results = {}
+        for score_target in scores_target:
+            if score_target in SCORES_FROM_CLASS_COUNTS:
+                if class_counts is None:
+                    class_counts = self.weighted_class_counts(y_true, y_pred, weights)
+                results[score_target] = metric_from_class_counts(score_target, *class_counts)
+            else:
+                results[score_target] = self.weighted_metrics[score_target](y_true, y_pred, weights)
+        return results
+
+    def _check_supported(self, scores_target: list[str]) -> None:
+        for score_target in scores_target:
+            if score_target not in SCORES_FROM_CLASS_COUNTS and score_target not in self.metrics:
+                raise ValueError(f"Metric {score_target} not supported. Only {', '.join(SCORES_FROM_CLASS_COUNTS + list(self.metrics))} are supported.")
+
+    @staticmethod
+    def _weighted_sum(weights: np.ndarray, indicator: sparse.csr_matrix) -> np.ndarray:
+        """Product of the weight matrix (n_replicates, n_rows) with a sparse indicator of the rows (n_rows, n_columns), as a dense matrix"""
+        return np.asarray((indicator.T @ weights.T).T)
+
+    @staticmethod
+    def _indicator(columns: np.ndarray, n_columns: int, rows: np.ndarray = None) -> sparse.csr_matrix:
+        """Sparse matrix with a one in the given column of each selected row"""
+        n_rows = len(columns)
+        rows = np.ones(n_rows, dtype=bool) if rows is None else rows
+        return sparse.csr_matrix((np.ones(rows.sum()), (np.flatnonzero(rows), columns[rows])), shape=(n_rows, n_columns))
+
+    @staticmethod
+    def _fold_sum(values: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> np.ndarray:
+        return np.bincount(fold_ids, weights=values, minlength=n_folds)
+
+    @staticmethod
+    def _labels(y_true: np.ndarray, y_pred: np.ndarray) -> tuple:
+        """Sorted labels of the expected and predicted values and the label index of each value, rejecting continuous values and label sets too large to be counted by fold"""
+        check_label_values(y_true, "Expected values")
+        check_label_values(y_pred, "Predicted values")
+        labels, label_index = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+        check_label_count(len(labels))
+        return labels, label_index
+
+    def class_counts(self, y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> tuple:
+        """Sufficient statistics of the confusion matrix of every fold: its diagonal, row sums and column sums by label, each one a single segment count over the rows
+
+        Returns:
+            tuple: Sorted labels, true positives, expected rows and predicted rows by label, the counts with shape (n_folds, n_labels)
+        """
+        labels, label_index = self._labels(y_true, y_pred)
+        n_labels = len(labels)
+        true_index, pred_index = label_index[:len(y_true)], label_index[len(y_true):]
+        fold_offset = fold_ids.astype(np.int64) * n_labels
+
+        def count_by_label(index, rows=slice(None)):
+            return np.bincount(fold_offset[rows] + index[rows], minlength=n_folds * n_labels).reshape(n_folds, n_labels)
+
+        true_positive = count_by_label(true_index, true_index == pred_index)
+        return labels, true_positive, count_by_label(true_index), count_by_label(pred_index)
+
+    def weighted_class_counts(self, y_true: np.ndarray, y_pred: np.ndarray, weights: np.ndarray) -> tuple:
+        """Weighted sufficient statistics of the confusion matrix of every replicate, the three of them from a single product of the weights with the label indicators
+
+        Returns:
+            tuple: Sorted labels, true positives, expected rows and predicted rows by label, the counts with shape (n_replicates, n_labels)
+        """
+        labels, label_index = self._labels(y_true, y_pred)
+        n_labels = len(labels)
+        true_index, pred_index = label_index[:len(y_true)], label_index[len(y_true):]
+        indicator = sparse.hstack([self._indicator(true_index, n_labels, true_index == pred_index),
+                                   self._indicator(true_index, n_labels),
+                                   self._indicator(pred_index, n_labels)]).tocsr()
+        counts = self._weighted_sum(weights, indicator)
+        return labels, counts[:, :n_labels], counts[:, n_labels:2 * n_labels], counts[:, 2 * n_labels:]
+
+    def weighted_mean_absolute_error(self, y_true, y_pred, weights) -> np.ndarray:
+        """Mean absolute error of each replicate"""
+        return weights @ np.abs(y_pred.astype(np.float64) - y_true) / weights.sum(axis=1)
+
+    def weighted_mean_squared_error(self, y_true, y_pred, weights) -> np.ndarray:
+        """Mean squared error of each replicate"""
+        return weights @ (y_pred.astype(np.float64) - y_true) ** 2 / weights.sum(axis=1)
+
+    def weighted_r2(self, y_true, y_pred, weights) -> np.ndarray:
+        """Coefficient of determination of each replicate, with the same conventions of r2 for constant expected values"""
+        # centered on the overall mean to limit the cancellation of the weighted variance
+        y_true = y_true.astype(np.float64)
+        centered = y_true - y_true.mean()
+        total_weight = weights.sum(axis=1)
+        replicate_mean = weights @ centered / total_weight
+        numerator = weights @ (y_true - y_pred) ** 2
+        denominator = np.maximum(weights @ centered ** 2 - total_weight * replicate_mean ** 2, 0.0)
+
+        result = np.ones(len(weights))
+        valid = denominator != 0
+        result[valid] = 1 - numerator[valid] / denominator[valid]
+        result[~valid & (numerator != 0)] = 0.0
+        return result
+
+    def _weighted_tie_groups(self, y_true: np.ndarray, y_pred: np.ndarray, weights: np.ndarray, is_positive: np.ndarray, descending: bool) -> tuple:
+        """Weight of the positive and negative rows of each group of tied predictions, the groups in increasing (or decreasing) order of prediction"""
+        y_pred = y_pred.astype(np.float64)
+        distinct_pred, group_index = np.unique(y_pred, return_inverse=True)
+        n_groups = len(distinct_pred)
+        if descending:
+            group_index = n_groups - 1 - group_index
+        indicator = sparse.hstack([self._indicator(group_index, n_groups, is_positive),
+                                   self._indicator(group_index, n_groups, ~is_positive)]).tocsr()
+        group_weights = self._weighted_sum(weights, indicator)
+        return group_weights[:, :n_groups], group_weights[:, n_groups:]
+
+    def weighted_roc_auc(self, y_true, y_pred, weights) -> np.ndarray:
+        """Area under the ROC curve of each replicate: the weighted share of positive-negative pairs ranked in order, tied pairs counting half. Replicates with a single class return nan.
+
+        Raises:
+            ValueError: If the expected values have more than two classes
+        """
+        classes = np.unique(y_true)
+        if len(classes) > 2:
+            raise ValueError(f"roc_auc is supported only for binary targets. Classes found: {classes.tolist()}")
+        positive, negative = self._weighted_tie_groups(y_true, y_pred, weights, y_true == classes[-1], descending=False)
+        negative_below = np.cumsum(negative, axis=1) - negative
+        n_positive, n_negative = positive.sum(axis=1), negative.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = (positive * (negative_below + 0.5 * negative)).sum(axis=1) / (n_positive * n_negative)
+        result[(n_positive == 0) | (n_negative == 0)] = np.nan
+        return result
+
+    def weighted_average_precision(self, y_true, y_pred, weights, pos_label=1) -> np.ndarray:
+        """Average precision of each replicate, with decreasing thresholds over the distinct predictions. Replicates without positive rows score 0.0.
+
+        Raises:
+            ValueError: If pos_label is not one of the expected values
+        """
+        classes = np.unique(y_true)
+        if pos_label not in classes and len(classes) > 1:
+            raise ValueError(f"pos_label={pos_label} is not a valid label. It should be one of {classes.tolist()}")
+        group_tp, group_fp = self._weighted_tie_groups(y_true, y_pred, weights, y_true == pos_label, descending=True)
+        tp, fp = np.cumsum(group_tp, axis=1), np.cumsum(group_fp, axis=1)
+        precision = np.zeros_like(tp)
+        np.divide(tp, tp + fp, out=precision, where=(tp + fp) > 0)
+        n_positive = group_tp.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = (group_tp * precision).sum(axis=1) / n_positive
+        result[n_positive == 0] = 0.0
+        return result
+
+    def mean_absolute_error(self, y_true, y_pred, fold_ids, n_folds) -> np.ndarray:
+        """Mean absolute error of each fold"""
+        error = np.abs(y_pred.astype(np.float64) - y_true)
+        return self._fold_sum(error, fold_ids, n_folds) / np.bincount(fold_ids, minlength=n_folds)
+
+    def mean_squared_error(self, y_true, y_pred, fold_ids, n_folds) -> np.ndarray:
+        """Mean squared error of each fold"""
+        error = (y_pred.astype(np.float64) - y_true) ** 2
+        return self._fold_sum(error, fold_ids, n_folds) / np.bincount(fold_ids, minlength=n_folds)
+
+    def r2(self, y_true, y_pred, fold_ids, n_folds) -> np.ndarray:
+        """Coefficient of determination of each fold. As in sklearn, a fold with constant expected values scores 1.0 for a perfect prediction and 0.0 otherwise."""
+        y_true = y_true.astype(np.float64)
+        counts = np.bincount(fold_ids, minlength=n_folds)
+        fold_mean = self._fold_sum(y_true, fold_ids, n_folds) / counts
+        numerator = self._fold_sum((y_true - y_pred) ** 2, fold_ids, n_folds)
+        denominator = self._fold_sum((y_true - fold_mean[fold_ids]) ** 2, fold_ids, n_folds)
+
+        result = np.ones(n_folds)
+        valid = denominator != 0
+        result[valid] = 1 - numerator[valid] / denominator[valid]
+        result[~valid & (numerator != 0)] = 0.0
+        return result
+
+    @staticmethod
+    def _sorted_tie_groups(y_pred: np.ndarray, fold_ids: np.ndarray, descending: bool) -> tuple:
+        """Sorts the rows by fold and prediction, returning the order and the start position of each group of tied predictions inside a fold"""
+        y_pred = y_pred.astype(np.float64)
+        order = np.lexsort((-y_pred if descending else y_pred, fold_ids))
+        sorted_folds, sorted_pred = fold_ids[order], y_pred[order]
+        new_group = np.empty(len(order), dtype=bool)
+        new_group[:1] = True
+        new_group[1:] = (sorted_folds[1:] != sorted_folds[:-1]) | (sorted_pred[1:] != sorted_pred[:-1])
+        return order, sorted_folds, np.flatnonzero(new_group)
+
+    def roc_auc(self, y_true, y_pred, fold_ids, n_folds) -> np.ndarray:
+        """Area under the ROC curve of each fold, computed from the ranks of the predictions inside each fold (Mann-Whitney statistic). Folds with a single class are not defined and return nan, as sklearn does.
+
+        Raises:
+            ValueError: If the expected values have more than two classes
+        """
+        classes = np.unique(y_true)
+        if len(classes) > 2:
+            raise ValueError(f"roc_auc is supported only for binary targets. Classes found: {classes.tolist()}")
+        is_positive = (y_true == classes[-1]).astype(np.float64)
+
+        order, sorted_folds, group_starts = self._sorted_tie_groups(y_pred, fold_ids, descending=False)
+        counts = np.bincount(fold_ids, minlength=n_folds)
+        fold_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        # tied predictions share the average of their ranks inside the fold
+        group_sizes = np.diff(np.append(group_starts, len(order)))
+        group_rank = (2 * group_starts + group_sizes - 1) / 2 - fold_starts[sorted_folds[group_starts]] + 1
+        ranks = np.repeat(group_rank, group_sizes)
+
+        n_positive = self._fold_sum(is_positive, fold_ids, n_folds)
+        n_negative = counts - n_positive
+        positive_rank_sum = self._fold_sum(ranks * is_positive[order], sorted_folds, n_folds)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = (positive_rank_sum - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative)
+        result[(n_positive == 0) | (n_negative == 0)] = np.nan
+        return result
+
+    def average_precision(self, y_true, y_pred, fold_ids, n_folds, pos_label=1) -> np.ndarray:
+        """Average precision of each fold, the sum over decreasing thresholds of the precision weighted by the recall increment. Folds without positive rows score 0.0, as sklearn does.
+
+        Raises:
+            ValueError: If pos_label is not one of the expected values
+        """
+        classes = np.unique(y_true)
+        if pos_label not in classes and len(classes) > 1:
+            raise ValueError(f"pos_label={pos_label} is not a valid label. It should be one of {classes.tolist()}")
+        is_positive = (y_true == pos_label).astype(np.float64)
+
+        order, sorted_folds, group_starts = self._sorted_tie_groups(y_pred, fold_ids, descending=True)
+        group_folds = sorted_folds[group_starts]
+        group_tp = np.add.reduceat(is_positive[order], group_starts)
+        group_fp = np.diff(np.append(group_starts, len(order))) - group_tp
+
+        # cumulative true/false positives restarted at the first group of each fold
+        cum_tp, cum_fp = np.cumsum(group_tp), np.cumsum(group_fp)
+        new_fold = np.empty(len(group_starts), dtype=bool)
+        new_fold[:1] = True
+        new_fold[1:] = group_folds[1:] != group_folds[:-1]
+        first_group = np.flatnonzero(new_fold)[np.cumsum(new_fold) - 1]
+        tp = cum_tp - (cum_tp - group_tp)[first_group]
+        fp = cum_fp - (cum_fp - group_fp)[first_group]
+
+        n_positive = self._fold_sum(is_positive, fold_ids, n_folds)
+        weighted_precision = self._fold_sum(group_tp * tp / (tp + fp), group_folds, n_folds)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = weighted_precision / n_positive
+        result[n_positive == 0] = 0.0
+        return result
@@ -1,6 +1,5 @@
+import sys
 from pathlib import Path
-import onnxruntime as ort
-import mlflow.pyfunc
 
 from ml_exp.repository.interfaces.model_repository import IModelRepository
 from ml_exp.model.ml_model import MLModel, ModelTechnology, ModelType
@@ -27,7 +26,9 @@ class GeneralModelRepository(IModelRepository):
         Returns:
             MLModel: Model loaded and processed to be used in the testing phases
         """
-        if isinstance(model_obj, mlflow.pyfunc.PyFuncModel):
+        # mlflow is only imported here if the object comes from it
+        pyfunc = sys.modules.get("mlflow.pyfunc")
+        if pyfunc is not None and isinstance(model_obj, pyfunc.PyFuncModel):
             return MLModel(
                 context_name=context_name,
                 model_object=model_obj,
@@ -54,11 +55,13 @@ class GeneralModelRepository(IModelRepository):
         Returns:
             list[MLModel]: List of models loaded and processed to be used in the testing phases
         """
+        import onnxruntime as ort
         model_loaded = ort.InferenceSession(pathlib_obj)
 
         return MLModel(
             context_name=context_name,
             model_object=model_loaded,
             model_technology=ModelTechnology.general_from_onnx.value,
-            model_type=ModelType.undefined.value
+            model_type=ModelType.undefined.value,
+            model_path=str(pathlib_obj)
         )
\ No newline at end of file
@@ -1,7 +1,6 @@
 import numpy as np
-from scipy.stats import shapiro, anderson, kstest, levene, bartlett, ttest_ind, f_oneway, mannwhitneyu, wilcoxon, kruskal
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-from statsmodels.stats.multitest import multipletests
+from scipy import sparse
+from scipy.stats import shapiro, anderson, kstest, levene, bartlett, ttest_ind, f_oneway, mannwhitneyu, wilcoxon, kruskal, norm
  
 from ml_exp.model.hypho_test_results import (
     ShapiroWilkTestResult,
@@ -92,6 +91,7 @@ class ABTestRepository(IABTestRepository):
         Returns:
             TurkeyTestResult: Test result
         """
+        from statsmodels.stats.multicomp import pairwise_tukeyhsd
         turkey_result = pairwise_tukeyhsd(values, labels, alpha=self.alpha)
         ab_test_result = TurkeyTestResult(
             context=context,
@@ -157,6 +157,128 @@ class ABTestRepository(IABTestRepository):
         )
         return ab_test_result
 
+    @staticmethod
+    def _mannwhitney_statistics(groups: list[np.ndarray], columns: list[int] = None) -> tuple:
+        """U statistic and tie correction term of every ordered pair of groups, ranking each group against the others once instead of pooling every pair.
+
+        The rank of a value of group i inside the pool of i and j is its rank inside i plus the number of values of j below it (and half of the ones equal to it), so U[i, j] is the sum over group i of those counts in j. The tie term of a pool, sum of t^3 - t over tied values, is split into the terms of each group plus a cross term 3 (a^2 b + a b^2) over the counts a and b of each value in the two groups.
+
+        Args:
+            groups (list[np.ndarray]): Metric values of each context
+            columns (list[int], optional): Groups compared against every group. None compares all of them. Defaults to None.
+
+        Returns:
+            tuple: U matrix (U[i, c] is the statistic of group i against group columns[c]) and tie term matrix of every pool
+        """
+        n_groups = len(groups)
+        columns = np.arange(n_groups) if columns is None else np.asarray(columns)
+        sizes = np.array([len(group) for group in groups])
+        pooled = np.concatenate(groups)
+        group_of_value = np.repeat(np.arange(n_groups), sizes)
+
+        # the pooled values are sorted once, so each group is searched with ordered queries
+        order = np.argsort(pooled, kind="stable")
+        sorted_pooled, sorted_group_of_value = pooled[order], group_of_value[order]
+        u_matrix = np.empty((n_groups, len(columns)))
+        for c, j in enumerate(columns):
+            sorted_group = np.sort(groups[j])
+            below = np.searchsorted(sorted_group, sorted_pooled, side="left")
+            below_or_equal = np.searchsorted(sorted_group, sorted_pooled, side="right")
+            u_matrix[:, c] = np.bincount(sorted_group_of_value, weights=below + 0.5 * (below_or_equal - below), minlength=n_groups)
+
+        distinct_values, value_index = np.unique(pooled, return_inverse=True)
+        counts = sparse.csr_matrix((np.ones(len(pooled)), (group_of_value, value_index)),
+                                   shape=(n_groups, len(distinct_values)))
+        counts.sum_duplicates()
+        squared_counts = counts.multiply(counts)
+        group_ties = np.asarray((squared_counts.multiply(counts) - counts).sum(axis=1)).ravel()
+        cross_ties = (squared_counts @ counts[columns].T + counts @ squared_counts[columns].T).toarray()
+        tie_matrix = group_ties[:, None] + group_ties[None, columns] + 3 * cross_ties
+        return u_matrix, tie_matrix
+
+    def apply_mannwhitney_all_pairs(self, values: dict) -> list[MannWhitneyTestResult]:
+        """Apply the Mann-Whitney test to every pair of models at once, with the same results of scipy mannwhitneyu (two-sided, normal approximation with tie and continuity correction, exact distribution for pairs of up to 8 values without ties)
+
+        Args:
+            values (dict): Model metric values by context name
+
+        Returns:
+            list[MannWhitneyTestResult]: Test result of each pair, in the order of the pairs (i, j) with i < j
+        """
+        context_names = list(values.keys())
+        groups = [np.asarray(values[context_name], dtype=np.float64) for context_name in context_names]
+        if len(groups) < 2:
+            return []
+
+        u_matrix, tie_matrix = self._mannwhitney_statistics(groups)
+        rows, cols = np.triu_indices(len(groups), k=1)
+        return self.__mannwhitney_pair_results(values, context_names, groups, rows, cols,
+                                               u1=u_matrix[rows, cols], ties=tie_matrix[rows, cols])
+
+    def apply_mannwhitney_against_baseline(self, values: dict, baseline_context: str) -> list[MannWhitneyTestResult]:
+        """Apply the Mann-Whitney test between a baseline model and each other model, k - 1 tests instead of every pair, with the same results of apply_mannwhitney_all_pairs for those pairs
+
+        Args:
+            values (dict): Model metric values by context name
+            baseline_context (str): Name of the context every other context is compared against
+
+        Returns:
+            list[MannWhitneyTestResult]: Test result of each challenger, with the baseline as model1, in the order of the contexts
+        """
+        context_names = list(values.keys())
+        if baseline_context not in values:
+            raise ValueError(f"baseline_context need to be one of the contexts {context_names}. Current baseline_context: {baseline_context}")
+        groups = [np.asarray(values[context_name], dtype=np.float64) for context_name in context_names]
+        baseline = context_names.index(baseline_context)
+
+        # U of each challenger against the baseline, the baseline statistic is its complement
+        u_matrix, tie_matrix = self._mannwhitney_statistics(groups, columns=[baseline])
+        challengers = np.array([i for i in range(len(groups)) if i != baseline], dtype=np.int64)
+        rows = np.full(len(challengers), baseline)
+        baseline_size = len(groups[baseline])
+        challenger_sizes = np.array([len(groups[i]) for i in challengers], dtype=np.float64)
+        return self.__mannwhitney_pair_results(values, context_names, groups, rows, challengers,
+                                               u1=baseline_size * challenger_sizes - u_matrix[challengers, 0],
+                                               ties=tie_matrix[challengers, 0])
+
+    def __mannwhitney_pair_results(self, values: dict, context_names: list, groups: list, rows: np.ndarray, cols: np.ndarray, u1: np.ndarray, ties: np.ndarray) -> list[MannWhitneyTestResult]:
+        """Builds the Mann-Whitney result of each pair (rows[p], cols[p]) from the U statistic of its first group and the tie term of its pool"""
+        sizes = np.array([len(group) for group in groups], dtype=np.float64)
+        has_nan = np.array([np.isnan(group).any() for group in groups])
+        n1, n2 = sizes[rows], sizes[cols]
+        n = n1 + n2
+        u1 = np.asarray(u1, dtype=np.float64).copy()
+
+        # same normal approximation as scipy: the larger U against its mean, continuity corrected
+        u = np.maximum(u1, n1 * n2 - u1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+            z = (u - n1 * n2 / 2 - 0.5) / sigma
+        p_values = np.clip(2 * norm.sf(z), 0, 1)
+        undefined = has_nan[rows] | has_nan[cols]
+        u1[undefined], p_values[undefined] = np.nan, np.nan
+
+        results = []
+        for pair, (i, j) in enumerate(zip(rows, cols)):
+            context_name_1, context_name_2 = context_names[i], context_names[j]
+            context = f"Mann-Whitney between model1={context_name_1!r} and model2={context_name_2!r}"
+            if min(sizes[i], sizes[j]) <= 8 and ties[pair] == 0 and not undefined[pair]:
+                # pairs with a small sample and without ties use the exact distribution in scipy
+                results.append(self.apply_mannwhitney(context=context,
+                                                      context_name_1=context_name_1,
+                                                      context_name_2=context_name_2,
+                                                      values=values))
+                continue
+            results.append(MannWhitneyTestResult.model_construct(
+                context=context,
+                context_name_1=context_name_1,
+                context_name_2=context_name_2,
+                stat=float(u1[pair]),
+                p_value=float(p_values[pair]),
+                is_significant=bool(p_values[pair] < self.alpha)
+            ))
+        return results
+
     def apply_t_student(self, context: str, context_name_1: str, context_name_2: str, values: list) -> TStudentTestResult:
         """Apply the T-Student test to validate whether there are significant differences between the metric results between pair of models
 
@@ -194,5 +316,6 @@ class ABTestRepository(IABTestRepository):
         )
 
     def apply_benjamini_hochberg(self, p_values: list[float]) -> tuple[list[bool], list[float]]:
+        from statsmodels.stats.multitest import multipletests
         reject, corrected_pvalues, _, _ = multipletests(p_values, alpha=self.alpha, method="fdr_bh")
         return reject.tolist(), corrected_pvalues.tolist()
\ No newline at end of file
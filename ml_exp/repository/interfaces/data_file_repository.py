@@ -1,5 +1,6 @@
 from abc import abstractmethod, ABC
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
 
 class IDataFileRepository(ABC):
@@ -8,4 +9,8 @@ class IDataFileRepository(ABC):
     
     @abstractmethod
     def read(self, file_path: Path) -> pd.DataFrame:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def read_chunks(self, file_path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+        pass
@@ -0,0 +1,54 @@
+from abc import abstractmethod, ABC
+import numpy as np
+
+
+class IFoldMetricRepository(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def compute(self, score_target: str, y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> np.ndarray:
+        """Computes the performance metric of every fold in a single pass over the predictions
+
+        Args:
+            score_target (str): Performance metric to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            fold_ids (np.ndarray): Fold of each row, between 0 and n_folds - 1
+            n_folds (int): Number of folds
+
+        Returns:
+            np.ndarray: Metric value of each fold
+        """
+        pass
+
+    @abstractmethod
+    def compute_many(self, scores_target: list[str], y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray, n_folds: int) -> dict:
+        """Computes several performance metrics of every fold, sharing the statistics common to them
+
+        Args:
+            scores_target (list[str]): Performance metrics to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            fold_ids (np.ndarray): Fold of each row, between 0 and n_folds - 1
+            n_folds (int): Number of folds
+
+        Returns:
+            dict: Metric value of each fold by performance metric
+        """
+        pass
+
+    @abstractmethod
+    def compute_weighted(self, scores_target: list[str], y_true: np.ndarray, y_pred: np.ndarray, weights: np.ndarray) -> dict:
+        """Computes several performance metrics of every replicate of a weighted resampling, from a single prediction vector
+
+        Args:
+            scores_target (list[str]): Performance metrics to be computed
+            y_true (np.ndarray): Expected values of all rows of the test data
+            y_pred (np.ndarray): Values predicted by the model for all rows of the test data
+            weights (np.ndarray): Weight of each row in each replicate, with shape (n_replicates, n_rows)
+
+        Returns:
+            dict: Metric value of each replicate by performance metric
+        """
+        pass
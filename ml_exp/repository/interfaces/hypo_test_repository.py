@@ -87,6 +87,31 @@ class IABTestRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def apply_mannwhitney_all_pairs(self, values: dict) -> list[MannWhitneyTestResult]:
+        """Apply the Mann-Whitney test to every pair of models at once, ranking the metric values of each model only once
+
+        Args:
+            values (dict): Model metric values by context name
+
+        Returns:
+            list[MannWhitneyTestResult]: Test result of each pair
+        """
+        pass
+
+    @abstractmethod
+    def apply_mannwhitney_against_baseline(self, values: dict, baseline_context: str) -> list[MannWhitneyTestResult]:
+        """Apply the Mann-Whitney test only between a baseline model and each other model
+
+        Args:
+            values (dict): Model metric values by context name
+            baseline_context (str): Name of the context every other context is compared against
+
+        Returns:
+            list[MannWhitneyTestResult]: Test result of each challenger against the baseline
+        """
+        pass
+
     @abstractmethod
     def apply_t_student(self, context: str, context_name_1: str, context_name_2: str, values: list) -> TStudentTestResult:
         """Apply the T-Student test to validate whether there are significant differences between the metric results between pair of models
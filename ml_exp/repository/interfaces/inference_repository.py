@@ -0,0 +1,20 @@
+from abc import abstractmethod, ABC
+import numpy as np
+
+
+class IInferenceRepository(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def predict(self, model_object, X) -> np.ndarray:
+        """Runs the inference of the model over all rows of X
+
+        Args:
+            model_object: Loaded model used to run the inference
+            X: Data used as model input
+
+        Returns:
+            np.ndarray: Model output with one entry for each row of X
+        """
+        pass
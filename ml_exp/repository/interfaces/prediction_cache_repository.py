@@ -0,0 +1,23 @@
+from abc import abstractmethod, ABC
+from typing import Union
+import numpy as np
+
+
+class IPredictionCacheRepository(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def get(self, model_fingerprint: str, data_fingerprint: str) -> Union[np.ndarray, None]:
+        """Returns the predictions stored for the pair of model and test data, or None if they are not cached"""
+        pass
+
+    @abstractmethod
+    def put(self, model_fingerprint: str, data_fingerprint: str, predictions: np.ndarray) -> bool:
+        """Stores the predictions of the model over the test data, returning whether they were cached"""
+        pass
+
+    @abstractmethod
+    def invalidate(self, model_fingerprint: str = None, data_fingerprint: str = None) -> int:
+        """Removes the cached predictions of a model, of a test data, or all of them, returning how many entries were removed"""
+        pass
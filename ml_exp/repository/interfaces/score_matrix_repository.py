@@ -0,0 +1,18 @@
+from abc import abstractmethod, ABC
+from pathlib import Path
+from typing import Union
+
+
+class IScoreMatrixRepository(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def save(self, path: Union[str, Path], scores_data: dict, fold_sizes: dict = None, metadata: dict = None) -> Path:
+        """Stores the metric values of every context by performance metric, with the size of each fold and the settings of the run, returning the path written"""
+        pass
+
+    @abstractmethod
+    def load(self, path: Union[str, Path]) -> dict:
+        """Reads a file written by save, returning the scores data, the fold sizes and the metadata of the run"""
+        pass
@@ -0,0 +1,26 @@
+from abc import abstractmethod, ABC
+import numpy as np
+import pandas as pd
+
+
+class ISharedTestDataRepository(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def share_frame(self, frame: pd.DataFrame):
+        """Places the DataFrame in memory shared by the worker processes, returning a handle that unpickles as a read-only view of it
+        """
+        pass
+
+    @abstractmethod
+    def share_array(self, array: np.ndarray):
+        """Places the array in memory shared by the worker processes, returning a handle that unpickles as a read-only view of it
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Removes the shared blocks. Processes still viewing them keep their pages until they release the views
+        """
+        pass
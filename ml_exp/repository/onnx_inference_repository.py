@@ -0,0 +1,102 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+from ml_exp.repository.interfaces.inference_repository import IInferenceRepository
+
+
+class OnnxInferenceRepository(IInferenceRepository):
+    """Repository to run inference with ONNX Runtime sessions in batches
+
+    Args:
+        IInferenceRepository (ABC): Interface for repositories responsible for running the inference of loaded models
+    """
+    def __init__(self, batch_size: int = 1024) -> None:
+        """
+        Args:
+            batch_size (int, optional): Number of rows sent to the session in each run call. Models exported with a fixed batch dimension use that dimension instead. Defaults to 1024.
+        """
+        super().__init__()
+        if batch_size < 1:
+            raise ValueError(f"batch_size need to be a positive integer. Current batch_size: {batch_size}")
+        self.batch_size = batch_size
+        # keyed by the session itself without keeping it alive, so evicted models are freed
+        self.__sessions_metadata = weakref.WeakKeyDictionary()
+
+    def __getstate__(self) -> dict:
+        # sessions can not leave the process, so the metadata cache is rebuilt wherever the repository is sent
+        state = self.__dict__.copy()
+        state["_OnnxInferenceRepository__sessions_metadata"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__sessions_metadata = weakref.WeakKeyDictionary()
+
+    def get_session_metadata(self, session) -> dict:
+        """Returns the input name, output name and fixed batch dimension (if any) of the session, reading them only on the first call for each session.
+
+        Args:
+            session (InferenceSession): ONNX Runtime session
+
+        Returns:
+            dict: Metadata of the session (input_name, output_name and fixed_batch_size)
+        """
+        if session not in self.__sessions_metadata:
+            model_input = session.get_inputs()[0]
+            batch_dim = model_input.shape[0] if model_input.shape else None
+            self.__sessions_metadata[session] = {
+                "input_name": model_input.name,
+                "output_name": session.get_outputs()[0].name,
+                "fixed_batch_size": batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else None
+            }
+        return self.__sessions_metadata[session]
+
+    @staticmethod
+    def to_contiguous_float32(X) -> np.ndarray:
+        """Converts the input data to a C-contiguous float32 array, the layout expected by the session
+
+        Args:
+            X (Union[pd.DataFrame, np.ndarray]): Input data
+
+        Returns:
+            np.ndarray: 2D float32 array
+        """
+        if isinstance(X, (pd.DataFrame, pd.Series)):
+            X = X.to_numpy(dtype=np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+        return X
+
+    def predict(self, model_object, X) -> np.ndarray:
+        """Runs the session over X feeding batches of rows. The last batch is padded with zeros when the model has a fixed batch dimension, and the padded rows are discarded from the output.
+
+        Args:
+            model_object (InferenceSession): ONNX Runtime session
+            X (Union[pd.DataFrame, np.ndarray]): Input data
+
+        Returns:
+            np.ndarray: First output of the model with one entry for each row of X
+        """
+        metadata = self.get_session_metadata(model_object)
+        input_name, output_name = metadata["input_name"], metadata["output_name"]
+        fixed_batch_size = metadata["fixed_batch_size"]
+        batch_size = fixed_batch_size or self.batch_size
+
+        X = self.to_contiguous_float32(X)
+        n_rows = X.shape[0]
+
+        outputs = []
+        for start in range(0, n_rows, batch_size):
+            batch = X[start:start + batch_size]
+            n_batch_rows = batch.shape[0]
+            if fixed_batch_size and n_batch_rows < fixed_batch_size:
+                padding = np.zeros((fixed_batch_size - n_batch_rows,) + batch.shape[1:], dtype=np.float32)
+                batch = np.concatenate([batch, padding])
+            output_data = model_object.run([output_name], {input_name: batch})[0]
+            outputs.append(np.asarray(output_data)[:n_batch_rows])
+
+        if not outputs:
+            return np.array([])
+        return np.concatenate(outputs)
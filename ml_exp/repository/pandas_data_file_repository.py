@@ -1,22 +1,46 @@
+import hashlib
+import os
 import warnings
 from pathlib import Path
+from typing import Iterator, Union
 from ml_exp.repository.interfaces.data_file_repository import IDataFileRepository
+import numpy as np
 import pandas as pd
 
+ENGINES = ["c", "pyarrow"]
+# formats parsed from text, whose parsed copy is worth caching
+TEXT_EXTENSIONS = [".csv", ".tsv", ".data", ".json", ".jsonl"]
+
 class PandasDataFileRepository(IDataFileRepository):
     """Repository to load data file to pandas dataframe
 
     Args:
         IDataFileRepository (ABC): Interface responsible to define the main logic to load data files
     """
-    def __init__(self) -> None:
-        pass
-
-    def warn_read(self) -> None:
+    def __init__(self, engine: str = "c", downcast: bool = False, cache_dir: Union[str, Path] = None) -> None:
+        """
+        Args:
+            engine (str, optional): Parser of CSV files. "pyarrow" parses with multiple threads and reads floats exactly as written, "c" is the pandas default parser. Defaults to "c".
+            downcast (bool, optional): Stores integer columns in the smallest integer type holding their values and float columns in float32 when no value changes, reducing the memory of the test data. Defaults to False.
+            cache_dir (Union[str, Path], optional): Folder where text files (.csv, .tsv, .data, .json, .jsonl) are cached as Feather after their first read, keyed by file path, size and modification time, so later reads of an unchanged file skip the parsing. None disables the cache. Defaults to None.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"engine need to be one of {ENGINES}. Current engine: {engine}")
+        self.engine = engine
+        self.downcast = downcast
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def warn_read(self, file_extension: str = None) -> None:
         """Warn the user when an extension is not supported.
+
+        Args:
+            file_extension (str, optional): Extension of the file read. None uses the extension of the last file read. Defaults to None.
         """
+        file_extension = file_extension if file_extension is not None else getattr(self, "file_extension", None)
         warnings.warn(
-            f"""There was an attempt to read a file with extension {self.file_extension}, we assume it to be in CSV format.
+            f"""There was an attempt to read a file with extension {file_extension}, we assume it to be in CSV format.
             To prevent this warning from showing up, please rename the file to any of the extensions supported by pandas
             (docs: https://pandas.pydata.org/pandas-docs/stable/user_guide/io.html)
             If you think this extension should be supported, please report this as an issue:
@@ -79,33 +103,135 @@ class PandasDataFileRepository(IDataFileRepository):
         Returns:
             DataFrame
         """
-        self.file_extension = self.uncompressed_extension(file_path)
-
-        if self.file_extension == ".json":
+        # used from the local variable, so concurrent reads of different files do not mix their extensions; the attribute only records the last read
+        file_extension = self.uncompressed_extension(file_path)
+        self.file_extension = file_extension
+
+        cache_path = self._cache_path(file_path) if file_extension in TEXT_EXTENSIONS else None
+        if cache_path is not None and cache_path.exists():
+            return pd.read_feather(cache_path)
+
+        df = self._read_file(file_path, file_extension)
+        if self.downcast:
+            df = self.downcast_columns(df)
+        if cache_path is not None:
+            self._write_cache(cache_path, df)
+        return df
+
+    def _read_file(self, file_path: Path, file_extension: str) -> pd.DataFrame:
+        if file_extension == ".json":
             df = pd.read_json(str(file_path))
-        elif self.file_extension == ".jsonl":
+        elif file_extension == ".jsonl":
             df = pd.read_json(str(file_path), lines=True)
-        elif self.file_extension == ".dta":
+        elif file_extension == ".dta":
             df = pd.read_stata(str(file_path))
-        elif self.file_extension == ".tsv":
-            df = pd.read_csv(str(file_path), sep="\t")
-        elif self.file_extension in [".xls", ".xlsx"]:
+        elif file_extension == ".tsv":
+            df = pd.read_csv(str(file_path), sep="\t", engine=self.engine)
+        elif file_extension in [".xls", ".xlsx"]:
             df = pd.read_excel(str(file_path))
-        elif self.file_extension in [".hdf", ".h5"]:
+        elif file_extension in [".hdf", ".h5"]:
             df = pd.read_hdf(str(file_path))
-        elif self.file_extension in [".sas7bdat", ".xpt"]:
+        elif file_extension in [".sas7bdat", ".xpt"]:
             df = pd.read_sas(str(file_path))
-        elif self.file_extension == ".parquet":
+        elif file_extension == ".parquet":
             df = pd.read_parquet(str(file_path))
-        elif self.file_extension in [".pkl", ".pickle"]:
+        elif file_extension in [".pkl", ".pickle"]:
             df = pd.read_pickle(str(file_path))
-        elif self.file_extension == ".tar":
+        elif file_extension == ".tar":
             raise ValueError(
                 "tar compression is not supported directly by pandas, please use the 'tarfile' module"
             )
         else:
-            if self.file_extension != ".csv":
-                self.warn_read()
+            if file_extension != ".csv":
+                self.warn_read(file_extension)
+
+            df = pd.read_csv(str(file_path), engine=self.engine)
+        return df
+
+    @staticmethod
+    def downcast_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Stores integer columns in the smallest integer type holding their values, and float columns in float32 when every value is kept exactly
+
+        Args:
+            df (pd.DataFrame): DataFrame to be downcast
+
+        Returns:
+            pd.DataFrame: DataFrame with the same values in smaller types
+        """
+        df = df.copy(deep=False)
+        for column, dtype in df.dtypes.items():
+            if not isinstance(dtype, np.dtype):
+                continue
+            if dtype.kind in "iu":
+                df[column] = pd.to_numeric(df[column], downcast="integer" if dtype.kind == "i" else "unsigned")
+            elif dtype == np.float64:
+                values = df[column].to_numpy()
+                downcast = values.astype(np.float32)
+                # float32 only when it is exact for every value, so the metrics do not change
+                if np.array_equal(downcast, values, equal_nan=True):
+                    df[column] = downcast
+        return df
+
+    def _cache_path(self, file_path: Path) -> Union[Path, None]:
+        """Path of the cached copy of the file for its current size and modification time and for the engine and downcast settings, which change the dtypes read, or None without a cache"""
+        if self.cache_dir is None:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        resolved_path = str(Path(file_path).resolve())
+        path_key = hashlib.sha256(resolved_path.encode()).hexdigest()[:16]
+        version_key = hashlib.sha256(f"{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+        settings_key = hashlib.sha256(f"{self.engine}|{self.downcast}".encode()).hexdigest()[:8]
+        return self.cache_dir / f"{path_key}_{version_key}_{settings_key}.feather"
+
+    def _write_cache(self, cache_path: Path, df: pd.DataFrame) -> None:
+        """Writes the cached copy, removing the copies of older versions of the same file, whatever their settings. Frames Feather can not store (non-string column names, custom index) are not cached."""
+        if not isinstance(df.index, pd.RangeIndex) or not all(isinstance(column, str) for column in df.columns):
+            return
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            df.to_feather(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except (ValueError, TypeError, OSError, ImportError):
+            tmp_path.unlink(missing_ok=True)
+            return
+        path_key, version_key, _ = cache_path.stem.split("_")
+        for stale_path in self.cache_dir.glob(f"{path_key}_*.feather"):
+            if stale_path.stem.split("_")[1] != version_key:
+                stale_path.unlink(missing_ok=True)
+
+    def read_chunks(self, file_path: Path, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """Read the file as a sequence of DataFrames with at most chunk_size rows, so the whole data never needs to be in memory.
+        Only formats that can be read incrementally are supported (.csv, .tsv, .data, .jsonl, .parquet)
+
+        Args:
+            file_path (Path): the file to read
+            chunk_size (int, optional): maximum number of rows of each chunk. Defaults to 100_000.
 
-            df = pd.read_csv(str(file_path))
-        return df
\ No newline at end of file
+        Raises:
+            ValueError: If the file format can not be read in chunks
+
+        Returns:
+            Iterator[pd.DataFrame]: chunks of the file, in order
+        """
+        file_extension = self.uncompressed_extension(file_path)
+
+        if file_extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(str(file_path))
+            for batch in parquet_file.iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif file_extension == ".jsonl":
+            with pd.read_json(str(file_path), lines=True, chunksize=chunk_size) as reader:
+                yield from reader
+        elif file_extension in [".csv", ".tsv", ".data"]:
+            sep = "\t" if file_extension == ".tsv" else ","
+            with pd.read_csv(str(file_path), sep=sep, chunksize=chunk_size) as reader:
+                yield from reader
+        else:
+            raise ValueError(
+                f"Files with extension {file_extension} can not be read in chunks. Use .csv, .tsv, .data, .jsonl or .parquet files."
+            )
@@ -0,0 +1,123 @@
+import os
+import time
+from pathlib import Path
+from typing import Union
+import numpy as np
+
+from ml_exp.repository.interfaces.prediction_cache_repository import IPredictionCacheRepository
+
+
+class PredictionCacheRepository(IPredictionCacheRepository):
+    """Repository to persist model predictions on disk, keyed by the fingerprint of the model artifact and the fingerprint of the test data. Each entry is a .npy file, and the least recently used entries are evicted when the cache grows beyond max_bytes.
+
+    Args:
+        IPredictionCacheRepository (ABC): Interface for repositories responsible for caching predictions
+    """
+    suffix = ".npy"
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int = None) -> None:
+        """
+        Args:
+            cache_dir (Union[str, Path]): Folder where the predictions are stored
+            max_bytes (int, optional): Maximum size of the cache in bytes. None keeps every entry. Defaults to None.
+        """
+        super().__init__()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, model_fingerprint: str, data_fingerprint: str) -> Path:
+        return self.cache_dir / f"{model_fingerprint}_{data_fingerprint}{self.suffix}"
+
+    def get(self, model_fingerprint: str, data_fingerprint: str) -> Union[np.ndarray, None]:
+        """Returns the predictions stored for the pair of model and test data. A hit refreshes the entry for the LRU eviction.
+
+        Args:
+            model_fingerprint (str): Fingerprint of the model artifact
+            data_fingerprint (str): Fingerprint of the test data
+
+        Returns:
+            Union[np.ndarray, None]: Cached predictions, or None if they are not cached
+        """
+        entry_path = self._entry_path(model_fingerprint, data_fingerprint)
+        try:
+            predictions = np.load(entry_path, allow_pickle=False)
+            os.utime(entry_path, ns=(time.time_ns(), time.time_ns()))
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return predictions
+
+    def put(self, model_fingerprint: str, data_fingerprint: str, predictions: np.ndarray) -> bool:
+        """Stores the predictions and evicts the least recently used entries if the cache exceeds max_bytes. Predictions with object dtype (e.g. string labels) are not cached.
+
+        Args:
+            model_fingerprint (str): Fingerprint of the model artifact
+            data_fingerprint (str): Fingerprint of the test data
+            predictions (np.ndarray): Prediction vector of the model over the test data
+
+        Returns:
+            bool: True if the predictions were stored
+        """
+        predictions = np.asarray(predictions)
+        if predictions.dtype.hasobject:
+            return False
+
+        entry_path = self._entry_path(model_fingerprint, data_fingerprint)
+        # writes to a temporary file first so concurrent readers never see a partial entry
+        temporary_path = entry_path.with_name(f"{entry_path.stem}.{os.getpid()}.tmp")
+        with open(temporary_path, "wb") as fp:
+            np.save(fp, predictions, allow_pickle=False)
+        os.replace(temporary_path, entry_path)
+
+        self.evict()
+        return entry_path.exists()
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        entries = []
+        for entry_path in self.cache_dir.glob(f"*{self.suffix}"):
+            try:
+                entries.append((entry_path, entry_path.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def size(self) -> int:
+        """Returns the total size of the cached predictions in bytes"""
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in max_bytes"""
+        if self.max_bytes is None:
+            return
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime_ns)
+        total_bytes = sum(stat.st_size for _, stat in entries)
+        for entry_path, stat in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+
+    def invalidate(self, model_fingerprint: str = None, data_fingerprint: str = None) -> int:
+        """Removes the cached predictions of a model, of a test data, of the pair of both, or every entry when none is given
+
+        Args:
+            model_fingerprint (str, optional): Fingerprint of the model artifact. Defaults to None.
+            data_fingerprint (str, optional): Fingerprint of the test data. Defaults to None.
+
+        Returns:
+            int: Number of entries removed
+        """
+        pattern = f"{model_fingerprint or '*'}_{data_fingerprint or '*'}{self.suffix}"
+        removed = 0
+        for entry_path in self.cache_dir.glob(pattern):
+            entry_path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """Removes every cached prediction
+
+        Returns:
+            int: Number of entries removed
+        """
+        return self.invalidate()
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from typing import Union
+import numpy as np
+
+from ml_exp.repository.interfaces.score_matrix_repository import IScoreMatrixRepository
+from ml_exp.utils.score_matrix import to_score_matrix
+
+
+class ScoreMatrixRepository(IScoreMatrixRepository):
+    """Repository to persist the raw metric values of a run as a columnar .npz file: a single float matrix (performance metric x context x fold) padded with nan, the number of values of each context, the size of each fold and the settings of the run as JSON. The file is read without pickle and loads in the time of reading the arrays, instead of parsing one JSON list per context.
+
+    Args:
+        IScoreMatrixRepository (ABC): Interface for repositories responsible for persisting score matrices
+    """
+    suffix = ".npz"
+    format_version = 1
+
+    def __init__(self) -> None:
+        super().__init__()
+
+    def save(self, path: Union[str, Path], scores_data: dict, fold_sizes: dict = None, metadata: dict = None) -> Path:
+        """Stores the metric values of every context by performance metric
+
+        Args:
+            path (Union[str, Path]): File to be written, .npz is added if missing
+            scores_data (dict): List of metric values of each context by performance metric, as MLExp.scores
+            fold_sizes (dict, optional): Vector with the size of each fold by context name. Defaults to None.
+            metadata (dict, optional): JSON serializable settings of the run, such as seeds, number of folds and significance level. Defaults to None.
+
+        Returns:
+            Path: Path of the file written
+        """
+        path = Path(path)
+        if path.suffix != self.suffix:
+            path = path.with_name(path.name + self.suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        score_targets = list(scores_data.keys())
+        context_names = list(scores_data[score_targets[0]].keys()) if score_targets else []
+        matrices, lengths = [], []
+        for score_target in score_targets:
+            _, matrix, context_lengths = to_score_matrix({name: scores_data[score_target][name] for name in context_names})
+            matrices.append(matrix)
+            lengths.append(context_lengths)
+        n_folds = max((matrix.shape[1] for matrix in matrices), default=0)
+        scores = np.full((len(score_targets), len(context_names), n_folds), np.nan)
+        for position, matrix in enumerate(matrices):
+            scores[position, :, :matrix.shape[1]] = matrix
+
+        # contexts without fold sizes get -1, as do the folds beyond their vector
+        fold_sizes = fold_sizes or {}
+        n_size_folds = max((len(sizes) for sizes in fold_sizes.values()), default=0)
+        sizes = np.full((len(context_names), n_size_folds), -1, dtype=np.int64)
+        for position, context_name in enumerate(context_names):
+            context_sizes = np.asarray(fold_sizes.get(context_name, []), dtype=np.int64)
+            sizes[position, :len(context_sizes)] = context_sizes
+
+        np.savez(path,
+                 score_targets=np.array(score_targets, dtype=str),
+                 context_names=np.array(context_names, dtype=str),
+                 scores=scores,
+                 lengths=np.array(lengths, dtype=np.int64).reshape(len(score_targets), len(context_names)),
+                 fold_sizes=sizes,
+                 metadata=np.array(json.dumps({"format_version": self.format_version, **(metadata or {})})))
+        return path
+
+    def load(self, path: Union[str, Path]) -> dict:
+        """Reads a file written by save
+
+        Args:
+            path (Union[str, Path]): File to be read
+
+        Raises:
+            ValueError: If the file was written by a newer format version
+
+        Returns:
+            dict: scores_data (list of metric values of each context by performance metric, as MLExp.scores), fold_sizes (vector with the size of each fold by context name) and metadata (settings of the run)
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            metadata = json.loads(archive["metadata"].item())
+            if metadata.get("format_version", 0) > self.format_version:
+                raise ValueError(f"Score matrix file need to have format version up to {self.format_version}. Current format version: {metadata['format_version']}")
+            score_targets = archive["score_targets"].tolist()
+            context_names = archive["context_names"].tolist()
+            scores = archive["scores"]
+            lengths = archive["lengths"]
+            sizes = archive["fold_sizes"]
+
+        scores_data = {
+            score_target: {context_name: scores[target_position, context_position, :lengths[target_position, context_position]].tolist()
+                           for context_position, context_name in enumerate(context_names)}
+            for target_position, score_target in enumerate(score_targets)
+        }
+        fold_sizes = {context_name: sizes[position][sizes[position] >= 0]
+                      for position, context_name in enumerate(context_names) if (sizes[position] >= 0).any()}
+        return {"scores_data": scores_data, "fold_sizes": fold_sizes, "metadata": metadata}
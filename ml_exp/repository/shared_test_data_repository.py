@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import threading
+from itertools import count
+from typing import Union
+import numpy as np
+import pandas as pd
+
+from ml_exp.repository.interfaces.shared_test_data_repository import ISharedTestDataRepository
+
+# memory-backed filesystem, so the mapped blocks are shared memory instead of disk files
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+def _attach_array(path: str) -> np.ndarray:
+    # plain ndarray over the mapped pages, the mapping is kept alive by the view
+    return np.load(path, mmap_mode="r").view(np.ndarray)
+
+
+def _attach_frame(blocks: list, columns: pd.Index, index) -> pd.DataFrame:
+    """Rebuilds the DataFrame over read-only views of its mapped blocks, one block per dtype holding its columns contiguously. Columns are placed by position, so repeated column names are kept"""
+    if len(blocks) == 1:
+        path, _ = blocks[0]
+        frame = pd.DataFrame(_attach_array(path).T, copy=False)
+    else:
+        views = [None] * len(columns)
+        for path, block_positions in blocks:
+            block = _attach_array(path)
+            for row, position in enumerate(block_positions):
+                views[position] = block[row]
+        frame = pd.DataFrame(dict(enumerate(views)), copy=False)
+    frame.columns = columns
+    if index is not None:
+        frame.index = index
+    return frame
+
+
+class SharedArray:
+    """Handle of an array stored in shared memory. It pickles as the path of its block and unpickles as a read-only memory-mapped view, so sending it to a worker process copies no data.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __reduce__(self):
+        return (_attach_array, (self.path,))
+
+
+class SharedFrame:
+    """Handle of a DataFrame stored in shared memory, one contiguous block per dtype. It pickles as the paths of its blocks and unpickles as a DataFrame over read-only memory-mapped views, so every worker process reads the same pages.
+    """
+    def __init__(self, blocks: list, columns: pd.Index, index) -> None:
+        self.blocks = blocks
+        self.columns = columns
+        self.index = index
+
+    def __reduce__(self):
+        return (_attach_frame, (self.blocks, self.columns, self.index))
+
+
+class SharedTestDataRepository(ISharedTestDataRepository):
+    """Repository placing test data in shared memory once for all worker processes, as memory-mapped .npy blocks in a memory-backed folder (/dev/shm when available). Workers attach read-only views instead of receiving a pickled copy of the data for each context, so N workers over a test data use about the memory of one copy.
+
+    Each DataFrame or array is written once per repository, however many contexts reference it. Frames with non-numeric columns, and data larger than the free space of the folder, are not shared and are sent as they are.
+    """
+    def __init__(self, base_dir: str = None) -> None:
+        """
+        Args:
+            base_dir (str, optional): Folder where the blocks are created. None uses /dev/shm when available, or the temporary folder. Defaults to None.
+        """
+        super().__init__()
+        if base_dir is None and os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+            base_dir = SHARED_MEMORY_DIR
+        self.shared_dir = tempfile.mkdtemp(prefix="ml_exp_shared_", dir=base_dir)
+        self.__handles = {}
+        self.__block_ids = count()
+        self.__lock = threading.Lock()
+
+    def __write_block(self, values: np.ndarray) -> str:
+        path = os.path.join(self.shared_dir, f"block_{next(self.__block_ids)}.npy")
+        np.save(path, np.ascontiguousarray(values), allow_pickle=False)
+        return path
+
+    def __fits(self, nbytes: int) -> bool:
+        """Container shared memory folders are often small (64MB in Docker), data that does not fit is sent pickled instead"""
+        return nbytes < shutil.disk_usage(self.shared_dir).free
+
+    def share_frame(self, frame: pd.DataFrame) -> Union[SharedFrame, pd.DataFrame]:
+        """Places the DataFrame in shared memory, one block per dtype with its columns contiguous
+
+        Args:
+            frame (pd.DataFrame): Test data to be shared
+
+        Returns:
+            Union[SharedFrame, pd.DataFrame]: Handle of the shared frame, or the frame itself when it has non-numeric columns or does not fit in the shared folder
+        """
+        if not isinstance(frame, pd.DataFrame):
+            return frame
+        if not all(isinstance(dtype, np.dtype) and dtype.kind in "biuf" for dtype in frame.dtypes):
+            return frame
+        if not self.__fits(frame.memory_usage(index=False).sum()):
+            return frame
+        with self.__lock:
+            # keyed by the object, which is kept referenced so its id is not reused
+            entry = self.__handles.get(id(frame))
+            if entry is not None:
+                return entry[1]
+            blocks = []
+            for dtype in dict.fromkeys(frame.dtypes):
+                # columns are selected by position, labels may repeat
+                block_positions = [position for position, column_dtype in enumerate(frame.dtypes) if column_dtype == dtype]
+                blocks.append((self.__write_block(frame.iloc[:, block_positions].to_numpy(dtype=dtype).T), block_positions))
+            index = None if frame.index.equals(pd.RangeIndex(len(frame))) else frame.index
+            handle = SharedFrame(blocks=blocks, columns=frame.columns, index=index)
+            self.__handles[id(frame)] = (frame, handle)
+            return handle
+
+    def share_array(self, array: np.ndarray) -> Union[SharedArray, np.ndarray]:
+        """Places the array in shared memory
+
+        Args:
+            array (np.ndarray): Array to be shared, such as the fold of each row
+
+        Returns:
+            Union[SharedArray, np.ndarray]: Handle of the shared array, or the array itself when it does not fit in the shared folder
+        """
+        if not self.__fits(array.nbytes):
+            return array
+        with self.__lock:
+            entry = self.__handles.get(id(array))
+            if entry is not None:
+                return entry[1]
+            handle = SharedArray(self.__write_block(array))
+            self.__handles[id(array)] = (array, handle)
+            return handle
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__handles.clear()
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
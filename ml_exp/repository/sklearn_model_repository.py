@@ -74,5 +74,6 @@ class SklearnModelRepository(IModelRepository):
                 context_name=context_name,
                 model_object=model_loaded,
                 model_technology=ModelTechnology.sklearn.value,
-                    model_type=model_type
+                model_type=model_type,
+                model_path=str(pathlib_obj)
                 )
\ No newline at end of file
@@ -0,0 +1,147 @@
+from typing import Union
+import numpy as np
+
+from ml_exp.model.ml_model import MLModel, ModelTechnology
+from ml_exp.repository.onnx_inference_repository import OnnxInferenceRepository
+from ml_exp.repository.fold_metric_repository import FoldMetricRepository
+from ml_exp.repository.interfaces.prediction_cache_repository import IPredictionCacheRepository
+from ml_exp.utils.fingerprint import model_fingerprint
+from ml_exp.utils.bootstrap import bootstrap_weights, replicate_blocks
+from ml_exp.service.interfaces.interface_context_scoring_service import IContextScoringService
+
+
+class ContextScoringService(IContextScoringService):
+    """Runs the inference of a single context over its test data and computes the performance metrics of all its folds. It holds only the scoring configuration, so it can be sent to thread or process pools to score contexts concurrently.
+    """
+    def __init__(self,
+                 scores_target: list[str],
+                 n_splits: int,
+                 predict_once: bool = True,
+                 onnx_batch_size: int = 1024,
+                 prediction_cache: IPredictionCacheRepository = None,
+                 random_state: int = 42) -> None:
+        """
+        Args:
+            scores_target (list[str]): Performance metrics to be collected
+            n_splits (int): Number of folds of the test data
+            predict_once (bool, optional): Runs the inference over the full test data once instead of once per fold. Defaults to True.
+            onnx_batch_size (int, optional): Number of rows sent in each run call of ONNX sessions. Defaults to 1024.
+            prediction_cache (IPredictionCacheRepository, optional): Cache of predictions by model and test data fingerprints. None always runs the inference. Defaults to None.
+            random_state (int, optional): Seed of the bootstrap replicates. Defaults to 42.
+        """
+        self.scores_target = scores_target
+        self.n_splits = n_splits
+        self.predict_once = predict_once
+        self.onnx_inference_repo = OnnxInferenceRepository(batch_size=onnx_batch_size)
+        self.fold_metric_repo = FoldMetricRepository()
+        self.prediction_cache = prediction_cache
+        self.random_state = random_state
+
+    @staticmethod
+    def to_prediction_vector(Y_pred) -> np.ndarray:
+        """Normalizes the model output (ndarray, Series or single column DataFrame) to an array that can be indexed by fold."""
+        Y_pred = np.asarray(Y_pred)
+        if Y_pred.ndim == 2 and Y_pred.shape[1] == 1:
+            Y_pred = Y_pred.ravel()
+        return Y_pred
+
+    def collect_prediction(self, ml_model: MLModel, X) -> np.ndarray:
+        """Runs the inference of the model over all rows of X
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X: Data used as model input
+
+        Returns:
+            np.ndarray: Prediction vector with one entry for each row of X
+        """
+        if ml_model.model_technology == ModelTechnology.general_from_onnx.value:
+            Y_pred = self.onnx_inference_repo.predict(ml_model.model_object, X)
+        else:
+            Y_pred = ml_model.model_object.predict(X)
+        return self.to_prediction_vector(Y_pred)
+
+    def collect_prediction_by_fold(self, ml_model: MLModel, X_test, fold_ids: np.ndarray, n_folds: int = None) -> np.ndarray:
+        """Runs one inference for each fold and gathers the results in a prediction vector aligned with the test data rows. Rows already grouped by fold (as in a FoldLayout) are predicted through slices of X_test, without copying each fold."""
+        Y_pred_all = None
+        fold_counts = np.bincount(fold_ids, minlength=n_folds or self.n_splits)
+        fold_bounds = np.cumsum(fold_counts)[:-1]
+        if np.all(fold_ids[1:] >= fold_ids[:-1]):
+            fold_rows = [slice(start, stop) for start, stop in zip(np.concatenate([[0], fold_bounds]), np.cumsum(fold_counts))]
+        else:
+            fold_rows = np.split(np.argsort(fold_ids, kind="stable"), fold_bounds)
+        for test_index in fold_rows:
+            Y_pred = self.collect_prediction(ml_model, X_test.iloc[test_index])
+            if Y_pred_all is None:
+                Y_pred_all = np.empty((len(fold_ids),) + Y_pred.shape[1:], dtype=Y_pred.dtype)
+            Y_pred_all[test_index] = Y_pred
+        return Y_pred_all
+
+    def get_cached_prediction(self, ml_model: MLModel, data_fingerprint: str) -> Union[np.ndarray, None]:
+        """Returns the prediction vector cached for the model and test data, or None if there is no cache or no entry"""
+        if self.prediction_cache is None or data_fingerprint is None:
+            return None
+        fingerprint = model_fingerprint(ml_model)
+        if fingerprint is None:
+            return None
+        return self.prediction_cache.get(fingerprint, data_fingerprint)
+
+    def cache_prediction(self, ml_model: MLModel, data_fingerprint: str, Y_pred_all: np.ndarray) -> None:
+        """Stores the prediction vector of the model over the test data when a cache is configured"""
+        if self.prediction_cache is None or data_fingerprint is None:
+            return
+        fingerprint = model_fingerprint(ml_model)
+        if fingerprint is not None:
+            self.prediction_cache.put(fingerprint, data_fingerprint, Y_pred_all)
+
+    def score(self, ml_model: MLModel, X_test, y_test, fold_ids: np.ndarray, data_fingerprint: str = None, n_folds: int = None) -> dict:
+        """Computes the performance metrics of all folds of one context
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X_test (pd.DataFrame): Test data used as model input
+            y_test (pd.DataFrame): Expected values of the test data
+            fold_ids (np.ndarray): Fold of each row of the test data
+            data_fingerprint (str, optional): Fingerprint of the test data, used to look up the prediction cache. Defaults to None.
+            n_folds (int, optional): Number of folds in fold_ids, when the rows are only part of the folds. None uses n_splits. Defaults to None.
+
+        Returns:
+            dict: List with the metric value of each fold by performance metric
+        """
+        Y_all = y_test.values.ravel()
+        Y_pred_all = self.get_cached_prediction(ml_model, data_fingerprint)
+        if Y_pred_all is None:
+            if self.predict_once:
+                Y_pred_all = self.collect_prediction(ml_model, X_test)
+            else:
+                Y_pred_all = self.collect_prediction_by_fold(ml_model, X_test, fold_ids, n_folds)
+            self.cache_prediction(ml_model, data_fingerprint, Y_pred_all)
+
+        fold_scores = self.fold_metric_repo.compute_many(self.scores_target, Y_all, Y_pred_all, fold_ids, n_folds or self.n_splits)
+        return {score_target: values.tolist() for score_target, values in fold_scores.items()}
+
+    def score_bootstrap(self, ml_model: MLModel, X_test, y_test, replicates: np.ndarray, data_fingerprint: str = None) -> dict:
+        """Computes the performance metrics of bootstrap replicates of the test data of one context, from a single inference over the full test data. The weight matrix of the replicates is generated and scored in blocks, bounding its memory.
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X_test (pd.DataFrame): Test data used as model input
+            y_test (pd.DataFrame): Expected values of the test data
+            replicates (np.ndarray): Index of each replicate to be scored
+            data_fingerprint (str, optional): Fingerprint of the test data, used to look up the prediction cache. Defaults to None.
+
+        Returns:
+            dict: List with the metric value of each replicate by performance metric
+        """
+        Y_all = y_test.values.ravel()
+        Y_pred_all = self.get_cached_prediction(ml_model, data_fingerprint)
+        if Y_pred_all is None:
+            Y_pred_all = self.collect_prediction(ml_model, X_test)
+            self.cache_prediction(ml_model, data_fingerprint, Y_pred_all)
+
+        results = {score_target: [] for score_target in self.scores_target}
+        for block in replicate_blocks(replicates, len(Y_all)):
+            weights = bootstrap_weights(self.random_state, len(Y_all), block)
+            for score_target, values in self.fold_metric_repo.compute_weighted(self.scores_target, Y_all, Y_pred_all, weights).items():
+                results[score_target].extend(values.tolist())
+        return results
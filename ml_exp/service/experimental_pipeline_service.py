@@ -1,7 +1,10 @@
+from itertools import combinations
 from pathlib import Path
 
 from ml_exp.service.statistical_pipeline_service import StatisticalPipelineService
+from ml_exp.service.prepare_context_service import SCORES_GREATER_IS_BETTER
 from ml_exp.model.report import GeneralReport, GeneralReportByScore
+from ml_exp.repository.score_matrix_repository import ScoreMatrixRepository
 from ml_exp.utils.log_config import LogService, handle_exceptions
 from ml_exp.service.interfaces.interface_experimental_pipeline_service import IExperimentalPipelineService
 
@@ -11,11 +14,39 @@ class ExperimentalPipelineService(IExperimentalPipelineService):
     """
     __log_service = LogService()
     def __init__(self,
-                 scores_data: list) -> None:
+                 scores_data: list,
+                 alpha: float = 0.05,
+                 baseline_context: str = None) -> None:
+        """
+        Args:
+            scores_data (list): Metric values of each context by performance metric
+            alpha (float, optional): Significance level of the statistical tests. Defaults to 0.05.
+            baseline_context (str, optional): Champion context. When given, each challenger is tested only against the champion and is promoted only if it significantly beats it. Defaults to None.
+        """
         self.general_report = GeneralReport()
         self.scores_data = scores_data
+        self.alpha = alpha
+        self.baseline_context = baseline_context
         self.__logger = self.__log_service.get_logger(__name__)
 
+    @classmethod
+    def from_scores_file(cls, path: str, alpha: float = None, baseline_context: str = None) -> "ExperimentalPipelineService":
+        """Creates the service over the metric values of a file written by export_scores_data, to re-run the statistical tests without scoring the contexts again
+
+        Args:
+            path (str): Score matrix file (.npz)
+            alpha (float, optional): Significance level of the statistical tests. None uses the one of the exported run. Defaults to None.
+            baseline_context (str, optional): Champion context. None uses the one of the exported run. Defaults to None.
+
+        Returns:
+            ExperimentalPipelineService: Service ready to run_pipeline
+        """
+        score_file = ScoreMatrixRepository().load(path)
+        metadata = score_file["metadata"]
+        return cls(scores_data=score_file["scores_data"],
+                   alpha=metadata.get("alpha", 0.05) if alpha is None else alpha,
+                   baseline_context=metadata.get("baseline_context") if baseline_context is None else baseline_context)
+
     @handle_exceptions(__log_service.get_logger(__name__))
     def _process_ab_tests_results(self, report_by_score: GeneralReportByScore) -> None:
         """Generates a report based on test results related with specific metric, indicating whether the model needs to be adjusted.
@@ -23,6 +54,10 @@ class ExperimentalPipelineService(IExperimentalPipelineService):
         Args:
             general_report (GeneralReportByScore): Result of Hypho tests applied in the logic of the continuous experimentation treadmill around some specific metric
         """
+        if self.baseline_context is not None:
+            self._process_champion_results(report_by_score)
+            return
+
         significant_differences = False
 
         # Check ANOVA or Kruskal-Wallis for decision
@@ -85,7 +120,7 @@ class ExperimentalPipelineService(IExperimentalPipelineService):
         model_with_max_result = None
         model_with_min_result = None
 
-        if report_by_score.score_target in ["accuracy", "roc_auc", "precision_recall", "r2"]:
+        if report_by_score.score_target in SCORES_GREATER_IS_BETTER:
             for model_result in report_by_score.score_described:
                 median_model = model_result.median
                 if median_model > max_result:
@@ -150,12 +185,59 @@ class ExperimentalPipelineService(IExperimentalPipelineService):
                         model_with_max_result = model_with_max_median
             return model_with_max_result, f"Best model based on the median: {model_with_max_result} with median {max_result} around {report_by_score.score_target}"
     
+    @handle_exceptions(__log_service.get_logger(__name__))
+    def _process_champion_results(self, report_by_score: GeneralReportByScore) -> None:
+        """Promotes the challenger with the best median among the ones significantly better than the champion, keeping the champion when no challenger beats it
+
+        Args:
+            report_by_score (GeneralReportByScore): Result of Hypho tests applied with the champion as baseline around some specific metric
+        """
+        champion = self.baseline_context
+        score_target = report_by_score.score_target
+        ab_tests = report_by_score.ab_tests
+        track = ab_tests.pipeline_track
+        significant_contexts, test_name = set(), None
+
+        if "perform_turkey" in track:
+            # pairwise_tukeyhsd orders the pairs as the combinations of the sorted context names
+            test_name = "Tukey"
+            for (context_name_1, context_name_2), reject in zip(combinations(sorted(self.scores_data[score_target]), 2), ab_tests.turkey.reject):
+                if reject and champion in (context_name_1, context_name_2):
+                    significant_contexts.add(context_name_2 if context_name_1 == champion else context_name_1)
+        elif "perform_mannwhitney" in track or "perform_mannwhitney_with_bh_correction" in track:
+            test_name = "Mann-Whitney"
+            for result in ab_tests.mannwhitney:
+                if result.is_significant and champion in (result.context_name_1, result.context_name_2):
+                    significant_contexts.add(result.context_name_2 if result.context_name_1 == champion else result.context_name_1)
+        elif "perform_t_student" in track or "perform_welch" in track:
+            test_name, result = ("T-Student", ab_tests.tstudent) if "perform_t_student" in track else ("Welch Test", ab_tests.welch)
+            if result.is_significant:
+                significant_contexts.add(result.context_name_2 if result.context_name_1 == champion else result.context_name_1)
+
+        medians = {score.context_name: score.median for score in report_by_score.score_described}
+        greater_is_better = score_target in SCORES_GREATER_IS_BETTER
+        challengers = [context_name for context_name in significant_contexts
+                       if (medians[context_name] > medians[champion] if greater_is_better else medians[context_name] < medians[champion])]
+
+        if challengers:
+            best_challenger = (max if greater_is_better else min)(challengers, key=lambda context_name: medians[context_name])
+            self.general_report.message_about_significancy.append(f"Challenger {best_challenger} significantly beats the champion {champion} ({test_name}) around {score_target}.")
+            self.general_report.better_context_by_score.append(f"Best median-based context: {best_challenger} with median {medians[best_challenger]} around {score_target}")
+            self.general_report.best_context_index = best_challenger
+        else:
+            self.general_report.message_about_significancy.append(f"No challenger significantly beats the champion {champion} around {score_target}.")
+            self.general_report.better_context_by_score.append(f"Champion {champion} is kept with median {medians[champion]} around {score_target}")
+            self.general_report.best_context_index = champion
+
     @handle_exceptions(__log_service.get_logger(__name__))
     def run_pipeline(self):
         """Apply the Hypho testing pipeline service that will perform the orchestration according to the adopted methodology, after which it will process the results of these tests to generate a suggestion about better models around each metric.
         """
         for score_name, scores in self.scores_data.items():
-            exp_cont = StatisticalPipelineService(scores_data=scores, score_target=score_name)
+            exp_cont = StatisticalPipelineService(scores_data=scores,
+                                                  score_target=score_name,
+                                                  alpha=self.alpha,
+                                                  baseline_context=self.baseline_context)
             exp_cont.run_pipeline()
             report_by_score = exp_cont.get_report()
             self.general_report.reports_by_score.append(report_by_score)
@@ -187,3 +269,21 @@ class ExperimentalPipelineService(IExperimentalPipelineService):
             filepath = report_folder / report_name
             with filepath.open("w", encoding ="utf-8") as f:
                 f.write(general_report_by_score.json())
+
+    def export_scores_data(self, report_path: str = "reports", fold_sizes: dict = None, metadata: dict = None) -> str:
+        """Export the metric values of every context and fold, for all performance metrics, as a columnar scores.npz file that from_scores_file reloads
+
+        Args:
+            report_path (str, optional): Location where the file will be generated. Defaults to "reports".
+            fold_sizes (dict, optional): Vector with the size of each fold by context name. Defaults to None.
+            metadata (dict, optional): Settings of the run stored with the scores, such as seeds and number of folds. Defaults to None.
+
+        Returns:
+            str: Path of the file generated
+        """
+        run_metadata = {"alpha": self.alpha, "baseline_context": self.baseline_context, **(metadata or {})}
+        filepath = ScoreMatrixRepository().save(Path("./") / report_path / "scores.npz",
+                                                scores_data=self.scores_data,
+                                                fold_sizes=fold_sizes,
+                                                metadata=run_metadata)
+        return str(filepath)
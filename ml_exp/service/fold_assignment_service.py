@@ -0,0 +1,124 @@
+import os
+from pathlib import Path
+from typing import Union
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, KFold
+
+from ml_exp.service.interfaces.interface_fold_assignment_service import IFoldAssignmentService
+from ml_exp.utils.fold_assignment import fast_fold_ids
+from ml_exp.utils.log_config import LogService
+
+FOLD_STRATEGIES = ["sklearn", "fast"]
+
+
+class FoldAssignmentService(IFoldAssignmentService):
+    """Generates the fold assignment of each test data once, as a compact int32 vector with the fold of each row, and shares it with every context that references the same test data. When a cache folder is given, assignments are also persisted by the fingerprint of the test data and reused in later runs.
+    """
+    __log_service = LogService()
+
+    def __init__(self,
+                 n_splits: int,
+                 random_state: int = 42,
+                 stratified: bool = True,
+                 cache_dir: Union[str, Path] = None,
+                 fold_strategy: str = "sklearn") -> None:
+        """
+        Args:
+            n_splits (int): Number of folds
+            random_state (int, optional): Seed used to shuffle the folds. Defaults to 42.
+            stratified (bool, optional): Keeps the class proportions in every fold (StratifiedKFold), otherwise uses KFold. Defaults to True.
+            cache_dir (Union[str, Path], optional): Folder where assignments are persisted by data fingerprint. Defaults to None.
+            fold_strategy (str, optional): How the folds are generated. "sklearn" uses StratifiedKFold or KFold; "fast" shuffles the rows and deals each class to the folds round-robin in linear time, without the train indices of every split, for large test data, many classes or many folds. The strategies give different assignments with the same seed. Defaults to "sklearn".
+        """
+        if fold_strategy not in FOLD_STRATEGIES:
+            raise ValueError(f"fold_strategy need to be one of {FOLD_STRATEGIES}. Current fold_strategy: {fold_strategy}")
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.stratified = stratified
+        self.fold_strategy = fold_strategy
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fold_ids_by_name = {}
+        self.fold_ids_by_fingerprint = {}
+        self.fold_ids_by_frames = {}  # (id of X_test, id of y_test) -> frames and their fold ids
+
+    @property
+    def strategy(self) -> str:
+        strategy = "stratified" if self.stratified else "kfold"
+        return strategy if self.fold_strategy == "sklearn" else f"{strategy}_{self.fold_strategy}"
+
+    def _cache_path(self, data_fingerprint: str) -> Path:
+        return self.cache_dir / f"folds_{data_fingerprint}_{self.strategy}_{self.n_splits}_{self.random_state}.npy"
+
+    def generate_fold_ids(self, X_test, y_test) -> np.ndarray:
+        """Assigns each row of the test data to the fold where it is used as test sample
+
+        Args:
+            X_test: Test data used as model input
+            y_test: Expected values of the test data
+
+        Returns:
+            np.ndarray: Fold of each row (int32)
+        """
+        if self.fold_strategy == "fast":
+            return fast_fold_ids(y_test, n_splits=self.n_splits, random_state=self.random_state, stratified=self.stratified)
+        splitter = (
+            StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+            if self.stratified
+            else KFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+        )
+        fold_ids = np.empty(len(X_test), dtype=np.int32)
+        for fold, (train_index, test_index) in enumerate(splitter.split(X=X_test, y=y_test)):
+            fold_ids[test_index] = fold
+        return fold_ids
+
+    def _load(self, data_fingerprint: str, n_rows: int) -> Union[np.ndarray, None]:
+        try:
+            fold_ids = np.load(self._cache_path(data_fingerprint), allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        return fold_ids if len(fold_ids) == n_rows else None
+
+    def _save(self, data_fingerprint: str, fold_ids: np.ndarray) -> None:
+        cache_path = self._cache_path(data_fingerprint)
+        temporary_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp")
+        with open(temporary_path, "wb") as fp:
+            np.save(fp, fold_ids, allow_pickle=False)
+        os.replace(temporary_path, cache_path)
+
+    def get_fold_ids(self, test_data_name: str, X_test, y_test, data_fingerprint: str = None) -> np.ndarray:
+        """Get the fold of each row of a test data. The assignment is generated once per test data name, shared between names with the same fingerprint or the same frames, and loaded from or saved to the cache folder when one is configured.
+
+        Args:
+            test_data_name (str): Name of the test data
+            X_test: Test data used as model input
+            y_test: Expected values of the test data
+            data_fingerprint (str, optional): Content hash of the test data. Defaults to None.
+
+        Returns:
+            np.ndarray: Fold of each row (int32)
+        """
+        if test_data_name in self.fold_ids_by_name:
+            return self.fold_ids_by_name[test_data_name]
+
+        fold_ids = self.fold_ids_by_fingerprint.get(data_fingerprint) if data_fingerprint else None
+        if fold_ids is None:
+            # names deduplicated to the same frames share the assignment even without fingerprints
+            shared = self.fold_ids_by_frames.get((id(X_test), id(y_test)))
+            if shared is not None and shared[0] is X_test and shared[1] is y_test:
+                fold_ids = shared[2]
+        if fold_ids is None and data_fingerprint and self.cache_dir:
+            fold_ids = self._load(data_fingerprint, len(X_test))
+        if fold_ids is None:
+            fold_ids = self.generate_fold_ids(X_test, y_test)
+            if data_fingerprint and self.cache_dir:
+                self._save(data_fingerprint, fold_ids)
+
+        fold_ids.setflags(write=False)
+        self.fold_ids_by_name[test_data_name] = fold_ids
+        self.fold_ids_by_frames[(id(X_test), id(y_test))] = (X_test, y_test, fold_ids)
+        if data_fingerprint:
+            self.fold_ids_by_fingerprint[data_fingerprint] = fold_ids
+        return fold_ids
@@ -1,11 +1,26 @@
-from sklearn.model_selection import StratifiedKFold, KFold
-from sklearn.metrics import accuracy_score, roc_auc_score, mean_absolute_error, mean_squared_error, r2_score, average_precision_score
+import os
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Union
 import numpy as np
 
 from ml_exp.service.interfaces.interface_generate_score_service import IGenerateScoreService
+from ml_exp.service.context_scoring_service import ContextScoringService
+from ml_exp.service.streaming_score_service import StreamingScoreService
+from ml_exp.service.fold_assignment_service import FoldAssignmentService
+from ml_exp.service.scoring_worker_pool import ScoringWorkerPool
+from ml_exp.service.interfaces.interface_fold_assignment_service import IFoldAssignmentService
+from ml_exp.service.interfaces.interface_test_data_service import ILoadTestDataService
+from ml_exp.service.interfaces.interface_prepare_context_service import IPrepareContextService
 from ml_exp.utils.log_config import LogService, handle_exceptions
 from ml_exp.model.ml_model import ModelTechnology
 from ml_exp.service.prepare_context_service import SCORES_REGRESSION
+from ml_exp.repository.interfaces.prediction_cache_repository import IPredictionCacheRepository
+from ml_exp.repository.shared_test_data_repository import SharedTestDataRepository
+from ml_exp.utils.fingerprint import model_fingerprint
+from ml_exp.utils.fold_layout import FoldLayout
+
+EXECUTORS = ["thread", "process"]
+RESAMPLING = ["kfold", "bootstrap"]
 
 class GenerateScoreService(IGenerateScoreService):
     __log_service = LogService()
@@ -15,17 +30,70 @@ class GenerateScoreService(IGenerateScoreService):
                  test_data: dict,
                  scores_target: str,
                  n_splits: int,
-                 random_state: int = 42) -> None:
+                 random_state: int = 42,
+                 predict_once: bool = True,
+                 onnx_batch_size: int = 1024,
+                 n_jobs: int = 1,
+                 executor: Union[str, Executor] = "thread",
+                 prediction_cache: IPredictionCacheRepository = None,
+                 data_fingerprints: dict = None,
+                 streaming_test_data_service: ILoadTestDataService = None,
+                 fold_assignment_service: IFoldAssignmentService = None,
+                 prepare_context_service: IPrepareContextService = None,
+                 defer_scoring: bool = False,
+                 resampling: str = "kfold",
+                 share_test_data: bool = True) -> None:
+        """Generates the performance metric values of each context for each fold of its test data.
+
+        Args:
+            experiments (dict): Contexts to be scored, with the model loaded and the name of the test data referenced
+            test_data (dict): Test data available by name
+            scores_target (str): Performance metrics to be collected
+            n_splits (int): Number of folds generated from each test data
+            random_state (int, optional): Seed used to shuffle the folds. Defaults to 42.
+            predict_once (bool, optional): Runs the inference over the full test data once per context and builds the metrics of every fold by indexing the prediction vector, instead of one inference for each fold. Defaults to True.
+            onnx_batch_size (int, optional): Number of rows sent in each run call of ONNX sessions. Defaults to 1024.
+            n_jobs (int, optional): Number of contexts scored concurrently. -1 uses all CPUs. Defaults to 1.
+            executor (Union[str, Executor], optional): Pool used when n_jobs is not 1, "thread" or "process", or an already created Executor that is reused and not shut down. A ScoringWorkerPool receives only a handle of each model, loaded once and cached by its workers. Defaults to "thread".
+            prediction_cache (IPredictionCacheRepository, optional): Cache of predictions by model and test data fingerprints, so only contexts whose model or test data changed run the inference. Defaults to None.
+            data_fingerprints (dict, optional): Fingerprint of each test data by name, needed to use the prediction cache. Defaults to None.
+            streaming_test_data_service (ILoadTestDataService, optional): Service holding test data read chunk by chunk. Contexts referencing them are scored without loading the whole data. Defaults to None.
+            fold_assignment_service (IFoldAssignmentService, optional): Service that generates and shares the fold of each row of every test data. None creates one for this run. Defaults to None.
+            prepare_context_service (IPrepareContextService, optional): Service holding the contexts, used to load lazy models right before their scoring and release them after it. With it, at most n_jobs contexts are in flight at a time. Defaults to None.
+            defer_scoring (bool, optional): Only prepares the contexts, leaving the scoring to score_folds calls, to score the folds in increments. Defaults to False.
+            resampling (str, optional): How the metric samples are drawn from the test data. "kfold" scores n_splits disjoint folds and "bootstrap" scores n_splits bootstrap replicates of the whole test data, all from a single inference (Poisson bootstrap for streaming test data). Defaults to "kfold".
+            share_test_data (bool, optional): When contexts are scored in worker processes, places each numeric test data once in shared memory and sends the workers read-only views of it, instead of a pickled copy for every context. Defaults to True.
+        """
         self.__logger = self.__log_service.get_logger(__name__)
         self.__is_regression = all(score in SCORES_REGRESSION for score in scores_target)
-        self.__kf = (
-            KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
-            if self.__is_regression
-            else StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
-        )
+        self.__fold_assignment_service = fold_assignment_service or FoldAssignmentService(n_splits=n_splits,
+                                                                                          random_state=random_state,
+                                                                                          stratified=not self.__is_regression)
+        self.__n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self.__executor = executor
+        self.__share_test_data = share_test_data
+        self.__prepare_context_service = prepare_context_service
+        self.__context_scoring_service = ContextScoringService(scores_target=scores_target,
+                                                               n_splits=n_splits,
+                                                               predict_once=predict_once,
+                                                               onnx_batch_size=onnx_batch_size,
+                                                               prediction_cache=prediction_cache,
+                                                               random_state=random_state)
         self.scores = {}
         self.experiments = experiments
         self.test_data = test_data
+        self.data_fingerprints = data_fingerprints or {}
+
+        if isinstance(executor, str) and executor not in EXECUTORS:
+            raise ValueError(f"executor need to be one of {EXECUTORS} or an Executor instance. Current executor: {executor}")
+        if self.__n_jobs < 1:
+            raise ValueError(f"n_jobs need to be a positive integer or -1. Current n_jobs: {n_jobs}")
+        if resampling not in RESAMPLING:
+            raise ValueError(f"resampling need to be one of {RESAMPLING}. Current resampling: {resampling}")
+        self.__bootstrap = resampling == "bootstrap"
+        self.n_splits = n_splits
+        self.__fold_layouts = {}
+        self.__score_task = self.__context_scoring_service.score_bootstrap if self.__bootstrap else self.__context_scoring_service.score
 
         for score_target in scores_target:
             self.scores[score_target] = {}
@@ -33,51 +101,206 @@ class GenerateScoreService(IGenerateScoreService):
             for experiment_name in self.experiments.keys():
                 self.scores[score_target][experiment_name] = []
 
+        # folds are assigned here, before any dispatch, so concurrent runs see the same folds as the serial run
+        tasks = {}
+        streaming_experiments = {}
         for experiment_name, experiment_data in self.experiments.items():
-            ml_model = experiment_data['ml_model']
+            if experiment_data['test_data_name'] not in self.test_data:
+                if (streaming_test_data_service is None
+                        or experiment_data['test_data_name'] not in streaming_test_data_service.get_all_streaming_test_data()):
+                    raise ValueError(f"Test data '{experiment_data['test_data_name']}' referenced by context '{experiment_name}' not found.")
+                streaming_experiments[experiment_name] = experiment_data
+                continue
             test_data_for_experiment = self.test_data[experiment_data['test_data_name']]
             X_test = test_data_for_experiment['x_test']
             y_test = test_data_for_experiment['y_test']
+            data_fingerprint = self.data_fingerprints.get(experiment_data['test_data_name'])
+            if prediction_cache is not None or isinstance(self.__executor, ScoringWorkerPool):
+                # checked in every run, so a model refit in place is not served stale predictions or a stale worker model, but hashed
+                # again only when the model changed; kept in the model, so workers receive it ready
+                model_fingerprint(experiment_data['ml_model'], refresh=True)
+            if self.__bootstrap:
+                # every replicate resamples all rows, the task holds the replicates to score
+                tasks[experiment_name] = (experiment_data['ml_model'], X_test, y_test, np.arange(n_splits), data_fingerprint)
+                continue
+            fold_ids = self.__fold_assignment_service.get_fold_ids(test_data_name=experiment_data['test_data_name'],
+                                                                   X_test=X_test,
+                                                                   y_test=y_test,
+                                                                   data_fingerprint=data_fingerprint)
+            tasks[experiment_name] = (experiment_data['ml_model'], X_test, y_test, fold_ids, data_fingerprint)
 
-            data_test_split = self.__kf.split(X=X_test, y=y_test)
-        
-            for i, (train_index, test_index) in enumerate(data_test_split):
-                X_fold, Y_fold = X_test.iloc[test_index], y_test.iloc[test_index]
-                Y_fold = Y_fold.values.ravel()
-                Y_pred = self.__collect_prediction_from_model(ml_model, X_fold)
-                self.__collect_metric_result(ml_model, Y_fold, Y_pred)
-
-    def __collect_prediction_from_model(self, model, X_fold):
-        if model.model_technology == ModelTechnology.general_from_onnx.value:
-            input_name = model.model_object.get_inputs()[0].name
-            output_name = model.model_object.get_outputs()[0].name
-            Y_pred_list = []
-            for i in range(len(X_fold)):
-                input_data = X_fold[i:i+1].astype(np.float32).to_numpy()
-                output_data = model.model_object.run([output_name], {input_name: input_data})
-                Y_pred_list.append(output_data[0][0])
-            Y_pred = np.array(Y_pred_list)
-        else:
-            Y_pred = model.model_object.predict(X_fold)
-        return Y_pred
-                
-    def __collect_metric_result(self, model, Y_fold, Y_pred):
-        """Collects metrics for the given model and test data."""
-        for score_target in self.scores.keys():
-            if score_target == "accuracy":
-                self.scores[score_target][model.context_name].append(accuracy_score(Y_fold, Y_pred))
-            elif score_target == "precision_recall":
-                self.scores[score_target][model.context_name].append(average_precision_score(Y_fold, Y_pred))
-            elif score_target == "roc_auc":
-                self.scores[score_target][model.context_name].append(roc_auc_score(Y_fold, Y_pred))
-            elif score_target == "mae":
-                self.scores[score_target][model.context_name].append(mean_absolute_error(Y_fold, Y_pred))
-            elif score_target == "mse":
-                self.scores[score_target][model.context_name].append(mean_squared_error(Y_fold, Y_pred))
-            elif score_target == "r2":
-                self.scores[score_target][model.context_name].append(r2_score(Y_fold, Y_pred))
-            else:
-                raise ValueError(f"Metric {score_target} not supported. Only accuracy, precision_recall, roc_auc, mae, mse, and r2 are supported.")
+        self.__tasks = tasks
+        self.__streaming_experiments = streaming_experiments
+        self.__streaming_score_service = StreamingScoreService(load_test_data_service=streaming_test_data_service,
+                                                               context_scoring_service=self.__context_scoring_service,
+                                                               scores_target=scores_target,
+                                                               n_splits=n_splits,
+                                                               random_state=random_state,
+                                                               stratified=not self.__is_regression,
+                                                               prepare_context_service=prepare_context_service,
+                                                               resampling=resampling)
+
+        if not defer_scoring:
+            self.score_folds()
+
+    def score_folds(self, folds: list[int] = None, contexts: list[str] = None) -> None:
+        """Scores the contexts on some folds, appending the metric value of each fold to the scores, in the order of the folds given. Only the rows of those folds are predicted. With bootstrap resampling the folds are the replicates, each one over all rows.
+
+        Args:
+            folds (list[int], optional): Folds (or bootstrap replicates) to be scored, between 0 and n_splits - 1. None scores all folds. Defaults to None.
+            contexts (list[str], optional): Contexts to be scored. None scores all contexts. Defaults to None.
+
+        Raises:
+            ValueError: If only part of the folds is requested for contexts over streaming test data
+        """
+        tasks = {name: task for name, task in self.__tasks.items() if contexts is None or name in contexts}
+        streaming_experiments = {name: experiment for name, experiment in self.__streaming_experiments.items()
+                                 if contexts is None or name in contexts}
+
+        if folds is not None:
+            if streaming_experiments:
+                raise ValueError(f"Contexts {list(streaming_experiments)} use streaming test data, which can only be scored on all folds at once.")
+            folds = np.asarray(folds, dtype=np.int32)
+            selections = {}
+            tasks = {name: self.__fold_subset_task(task, folds, selections) for name, task in tasks.items()}
+
+        context_results = self.__score_contexts(tasks)
+        if streaming_experiments:
+            context_results.update(self.__streaming_score_service.score(streaming_experiments))
+
+        for experiment_name, context_scores in context_results.items():
+            for score_target, fold_scores in context_scores.items():
+                self.scores[score_target][experiment_name].extend(fold_scores)
+
+    def __fold_subset_task(self, task: tuple, folds: np.ndarray, selections: dict) -> tuple:
+        """Keeps only the rows of the given folds, grouped by fold and renumbering the folds in the order given. The rows are gathered from the fold layout of the test data once for all contexts of the same test data, and released with the tasks after their scoring. The prediction cache is keyed by the full test data, so it is used only when every fold is selected in order. Bootstrap replicates keep all rows, so they keep the cache."""
+        if self.__bootstrap:
+            return task[:3] + (folds,) + task[4:]
+        ml_model, X_test, y_test, fold_ids, data_fingerprint = task
+        layout = self.__fold_layout(X_test, y_test, fold_ids)
+        if id(layout) not in selections:
+            selections[id(layout)] = layout.select(folds)
+        all_folds = np.array_equal(folds, np.arange(self.n_splits))
+        data_fingerprint = f"{data_fingerprint}_{layout.key}" if data_fingerprint and all_folds else None
+        return (ml_model, *selections[id(layout)], data_fingerprint, len(folds))
+
+    def __fold_layout(self, X_test, y_test, fold_ids: np.ndarray) -> FoldLayout:
+        """Fold layout of a test data, built once and shared by every context with the same fold assignment. It holds only index arrays, the test data stays the one of the contexts"""
+        entry = self.__fold_layouts.get(id(fold_ids))
+        if entry is not None and entry[0] is fold_ids:
+            return entry[1]
+        layout = FoldLayout(X_test, y_test, fold_ids, self.n_splits)
+        self.__fold_layouts[id(fold_ids)] = (fold_ids, layout)
+        return layout
+
+    def __score_contexts(self, tasks: dict) -> dict:
+        """Scores every context, serially or through the configured executor, returning the results in the order the contexts were added."""
+        if isinstance(self.__executor, str) and self.__n_jobs == 1:
+            results = {}
+            for name, task in tasks.items():
+                try:
+                    results[name] = self.__score_task(*self.__acquire(name, task))
+                finally:
+                    self.__release(name)
+            return results
+
+        if isinstance(self.__executor, Executor):
+            if not isinstance(self.__executor, (ProcessPoolExecutor, ScoringWorkerPool)):
+                return self.__submit_tasks(self.__executor, tasks)
+            return self.__submit_shared_tasks(self.__executor, tasks)
+
+        if self.__executor == "process":
+            self.__validate_models_for_process_pool(tasks)
+            with ProcessPoolExecutor(max_workers=self.__n_jobs) as executor:
+                return self.__submit_shared_tasks(executor, tasks)
+
+        with ThreadPoolExecutor(max_workers=self.__n_jobs) as executor:
+            return self.__submit_tasks(executor, tasks)
+
+    def __submit_tasks(self, executor: Executor, tasks: dict) -> dict:
+        if self.__prepare_context_service is None:
+            futures = {name: self.__submit(executor, task) for name, task in tasks.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+        # models are loaded in this process right before dispatch, keeping at most n_jobs contexts in flight
+        results, pending = {}, {}
+        for name, task in tasks.items():
+            while len(pending) >= self.__n_jobs:
+                self.__collect_done(pending, results)
+            try:
+                pending[self.__submit(executor, self.__acquire(name, task))] = name
+            except Exception:
+                self.__release(name)
+                raise
+        while pending:
+            self.__collect_done(pending, results)
+        return {name: results[name] for name in tasks}
+
+    def __submit_shared_tasks(self, executor: Executor, tasks: dict) -> dict:
+        """Submits to worker processes, sending the test data of the tasks as handles of shared memory blocks written once, removed when every context was scored"""
+        if not self.__share_test_data:
+            return self.__submit_tasks(executor, tasks)
+        shared_test_data_repo = SharedTestDataRepository()
+        try:
+            return self.__submit_tasks(executor, {name: self.__shared_task(shared_test_data_repo, task) for name, task in tasks.items()})
+        finally:
+            shared_test_data_repo.close()
+
+    def __shared_task(self, shared_test_data_repo: SharedTestDataRepository, task: tuple) -> tuple:
+        ml_model, X_test, y_test, fold_ids_or_replicates, *rest = task
+        if not self.__bootstrap:
+            fold_ids_or_replicates = shared_test_data_repo.share_array(fold_ids_or_replicates)
+        return (ml_model, shared_test_data_repo.share_frame(X_test), shared_test_data_repo.share_frame(y_test), fold_ids_or_replicates, *rest)
+
+    def __submit(self, executor: Executor, task: tuple) -> Future:
+        """A ScoringWorkerPool receives only a handle of the model, loaded and cached by its workers"""
+        if isinstance(executor, ScoringWorkerPool):
+            return executor.submit_scoring(self.__score_task, *task)
+        return executor.submit(self.__score_task, *task)
+
+    def __collect_done(self, pending: dict, results: dict) -> None:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            try:
+                results[name] = future.result()
+            finally:
+                self.__release(name)
+
+    def __acquire(self, experiment_name: str, task: tuple) -> tuple:
+        """Makes sure the model of the context is loaded before scoring it"""
+        if self.__prepare_context_service is None:
+            return task
+        return (self.__prepare_context_service.acquire(experiment_name),) + tuple(task[1:])
+
+    def __release(self, experiment_name: str) -> None:
+        if self.__prepare_context_service is not None:
+            self.__prepare_context_service.release(experiment_name)
+
+    @staticmethod
+    def __validate_models_for_process_pool(tasks: dict) -> None:
+        for experiment_name, (ml_model, *_) in tasks.items():
+            if ml_model.model_technology == ModelTechnology.general_from_onnx.value:
+                raise ValueError(f"Context '{experiment_name}' uses an ONNX session, which can not be sent to a process pool. Use executor='thread', that runs ONNX inference without holding the GIL.")
 
     def get_scores_data(self):
-        return self.scores
\ No newline at end of file
+        return self.scores
+
+    def get_fold_sizes(self) -> dict:
+        """Number of test rows in each fold of every context, the sum of the row weights of each replicate with bootstrap resampling. Streaming contexts have their sizes once scored.
+
+        Returns:
+            dict: Vector with the size of each of the n_splits folds by context name
+        """
+        fold_sizes = {}
+        for experiment_name, (_, X_test, _, fold_ids_or_replicates, *_) in self.__tasks.items():
+            if self.__bootstrap:
+                # multinomial replicates always draw as many rows as the test data
+                fold_sizes[experiment_name] = np.full(self.n_splits, len(X_test), dtype=np.int64)
+            else:
+                fold_sizes[experiment_name] = np.bincount(fold_ids_or_replicates, minlength=self.n_splits).astype(np.int64)
+        for experiment_name, experiment_data in self.__streaming_experiments.items():
+            streaming_fold_sizes = self.__streaming_score_service.fold_sizes.get(experiment_data["test_data_name"])
+            if streaming_fold_sizes is not None:
+                fold_sizes[experiment_name] = streaming_fold_sizes
+        return fold_sizes
@@ -0,0 +1,55 @@
+from abc import abstractmethod, ABC
+import numpy as np
+
+from ml_exp.model.ml_model import MLModel
+
+
+class IContextScoringService(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def collect_prediction(self, ml_model: MLModel, X) -> np.ndarray:
+        """Runs the inference of the model over all rows of X
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X: Data used as model input
+
+        Returns:
+            np.ndarray: Prediction vector with one entry for each row of X
+        """
+        pass
+
+    @abstractmethod
+    def score(self, ml_model: MLModel, X_test, y_test, fold_ids: np.ndarray, data_fingerprint: str = None, n_folds: int = None) -> dict:
+        """Computes the performance metrics of all folds of one context
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X_test: Test data used as model input
+            y_test: Expected values of the test data
+            fold_ids (np.ndarray): Fold of each row of the test data
+            data_fingerprint (str, optional): Fingerprint of the test data, used to look up the prediction cache. Defaults to None.
+            n_folds (int, optional): Number of folds in fold_ids, when the rows are only part of the folds. None uses n_splits. Defaults to None.
+
+        Returns:
+            dict: List with the metric value of each fold by performance metric
+        """
+        pass
+
+    @abstractmethod
+    def score_bootstrap(self, ml_model: MLModel, X_test, y_test, replicates: np.ndarray, data_fingerprint: str = None) -> dict:
+        """Computes the performance metrics of bootstrap replicates of the test data of one context, from a single inference
+
+        Args:
+            ml_model (MLModel): Model loaded for the context
+            X_test: Test data used as model input
+            y_test: Expected values of the test data
+            replicates (np.ndarray): Index of each replicate to be scored
+            data_fingerprint (str, optional): Fingerprint of the test data, used to look up the prediction cache. Defaults to None.
+
+        Returns:
+            dict: List with the metric value of each replicate by performance metric
+        """
+        pass
@@ -39,6 +39,15 @@ class IExperimentalPipelineService(ABC):
         """
         pass
     
+    @abstractmethod
+    def _process_champion_results(self, report_by_score: GeneralReportByScore) -> None:
+        """Promotes a challenger only if it significantly beats the champion context, keeping the champion otherwise
+
+        Args:
+            report_by_score (GeneralReportByScore): Result of Hypho tests applied with the champion as baseline around some specific metric
+        """
+        pass
+
     @abstractmethod
     def run_pipeline(self):
         """Apply the Hypho testing pipeline service that will perform the orchestration according to the adopted methodology, after which it will process the results of these tests to generate a suggestion about better models around each metric.
@@ -60,4 +69,17 @@ class IExperimentalPipelineService(ABC):
         Args:
             report_path (str, optional): Location where JSON will be generated. Defaults to "reports".
         """
-        pass
\ No newline at end of file
+        pass
+
+    def export_scores_data(self, report_path: str = "reports", fold_sizes: dict = None, metadata: dict = None) -> str:
+        """Export the metric values of every context and fold, for all performance metrics, as a columnar file
+
+        Args:
+            report_path (str, optional): Location where the file will be generated. Defaults to "reports".
+            fold_sizes (dict, optional): Vector with the size of each fold by context name. Defaults to None.
+            metadata (dict, optional): Settings of the run stored with the scores. Defaults to None.
+
+        Returns:
+            str: Path of the file generated
+        """
+        pass
@@ -0,0 +1,22 @@
+from abc import abstractmethod, ABC
+import numpy as np
+
+
+class IFoldAssignmentService(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def get_fold_ids(self, test_data_name: str, X_test, y_test, data_fingerprint: str = None) -> np.ndarray:
+        """Get the fold of each row of a test data, generating it only once
+
+        Args:
+            test_data_name (str): Name of the test data
+            X_test: Test data used as model input
+            y_test: Expected values of the test data
+            data_fingerprint (str, optional): Content hash of the test data. Defaults to None.
+
+        Returns:
+            np.ndarray: Fold of each row (int32)
+        """
+        pass
@@ -7,4 +7,10 @@ class IGenerateScoreService(ABC):
 
     @abstractmethod
     def get_scores_data(self):
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_fold_sizes(self) -> dict:
+        """Number of test rows in each fold of every context
+        """
+        pass
@@ -25,6 +25,36 @@ class IPrepareContextService(ABC):
                    model_trained: Union[str, BaseEstimator]):
         pass
 
+    @abstractmethod
+    def create_lazy_ml_model(self, context_name: str, model_path: str):
+        """Creates the handle of a model stored in a file without loading it
+        """
+        pass
+
+    @abstractmethod
+    def acquire(self, context_name: str):
+        """Loads the model of a lazy context if it is not resident and pins it until release
+        """
+        pass
+
+    @abstractmethod
+    def release(self, context_name: str) -> None:
+        """Unpins the model of a lazy context once its predictions are done
+        """
+        pass
+
+    @abstractmethod
+    def evict(self, incoming_bytes: int = None) -> None:
+        """Unloads released lazy models until the resident models fit the limits
+        """
+        pass
+
+    @abstractmethod
+    def add_contexts_many(self, contexts: dict, max_workers: int = None) -> dict:
+        """Adds several contexts at once, loading their models concurrently and raising the failures together at the end
+        """
+        pass
+
     @abstractmethod
     def add_context(self,
                     context_name: str,
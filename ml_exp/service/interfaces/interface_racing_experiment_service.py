@@ -0,0 +1,28 @@
+from abc import abstractmethod, ABC
+import numpy as np
+
+
+class IRacingExperimentService(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def find_eliminated(self, score_matrix: np.ndarray) -> np.ndarray:
+        """Runs the Friedman test over the folds scored by the contexts still racing and the post-hoc comparison against the leader
+
+        Args:
+            score_matrix (np.ndarray): Metric values with one row per fold and one column per context still racing
+
+        Returns:
+            np.ndarray: Whether each context is significantly worse than the leader
+        """
+        pass
+
+    @abstractmethod
+    def run(self) -> dict:
+        """Scores the folds step by step, dropping the contexts significantly worse than the leader from the next folds
+
+        Returns:
+            dict: Metric values of each context by performance metric, for the folds it raced
+        """
+        pass
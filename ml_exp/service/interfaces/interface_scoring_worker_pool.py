@@ -0,0 +1,22 @@
+from abc import abstractmethod, ABC
+from concurrent.futures import Future
+from typing import Callable, Union
+
+from ml_exp.model.ml_model import MLModel
+
+
+class IScoringWorkerPool(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def model_reference(self, ml_model: MLModel) -> Union[MLModel, None]:
+        """Handle of the model without its object, pointing to an artifact file the workers can load and cache by fingerprint
+        """
+        pass
+
+    @abstractmethod
+    def submit_scoring(self, score_task: Callable, ml_model: MLModel, *task) -> Future:
+        """Submits the scoring of a context, sending only the model handle when the workers can load the model themselves
+        """
+        pass
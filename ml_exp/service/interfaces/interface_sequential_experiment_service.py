@@ -0,0 +1,27 @@
+from abc import abstractmethod, ABC
+
+
+class ISequentialExperimentService(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def check_decision(self, alpha: float) -> tuple:
+        """Runs the statistical decision over the folds scored so far
+
+        Args:
+            alpha (float): Significance level of this check
+
+        Returns:
+            tuple: Best context and whether the difference is significant, for each performance metric
+        """
+        pass
+
+    @abstractmethod
+    def run(self) -> dict:
+        """Scores the folds in increments until the decision is stable or every fold is scored
+
+        Returns:
+            dict: Metric values of each context by performance metric, for the folds scored
+        """
+        pass
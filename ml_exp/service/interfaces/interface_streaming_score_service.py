@@ -0,0 +1,18 @@
+from abc import abstractmethod, ABC
+
+
+class IStreamingScoreService(ABC):
+    def __init__(self) -> None:
+        super().__init__()
+
+    @abstractmethod
+    def score(self, experiments: dict) -> dict:
+        """Scores the contexts whose test data is read chunk by chunk
+
+        Args:
+            experiments (dict): Contexts to be scored, with the model loaded and the name of the streaming test data referenced
+
+        Returns:
+            dict: For each context, the list with the metric value of each fold by performance metric
+        """
+        pass
@@ -1,7 +1,7 @@
 from abc import abstractmethod, ABC
 import pandas as pd
 from pathlib import Path
-from typing import Union
+from typing import Iterator, Union
 
 
 class ILoadTestDataService(ABC):
@@ -26,7 +26,33 @@ class ILoadTestDataService(ABC):
                       X_test: Union[pd.DataFrame, str],
                       y_test: Union[pd.DataFrame, str]):
         pass
+
+    @abstractmethod
+    def add_test_data_many(self, test_data: dict, max_workers: int = None) -> dict:
+        """Adds several test data at once, reading their files concurrently and raising the failures together at the end
+        """
+        pass
     
+    @abstractmethod
+    def add_streaming_test_data(self,
+                                test_data_name: str,
+                                X_test: str,
+                                y_test: str,
+                                chunk_size: int):
+        pass
+
+    @abstractmethod
+    def iter_streaming_test_data(self, test_data_name: str) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """Read a streaming test data as pairs of X_test and y_test chunks with the same rows
+
+        Args:
+            test_data_name (str): Name of the streaming test data
+
+        Returns:
+            Iterator[tuple[pd.DataFrame, pd.DataFrame]]: Aligned X_test and y_test chunks
+        """
+        pass
+
     @abstractmethod
     def get_all_test_data(self) -> dict:
         """Get all test data
@@ -48,6 +74,18 @@ class ILoadTestDataService(ABC):
         """
         pass
     
+    @abstractmethod
+    def get_fingerprint(self, test_data_name: str) -> str:
+        """Get the content hash of the X_test and y_test frames of a test data
+
+        Args:
+            test_data_name (str): Name of the test data to be identified
+
+        Returns:
+            str: Hexadecimal digest of the test data content
+        """
+        pass
+
     @abstractmethod
     def remove_test_data(self, test_data_name: str):
         """Remove test data by name
@@ -1,19 +1,39 @@
+import threading
 import pandas as pd
 from pathlib import Path
-from typing import Union
+from typing import Iterator, Union
 import numpy as np
 
 from ml_exp.repository.interfaces.data_file_repository import IDataFileRepository
 from ml_exp.service.interfaces.interface_test_data_service import ILoadTestDataService
+from ml_exp.utils.fingerprint import dataframe_fingerprint, dataframe_sample_fingerprint, file_identity
+from ml_exp.utils.concurrent_loading import load_concurrently, load_errors_message
+from ml_exp.utils.log_config import LogService
 
 
 class LoadTestDataService(ILoadTestDataService):
     """Load Data File from some file path using repository
+
+    Test data are deduplicated when added: a file already read (same path, size and modification time) is not read again, and a frame equal to one already stored is replaced by the stored one. Test data registered under several names then share their frames, their fold assignment and their shared memory blocks.
     """
-    def __init__(self, data_file_repository: IDataFileRepository) -> None:
+    __log_service = LogService()
+
+    def __init__(self, data_file_repository: IDataFileRepository, deduplicate: bool = True) -> None:
+        """
+        Args:
+            data_file_repository (IDataFileRepository): Repository used to read the data files
+            deduplicate (bool, optional): Shares one stored frame between test data with the same file or content. Defaults to True.
+        """
         self.data_file_repo = data_file_repository
+        self.deduplicate = deduplicate
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.frames_by_file = {}  # file identity -> frame read from it
+        self.frames_by_sample = {}  # sample fingerprint -> stored frames with it
+        self.__deduplication_lock = threading.Lock()
 
         self.test_data = {}
+        self.streaming_test_data = {}
+        self.fingerprints = {}
     
     def generate_dataframe(self, file_name: Path) -> pd.DataFrame:
         """Generate pandas dataframe from some path object 
@@ -31,31 +51,189 @@ class LoadTestDataService(ILoadTestDataService):
                       X_test: Union[pd.DataFrame, str],
                       y_test: Union[pd.DataFrame, str]):
         
-        if test_data_name in self.test_data:
-            raise ValueError(f"Test data '{test_data_name}' already exists. Please use a different name or remove the existing test data before adding new one.")
+        self.check_if_test_data_exists(test_data_name)
+        X_test = self.to_dataframe(X_test, "X_test")
+        y_test = self.to_dataframe(y_test, "y_test")
+        self.store_test_data(test_data_name, X_test, y_test)
 
-        # check data type of X_test
-        if isinstance(X_test, pd.DataFrame):
-            X_test = X_test
-        elif isinstance(X_test, str):
-            X_test = self.generate_dataframe(Path(X_test))
-        elif isinstance(X_test, np.ndarray):
-            X_test = pd.DataFrame(X_test).reset_index(drop=True)
-        else:
-            raise ValueError(f"X_test need to be Pandas Dataframe or string path to file. Current type of X_test: {type(X_test)}")
-
-        # check data type of y_test
-        if isinstance(y_test, pd.DataFrame):
-            y_test = y_test
-        elif isinstance(y_test, str):
-            y_test = self.generate_dataframe(Path(y_test))
-        elif isinstance(y_test, np.ndarray):
-            y_test = pd.DataFrame(y_test).reset_index(drop=True)
-        else:
-            raise ValueError(f"y_test need to be Pandas Dataframe or string path to file. Current type of y_test: {type(y_test)}")
+    def store_test_data(self, test_data_name: str, X_test: pd.DataFrame, y_test: pd.DataFrame) -> None:
+        """Stores the frames of a test data, replacing each one by an equal frame already stored
 
-        self.test_data[test_data_name] = {"x_test": X_test, "y_test": y_test}
+        Args:
+            test_data_name (str): Name of the test data
+            X_test (pd.DataFrame): Test data used as model input
+            y_test (pd.DataFrame): Expected values of the test data
+        """
+        stored_X_test, stored_y_test = self.deduplicate_frame(X_test), self.deduplicate_frame(y_test)
+        if stored_X_test is not X_test or stored_y_test is not y_test:
+            shared_with = [name for name, data in self.test_data.items()
+                           if data["x_test"] is stored_X_test or data["y_test"] is stored_y_test]
+            self.__logger.info(f"Test data '{test_data_name}' shares its stored frames with {shared_with}.")
+        self.test_data[test_data_name] = {"x_test": stored_X_test, "y_test": stored_y_test}
+
+    def deduplicate_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Returns the stored frame equal to the given one, or stores the given one. Candidates are found by a hash of a sample of rows and confirmed by a full comparison.
+
+        Args:
+            frame (pd.DataFrame): Frame to be stored
+
+        Returns:
+            pd.DataFrame: Frame to be used by the test data
+        """
+        if not self.deduplicate:
+            return frame
+        sample_fingerprint = dataframe_sample_fingerprint(frame)
+        with self.__deduplication_lock:
+            candidates = self.frames_by_sample.setdefault(sample_fingerprint, [])
+            for candidate in candidates:
+                if candidate is frame or candidate.equals(frame):
+                    return candidate
+            candidates.append(frame)
+            return frame
     
+    def to_dataframe(self, data: Union[pd.DataFrame, str, np.ndarray], data_name: str) -> pd.DataFrame:
+        """Reads the file of a path, or wraps an array without copying it, as a DataFrame
+
+        Args:
+            data (Union[pd.DataFrame, str, np.ndarray]): DataFrame, path to file or array
+            data_name (str): Name of the data in error messages (X_test or y_test)
+
+        Raises:
+            ValueError: If the data is not of a supported type
+
+        Returns:
+            pd.DataFrame: Data as DataFrame
+        """
+        if isinstance(data, pd.DataFrame):
+            return data
+        if isinstance(data, str):
+            return self.read_file(data)
+        if isinstance(data, np.ndarray):
+            # a view of the array as a single block, without copying it; 1-D arrays become a single column
+            return pd.DataFrame(data.reshape(len(data), -1) if data.ndim == 1 else data, copy=False)
+        raise ValueError(f"{data_name} need to be Pandas Dataframe or string path to file. Current type of {data_name}: {type(data)}")
+
+    def read_file(self, file_path: str) -> pd.DataFrame:
+        """Reads a data file, unless a file with the same path, size and modification time was already read
+
+        Args:
+            file_path (str): Path to the data file
+
+        Returns:
+            pd.DataFrame: Data of the file
+        """
+        if not self.deduplicate or not Path(file_path).is_file():
+            return self.generate_dataframe(Path(file_path))
+        file_key = file_identity(file_path)
+        with self.__deduplication_lock:
+            frame = self.frames_by_file.get(file_key)
+        if frame is not None:
+            return frame
+        frame = self.generate_dataframe(Path(file_path))
+        with self.__deduplication_lock:
+            # concurrent reads of the same file keep the first frame stored
+            return self.frames_by_file.setdefault(file_key, frame)
+
+    def add_test_data_many(self, test_data: dict, max_workers: int = None) -> dict:
+        """Adds several test data at once, reading their files concurrently on a bounded thread pool. Every test data is tried: those read are added, in the order given, and the failures are raised together at the end.
+
+        Args:
+            test_data (dict): X_test and y_test pair (DataFrames, string paths to files or arrays) by test data name
+            max_workers (int, optional): Number of threads reading files. None uses the ThreadPoolExecutor default. Defaults to None.
+
+        Raises:
+            ValueError: If any test data already exists, before reading anything, or if any could not be read, after adding the others
+
+        Returns:
+            dict: Seconds spent reading each test data, by name
+        """
+        for test_data_name in test_data:
+            self.check_if_test_data_exists(test_data_name)
+
+        loaders = {test_data_name: (lambda X_test=X_test, y_test=y_test: (self.to_dataframe(X_test, "X_test"),
+                                                                          self.to_dataframe(y_test, "y_test")))
+                   for test_data_name, (X_test, y_test) in test_data.items()}
+        frames, timings, errors = load_concurrently(loaders, max_workers=max_workers)
+        for test_data_name, (X_test, y_test) in frames.items():
+            self.store_test_data(test_data_name, X_test, y_test)
+            self.__logger.info(f"Test data '{test_data_name}' read in {timings[test_data_name]:.3f}s.")
+
+        if errors:
+            raise ValueError(load_errors_message(errors, len(test_data), "test data"))
+        return timings
+
+    def check_if_test_data_exists(self, test_data_name: str) -> None:
+        if test_data_name in self.test_data or test_data_name in self.streaming_test_data:
+            raise ValueError(f"Test data '{test_data_name}' already exists. Please use a different name or remove the existing test data before adding new one.")
+
+    def add_streaming_test_data(self,
+                                test_data_name: str,
+                                X_test: str,
+                                y_test: str,
+                                chunk_size: int = 100_000):
+        """Add test data that is read chunk by chunk from disk during the scoring, for data larger than memory
+
+        Args:
+            test_data_name (str): Name of the test data to be added
+            X_test (str): Path to the file with the model inputs (.csv, .tsv, .data, .jsonl or .parquet)
+            y_test (str): Path to the file with the expected values, with the same rows and order as X_test
+            chunk_size (int, optional): Maximum number of rows read at a time. Defaults to 100_000.
+        """
+        self.check_if_test_data_exists(test_data_name)
+
+        for file_path in [X_test, y_test]:
+            if not isinstance(file_path, str):
+                raise ValueError(f"Streaming test data need to be string paths to files. Current type: {type(file_path)}")
+            if not Path(file_path).exists():
+                raise ValueError(f"File '{file_path}' not found.")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size need to be a positive integer. Current chunk_size: {chunk_size}")
+
+        self.streaming_test_data[test_data_name] = {"x_test": Path(X_test), "y_test": Path(y_test), "chunk_size": chunk_size}
+
+    def iter_streaming_test_data(self, test_data_name: str) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """Read a streaming test data as pairs of X_test and y_test chunks with the same rows
+
+        Args:
+            test_data_name (str): Name of the streaming test data
+
+        Raises:
+            ValueError: If X_test and y_test files have different number of rows
+
+        Returns:
+            Iterator[tuple[pd.DataFrame, pd.DataFrame]]: Aligned X_test and y_test chunks
+        """
+        if test_data_name not in self.streaming_test_data:
+            raise ValueError(f"Streaming test data '{test_data_name}' not found. Please add the test data before reading it.")
+        streaming_data = self.streaming_test_data[test_data_name]
+        y_chunks = self.data_file_repo.read_chunks(streaming_data["y_test"], streaming_data["chunk_size"])
+
+        # the files may be split at different rows (e.g. parquet row groups), so y_test is buffered to match each X_test chunk
+        y_buffer = []
+        y_buffered_rows = 0
+        for X_chunk in self.data_file_repo.read_chunks(streaming_data["x_test"], streaming_data["chunk_size"]):
+            while y_buffered_rows < len(X_chunk):
+                y_chunk = next(y_chunks, None)
+                if y_chunk is None:
+                    raise ValueError(f"X_test and y_test of '{test_data_name}' have different number of rows.")
+                y_buffer.append(y_chunk)
+                y_buffered_rows += len(y_chunk)
+            y_rows = pd.concat(y_buffer) if len(y_buffer) > 1 else y_buffer[0]
+            y_buffer = [y_rows.iloc[len(X_chunk):]]
+            y_buffered_rows -= len(X_chunk)
+            yield X_chunk, y_rows.iloc[:len(X_chunk)]
+
+        if y_buffered_rows > 0 or next(y_chunks, None) is not None:
+            raise ValueError(f"X_test and y_test of '{test_data_name}' have different number of rows.")
+
+    def get_all_streaming_test_data(self) -> dict:
+        """Get all streaming test data
+
+        Returns:
+            dict: Dictionary with the files and chunk size of each streaming test data
+        """
+        return self.streaming_test_data
+
     def get_all_test_data(self) -> dict:
         """Get all test data
 
@@ -78,6 +256,26 @@ class LoadTestDataService(ILoadTestDataService):
         else:
             raise ValueError(f"Test data '{test_data_name}' not found. Please add the test data before retrieving it.")
         
+    def get_fingerprint(self, test_data_name: str) -> str:
+        """Get the content hash of the X_test and y_test frames of a test data, computed only on the first call
+
+        Args:
+            test_data_name (str): Name of the test data to be identified
+
+        Returns:
+            str: Hexadecimal digest of the test data content
+        """
+        if test_data_name not in self.fingerprints:
+            test_data = self.get_test_data(test_data_name)
+            # test data sharing their frames share the fingerprint
+            self.fingerprints[test_data_name] = next(
+                (fingerprint for name, fingerprint in self.fingerprints.items()
+                 if name in self.test_data
+                 and self.test_data[name]["x_test"] is test_data["x_test"]
+                 and self.test_data[name]["y_test"] is test_data["y_test"]),
+                None) or dataframe_fingerprint(test_data["x_test"], test_data["y_test"])
+        return self.fingerprints[test_data_name]
+
     def remove_test_data(self, test_data_name: str):
         """Remove test data by name
 
@@ -86,5 +284,17 @@ class LoadTestDataService(ILoadTestDataService):
         """
         if test_data_name in self.test_data:
             del self.test_data[test_data_name]
+            self.fingerprints.pop(test_data_name, None)
+            self.__forget_unused_frames()
+        elif test_data_name in self.streaming_test_data:
+            del self.streaming_test_data[test_data_name]
         else:
-            raise ValueError(f"Test data '{test_data_name}' not found. Please add the test data before removing it.")
\ No newline at end of file
+            raise ValueError(f"Test data '{test_data_name}' not found. Please add the test data before removing it.")
+
+    def __forget_unused_frames(self) -> None:
+        """Drops the frames no longer used by any test data from the deduplication indexes, so they can be freed"""
+        used = {id(frame) for data in self.test_data.values() for frame in (data["x_test"], data["y_test"])}
+        with self.__deduplication_lock:
+            self.frames_by_file = {key: frame for key, frame in self.frames_by_file.items() if id(frame) in used}
+            self.frames_by_sample = {key: kept for key, frames in self.frames_by_sample.items()
+                                     if (kept := [frame for frame in frames if id(frame) in used])}
@@ -1,16 +1,21 @@
+import os
+import threading
+from collections import OrderedDict
 from sklearn.base import BaseEstimator
 from typing import Union
 
 from ml_exp.repository.sklearn_model_repository import SklearnModelRepository
 from ml_exp.repository.general_model_repository import GeneralModelRepository
 from ml_exp.service.load_model_service import LoadModelService
-from ml_exp.model.ml_model import ModelType
+from ml_exp.model.ml_model import MLModel, ModelType, ModelTechnology
 from ml_exp.utils.log_config import LogService, handle_exceptions
+from ml_exp.utils.concurrent_loading import load_concurrently, load_errors_message
 from ml_exp.service.interfaces.interface_prepare_context_service import IPrepareContextService
 
 
-SCORES_CLASSIFIER = ["accuracy", "roc_auc", "precision_recall"]
+SCORES_CLASSIFIER = ["accuracy", "roc_auc", "precision_recall", "precision", "recall", "f1", "specificity", "balanced_accuracy", "mcc"]
 SCORES_REGRESSION = ["mae", "mse", "r2"]
+SCORES_GREATER_IS_BETTER = SCORES_CLASSIFIER + ["r2"]
 
 class PrepareContextService(IPrepareContextService):
     """Load All Models considering different scenarios related with model type and source type (like obj or file)
@@ -18,10 +23,33 @@ class PrepareContextService(IPrepareContextService):
     __log_service = LogService()
     
 
-    def __init__(self, scores_target: list[str]) -> None:
+    def __init__(self,
+                 scores_target: list[str],
+                 lazy_loading: bool = False,
+                 max_resident_models: int = None,
+                 max_resident_bytes: int = None) -> None:
+        """
+        Args:
+            scores_target (list[str]): Performance metrics that will be collected
+            lazy_loading (bool, optional): Contexts added by path keep only a handle to the model file, loaded right before scoring by acquire and evicted after release. Defaults to False.
+            max_resident_models (int, optional): Number of released lazy models that may stay loaded to be reused. Without any limit, lazy models are evicted as soon as they are released. Defaults to None.
+            max_resident_bytes (int, optional): Total size of the model files of the loaded lazy models, beyond which released models are evicted, least recently used first. Defaults to None.
+        """
+        if max_resident_models is not None and max_resident_models < 0:
+            raise ValueError(f"max_resident_models need to be a non-negative integer. Current max_resident_models: {max_resident_models}")
+        if max_resident_bytes is not None and max_resident_bytes < 0:
+            raise ValueError(f"max_resident_bytes need to be a non-negative integer. Current max_resident_bytes: {max_resident_bytes}")
         self.contexts: dict = {}
         self.scores_target: list[str] = scores_target
 
+        # Lazy models residency
+        self.lazy_loading = lazy_loading
+        self.max_resident_models = 0 if max_resident_models is None and max_resident_bytes is None else max_resident_models
+        self.max_resident_bytes = max_resident_bytes
+        self.resident_models = OrderedDict()  # context name -> model file size, least recently used first
+        self.pinned_models = {}  # context name -> number of scorings in progress
+        self.__residency_lock = threading.RLock()
+
         # Repositories
         self.sklearn_repo = SklearnModelRepository()
         self.general_model_repo = GeneralModelRepository()
@@ -62,6 +90,101 @@ class PrepareContextService(IPrepareContextService):
                                                                                    model_obj=model_trained)
         return ml_model 
 
+    def create_lazy_ml_model(self, context_name: str, model_path: str) -> MLModel:
+        """Creates the handle of a model stored in a file without loading it. The model type is only known once it is loaded, so it stays undefined until then.
+
+        Args:
+            context_name (str): Model name for identification
+            model_path (str): Path of the model file
+
+        Raises:
+            ValueError: If the model file does not exist
+
+        Returns:
+            MLModel: Handle without model object, loaded later by acquire
+        """
+        if not os.path.isfile(model_path):
+            raise ValueError(f"Model file '{model_path}' of context '{context_name}' not found.")
+        model_technology = (ModelTechnology.sklearn.value
+                            if ".obj" in model_path or ".pkl" in model_path
+                            else ModelTechnology.general_from_onnx.value)
+        return MLModel(context_name=context_name,
+                       model_object=None,
+                       model_technology=model_technology,
+                       model_type=ModelType.undefined.value,
+                       model_path=model_path,
+                       lazy=True)
+
+    def acquire(self, context_name: str) -> MLModel:
+        """Loads the model of a lazy context if it is not resident and pins it until release, evicting released models beyond the residency limits first. Eager contexts are returned as they are.
+
+        Args:
+            context_name (str): Name of the context to be scored
+
+        Raises:
+            ValueError: If the loaded model makes the contexts invalid (mixture of classifiers and regressors or scores_target not valid for it)
+
+        Returns:
+            MLModel: Model of the context, ready to predict
+        """
+        ml_model = self.contexts[context_name]["ml_model"]
+        if not ml_model.lazy:
+            return ml_model
+        with self.__residency_lock:
+            if ml_model.model_object is None:
+                model_bytes = os.path.getsize(ml_model.model_path)
+                self.evict(incoming_bytes=model_bytes)
+                loaded_model = self.load_ml_model(context_name=context_name, model_trained=ml_model.model_path)
+                ml_model.model_object = loaded_model.model_object
+                ml_model.model_type = loaded_model.model_type
+                try:
+                    self.validate_all_contexts()
+                except ValueError as e:
+                    ml_model.model_object = None
+                    raise e
+                self.resident_models[context_name] = model_bytes
+                self.__logger.info(f"Model of context '{context_name}' loaded ({model_bytes} bytes, {len(self.resident_models)} resident).")
+            self.resident_models.move_to_end(context_name)
+            self.pinned_models[context_name] = self.pinned_models.get(context_name, 0) + 1
+        return ml_model
+
+    def release(self, context_name: str) -> None:
+        """Unpins the model of a lazy context once its predictions are done, evicting released models beyond the residency limits
+
+        Args:
+            context_name (str): Name of the context whose scoring is finished
+        """
+        with self.__residency_lock:
+            if context_name not in self.pinned_models:
+                return
+            self.pinned_models[context_name] -= 1
+            if not self.pinned_models[context_name]:
+                del self.pinned_models[context_name]
+            self.evict()
+
+    def evict(self, incoming_bytes: int = None) -> None:
+        """Unloads released lazy models, least recently used first, until the resident models fit the limits. Models still pinned are never unloaded.
+
+        Args:
+            incoming_bytes (int, optional): Size of a model about to be loaded, which also needs to fit. Defaults to None.
+        """
+        with self.__residency_lock:
+            incoming = incoming_bytes is not None
+            def over_limits() -> bool:
+                n_models = len(self.resident_models) + incoming
+                n_bytes = sum(self.resident_models.values()) + (incoming_bytes or 0)
+                return ((self.max_resident_models is not None and n_models > max(self.max_resident_models, incoming))
+                        or (self.max_resident_bytes is not None and n_bytes > self.max_resident_bytes))
+
+            for context_name in list(self.resident_models):
+                if not over_limits():
+                    break
+                if context_name in self.pinned_models:
+                    continue
+                del self.resident_models[context_name]
+                self.contexts[context_name]["ml_model"].model_object = None
+                self.__logger.info(f"Model of context '{context_name}' evicted.")
+
     @handle_exceptions(__log_service.get_logger(__name__))
     def add_context(self,
                     context_name: str,
@@ -70,8 +193,11 @@ class PrepareContextService(IPrepareContextService):
 
         self.check_if_context_exists(context_name)
 
-        ml_model = self.load_ml_model(context_name=context_name,
-                                       model_trained=model_trained)
+        if self.lazy_loading and isinstance(model_trained, str):
+            ml_model = self.create_lazy_ml_model(context_name=context_name, model_path=model_trained)
+        else:
+            ml_model = self.load_ml_model(context_name=context_name,
+                                          model_trained=model_trained)
 
         self.contexts[context_name] = {"ml_model": ml_model, "test_data_name": ref_data_test}
 
@@ -82,6 +208,46 @@ class PrepareContextService(IPrepareContextService):
             del self.contexts[context_name] # remove the model if validation fails before raise
             raise e
 
+    def add_contexts_many(self, contexts: dict, max_workers: int = None) -> dict:
+        """Adds several contexts at once, loading their models (pickle files, ONNX sessions) concurrently on a bounded thread pool. Every context is tried: those loaded and valid are added, in the order given, and the failures are raised together at the end instead of being only logged as in add_context.
+
+        Args:
+            contexts (dict): Pair of trained model (object or path to file) and name of the test data referenced, by context name
+            max_workers (int, optional): Number of threads loading models. None uses the ThreadPoolExecutor default. Defaults to None.
+
+        Raises:
+            ValueError: If any context already exists, before loading anything, or if any could not be loaded or makes the contexts invalid, after adding the others
+
+        Returns:
+            dict: Seconds spent loading the model of each context, by name
+        """
+        for context_name in contexts:
+            self.check_if_context_exists(context_name)
+
+        def loader(context_name: str, model_trained: Union[str, BaseEstimator]):
+            if self.lazy_loading and isinstance(model_trained, str):
+                return lambda: self.create_lazy_ml_model(context_name=context_name, model_path=model_trained)
+            return lambda: self.load_ml_model(context_name=context_name, model_trained=model_trained)
+
+        ml_models, timings, errors = load_concurrently({context_name: loader(context_name, model_trained)
+                                                        for context_name, (model_trained, _) in contexts.items()},
+                                                       max_workers=max_workers)
+        for context_name, ml_model in ml_models.items():
+            self.contexts[context_name] = {"ml_model": ml_model, "test_data_name": contexts[context_name][1]}
+            try:
+                self.validate_all_contexts()
+            except ValueError as e:
+                del self.contexts[context_name]
+                errors[context_name] = e
+                continue
+            self.__logger.info(f"Model of context '{context_name}' loaded in {timings[context_name]:.3f}s.")
+
+        if errors:
+            # reported in the order the contexts were given
+            errors = {context_name: errors[context_name] for context_name in contexts if context_name in errors}
+            raise ValueError(load_errors_message(errors, len(contexts), "contexts"))
+        return timings
+
     def validate_all_contexts(self):
         """Validates all experiments by checking if all models are of the same type and if the scores_target are valid.
         """
@@ -0,0 +1,103 @@
+import numpy as np
+from scipy.stats import chi2, rankdata, t as student_t
+
+from ml_exp.service.interfaces.interface_racing_experiment_service import IRacingExperimentService
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.service.prepare_context_service import SCORES_GREATER_IS_BETTER
+from ml_exp.utils.log_config import LogService
+
+
+class RacingExperimentService(IRacingExperimentService):
+    """Races the contexts over the folds in the style of F-Race (Birattari et al., 2002): every context still racing is scored on the next folds, the Friedman test checks whether their ranks inside each fold differ and, if they do, the contexts whose rank sum is significantly worse than the one of the leader (Conover post-hoc) are dropped from the later folds. Dropped contexts keep the values of the folds they raced.
+
+    The race is decided on the first performance metric; the other metrics are collected for the same folds.
+    """
+    __log_service = LogService()
+
+    def __init__(self,
+                 generate_score_service: GenerateScoreService,
+                 n_splits: int,
+                 alpha: float = 0.05,
+                 min_folds: int = 5,
+                 folds_per_step: int = 1) -> None:
+        """
+        Args:
+            generate_score_service (GenerateScoreService): Scorer created with defer_scoring, holding the contexts and their folds
+            n_splits (int): Total number of folds
+            alpha (float, optional): Significance level of the Friedman and post-hoc tests of each step. Defaults to 0.05.
+            min_folds (int, optional): Folds scored by every context before the first test. Defaults to 5.
+            folds_per_step (int, optional): Folds scored between two tests. Defaults to 1.
+        """
+        if min_folds < 2:
+            raise ValueError(f"min_folds need to be at least 2. Current min_folds: {min_folds}")
+        if folds_per_step < 1:
+            raise ValueError(f"folds_per_step need to be a positive integer. Current folds_per_step: {folds_per_step}")
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.generate_score_service = generate_score_service
+        self.n_splits = n_splits
+        self.alpha = alpha
+        self.min_folds = min_folds
+        self.folds_per_step = folds_per_step
+
+        self.race_score_target = next(iter(generate_score_service.get_scores_data()))
+        self.eliminated_contexts = {}
+        self.n_folds_scored = 0
+
+    def find_eliminated(self, score_matrix: np.ndarray) -> np.ndarray:
+        """Runs the Friedman test over the folds scored by the contexts still racing and the post-hoc comparison against the leader
+
+        Args:
+            score_matrix (np.ndarray): Metric values with one row per fold and one column per context still racing
+
+        Returns:
+            np.ndarray: Whether each context is significantly worse than the leader
+        """
+        n_folds, n_contexts = score_matrix.shape
+        eliminated = np.zeros(n_contexts, dtype=bool)
+        if n_contexts < 2 or n_folds < 2:
+            return eliminated
+
+        # rank 1 is the best context of the fold; undefined values rank last
+        losses = -score_matrix if self.race_score_target in SCORES_GREATER_IS_BETTER else score_matrix.copy()
+        losses[np.isnan(losses)] = np.inf
+        ranks = rankdata(losses, axis=1)
+        rank_sums = ranks.sum(axis=0)
+
+        squared_ranks = (ranks ** 2).sum()
+        ties_term = squared_ranks - n_folds * n_contexts * (n_contexts + 1) ** 2 / 4
+        if ties_term <= 0:
+            return eliminated
+        friedman = (n_contexts - 1) * ((rank_sums - n_folds * (n_contexts + 1) / 2) ** 2).sum() / ties_term
+        if chi2.sf(friedman, n_contexts - 1) >= self.alpha:
+            return eliminated
+
+        degrees_of_freedom = (n_folds - 1) * (n_contexts - 1)
+        variance = 2 * n_folds * (1 - friedman / (n_folds * (n_contexts - 1))) * ties_term / degrees_of_freedom
+        if variance <= 0:
+            return eliminated
+        critical = student_t.isf(self.alpha / 2, degrees_of_freedom)
+        return (rank_sums - rank_sums.min()) / np.sqrt(variance) > critical
+
+    def run(self) -> dict:
+        """Scores the folds step by step, dropping the contexts significantly worse than the leader from the next folds
+
+        Returns:
+            dict: Metric values of each context by performance metric, for the folds it raced
+        """
+        racing = list(self.generate_score_service.get_scores_data()[self.race_score_target].keys())
+        while self.n_folds_scored < self.n_splits and len(racing) > 1:
+            n_folds = self.min_folds if not self.n_folds_scored else self.n_folds_scored + self.folds_per_step
+            n_folds = min(n_folds, self.n_splits)
+            self.generate_score_service.score_folds(folds=list(range(self.n_folds_scored, n_folds)), contexts=racing)
+            self.n_folds_scored = n_folds
+
+            race_scores = self.generate_score_service.get_scores_data()[self.race_score_target]
+            score_matrix = np.array([race_scores[context_name] for context_name in racing], dtype=np.float64).T
+            eliminated = self.find_eliminated(score_matrix)
+            for context_name in np.array(racing)[eliminated]:
+                self.eliminated_contexts[context_name] = self.n_folds_scored
+                self.__logger.info(f"Context '{context_name}' eliminated after {self.n_folds_scored} folds.")
+            racing = [context_name for context_name, dropped in zip(racing, eliminated) if not dropped]
+
+        self.__logger.info(f"Race finished after {self.n_folds_scored} folds with {len(racing)} contexts racing and {len(self.eliminated_contexts)} eliminated.")
+        return self.generate_score_service.get_scores_data()
@@ -1,4 +1,3 @@
-from jinja2 import Environment, PackageLoader, select_autoescape
 import json
 from importlib import resources
 
@@ -13,6 +12,8 @@ class ReportGeneratorService(IReportGeneratorService):
     def __init__(self, reports, report_name, report_base_path) -> None:
         self.__logger = self.__log_service.get_logger(__name__)
 
+        # jinja2 is only needed when a report is rendered
+        from jinja2 import Environment, PackageLoader, select_autoescape
         self.env = Environment(
             loader=PackageLoader("ml_exp", "templates"),
             autoescape=select_autoescape(["html", "xml"]),
@@ -22,7 +23,9 @@ class ReportGeneratorService(IReportGeneratorService):
 
         html_renderizado = template.render(reports_by_score=results_data["reports_by_score"],
                                            message_about_significancy=results_data["message_about_significancy"],
-                                           better_context_by_score=results_data["better_context_by_score"])
+                                           better_context_by_score=results_data["better_context_by_score"],
+                                           sequential_summary=results_data["sequential_summary"],
+                                           eliminated_contexts=results_data["eliminated_contexts"])
 
         with open(f"{report_base_path}/{report_name}.html", "w") as f:
             f.write(html_renderizado)
\ No newline at end of file
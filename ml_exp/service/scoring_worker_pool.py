@@ -0,0 +1,162 @@
+import importlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Union
+
+from ml_exp.model.ml_model import MLModel, ModelTechnology
+from ml_exp.service.interfaces.interface_scoring_worker_pool import IScoringWorkerPool
+from ml_exp.utils.fingerprint import model_fingerprint
+from ml_exp.utils.log_config import LogService
+
+# imported once when each worker starts, so no scoring pays for them
+WARM_IMPORTS = ["numpy", "pandas", "scipy.sparse", "scipy.stats", "sklearn", "onnxruntime", "mlflow.pyfunc",
+                "ml_exp.service.context_scoring_service"]
+
+# state of each worker process
+_worker_models = OrderedDict()
+_worker_max_models = 0
+
+
+def _initialize_worker(warm_imports: tuple, max_cached_models: int) -> None:
+    global _worker_max_models
+    _worker_max_models = max_cached_models
+    for module in warm_imports:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _worker_model(reference: MLModel) -> MLModel:
+    """Model of the handle from the cache of the worker, loading its artifact on a miss and evicting the least recently used models beyond the cache size"""
+    ml_model = _worker_models.get(reference.model_fingerprint)
+    if ml_model is not None:
+        _worker_models.move_to_end(reference.model_fingerprint)
+        return ml_model
+
+    if reference.model_technology == ModelTechnology.general_from_onnx.value:
+        import onnxruntime
+        model_object = onnxruntime.InferenceSession(reference.model_path)
+    else:
+        with open(reference.model_path, "rb") as fp:
+            model_object = pickle.load(fp)
+    ml_model = reference.model_copy(update={"model_object": model_object})
+    if _worker_max_models > 0:
+        _worker_models[reference.model_fingerprint] = ml_model
+        while len(_worker_models) > _worker_max_models:
+            _worker_models.popitem(last=False)
+    return ml_model
+
+
+def _score_with_cached_model(score_task: Callable, reference: MLModel, *task) -> dict:
+    return score_task(_worker_model(reference), *task)
+
+
+class ScoringWorkerPool(Executor, IScoringWorkerPool):
+    """Long-lived process pool to be reused across MLExp runs. Its workers are started once, import the scoring dependencies when they start and keep the last models they scored in memory, keyed by the fingerprint of the model artifact, so later runs send only a handle of each model instead of the pickled model.
+
+    Models given by path are loaded by the workers from their file; models given as objects are pickled once to a folder owned by the pool. ONNX models given by path can be scored too, since each worker creates its own session. The pool can be passed as the executor of MLExp or GenerateScoreService and is shut down by shutdown, or at the end of a with block.
+    """
+    __log_service = LogService()
+
+    def __init__(self,
+                 max_workers: int = None,
+                 max_cached_models: int = 8,
+                 warm_imports: list[str] = None,
+                 spill_dir: str = None) -> None:
+        """
+        Args:
+            max_workers (int, optional): Number of worker processes. None uses all CPUs. Defaults to None.
+            max_cached_models (int, optional): Number of models kept loaded by each worker. 0 disables the cache. Defaults to 8.
+            warm_imports (list[str], optional): Modules imported by each worker when it starts. None uses WARM_IMPORTS. Defaults to None.
+            spill_dir (str, optional): Folder where models given as objects are pickled for the workers. None uses a temporary folder removed on shutdown. Defaults to None.
+        """
+        if max_cached_models < 0:
+            raise ValueError(f"max_cached_models need to be a non-negative integer. Current max_cached_models: {max_cached_models}")
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_cached_models = max_cached_models
+        self.__owns_spill_dir = spill_dir is None
+        self.spill_dir = tempfile.mkdtemp(prefix="ml_exp_models_") if spill_dir is None else spill_dir
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self.__spilled_models = {}
+        self.__lock = threading.Lock()
+        self.__executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                              initializer=_initialize_worker,
+                                              initargs=(tuple(WARM_IMPORTS if warm_imports is None else warm_imports), max_cached_models))
+        self.__logger.info(f"Started {len(self.warm_up())} scoring workers.")
+
+    def warm_up(self) -> set:
+        """Starts every worker, so the process spawn and the imports are paid when the pool is created instead of in the first run
+
+        Returns:
+            set: Process id of the workers that answered
+        """
+        futures = [self.__executor.submit(_worker_pid) for _ in range(self.max_workers)]
+        return {future.result() for future in futures}
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.__executor.submit(fn, *args, **kwargs)
+
+    def model_reference(self, ml_model: MLModel) -> Union[MLModel, None]:
+        """Handle of the model without its object, pointing to an artifact file the workers can load and cache by fingerprint
+
+        Args:
+            ml_model (MLModel): Model loaded for a context
+
+        Returns:
+            Union[MLModel, None]: Handle of the model, or None if the model can not be identified or stored, and so needs to be sent whole
+        """
+        fingerprint = model_fingerprint(ml_model)
+        if fingerprint is None:
+            return None
+        model_path = ml_model.model_path
+        if model_path is None:
+            if ml_model.model_technology != ModelTechnology.sklearn.value:
+                return None
+            model_path = self.__spill_model(fingerprint, ml_model.model_object)
+        return ml_model.model_copy(update={"model_object": None, "model_path": model_path, "model_fingerprint": fingerprint})
+
+    def __spill_model(self, fingerprint: str, model_object) -> str:
+        """Pickles a model given as object once, keyed by its fingerprint"""
+        with self.__lock:
+            model_path = self.__spilled_models.get(fingerprint)
+            if model_path is None:
+                model_path = os.path.join(self.spill_dir, f"{fingerprint}.pkl")
+                if not os.path.exists(model_path):
+                    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as fp:
+                        pickle.dump(model_object, fp, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, model_path)
+                self.__spilled_models[fingerprint] = model_path
+            return model_path
+
+    def submit_scoring(self, score_task: Callable, ml_model: MLModel, *task) -> Future:
+        """Submits the scoring of a context, sending only the model handle when the workers can load the model themselves
+
+        Args:
+            score_task (Callable): Scoring function, called with the model and the rest of the task
+            ml_model (MLModel): Model loaded for the context
+            task: Rest of the arguments of the scoring function
+
+        Returns:
+            Future: Result of the scoring
+        """
+        reference = self.model_reference(ml_model)
+        if reference is None:
+            return self.__executor.submit(score_task, ml_model, *task)
+        return self.__executor.submit(_score_with_cached_model, score_task, reference, *task)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self.__executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if self.__owns_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
@@ -0,0 +1,132 @@
+import math
+from scipy.stats import norm
+
+from ml_exp.service.interfaces.interface_sequential_experiment_service import ISequentialExperimentService
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.service.experimental_pipeline_service import ExperimentalPipelineService
+from ml_exp.utils.log_config import LogService
+
+
+class SequentialExperimentService(ISequentialExperimentService):
+    """Scores the folds in increments, re-running the statistical decision after each one, and stops once the best context and its significance are the same in consecutive checks.
+
+    Repeated checks would inflate the error rate, so each check tests at the level given by a Lan-DeMets O'Brien-Fleming alpha spending function: alpha(t) = 2 - 2 * Phi(z_{alpha/2} / sqrt(t)), with t the fraction of folds scored. A check spends the growth of alpha(t) since the previous check, so the checks together spend at most alpha. Early levels are very small, so only clear wins stop early; a run without a stable significant decision scores every fold.
+    """
+    __log_service = LogService()
+
+    def __init__(self,
+                 generate_score_service: GenerateScoreService,
+                 n_splits: int,
+                 alpha: float = 0.05,
+                 folds_per_check: int = 10,
+                 min_folds: int = 20,
+                 patience: int = 2,
+                 baseline_context: str = None) -> None:
+        """
+        Args:
+            generate_score_service (GenerateScoreService): Scorer created with defer_scoring, holding the contexts and their folds
+            n_splits (int): Total number of folds
+            alpha (float, optional): Significance level spent over all checks. Defaults to 0.05.
+            folds_per_check (int, optional): Folds scored between two checks. Defaults to 10.
+            min_folds (int, optional): Folds scored before the first check. Defaults to 20.
+            patience (int, optional): Number of consecutive checks with the same significant decision needed to stop. Defaults to 2.
+            baseline_context (str, optional): Champion context, each check only compares the challengers against it. Defaults to None.
+        """
+        if folds_per_check < 1:
+            raise ValueError(f"folds_per_check need to be a positive integer. Current folds_per_check: {folds_per_check}")
+        if min_folds < 2:
+            raise ValueError(f"min_folds need to be at least 2. Current min_folds: {min_folds}")
+        if patience < 1:
+            raise ValueError(f"patience need to be a positive integer. Current patience: {patience}")
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.generate_score_service = generate_score_service
+        self.n_splits = n_splits
+        self.alpha = alpha
+        self.folds_per_check = folds_per_check
+        self.min_folds = min_folds
+        self.patience = patience
+        self.baseline_context = baseline_context
+
+        self.n_folds_scored = 0
+        self.alpha_level = alpha
+        self.alpha_spent = 0.0
+        self.stopped_early = False
+
+    @staticmethod
+    def obrien_fleming_spending(alpha: float, information_fraction: float) -> float:
+        """Cumulative alpha spent at a fraction of the information, Lan-DeMets O'Brien-Fleming type
+
+        Args:
+            alpha (float): Total significance level
+            information_fraction (float): Fraction of folds scored, between 0 and 1
+
+        Returns:
+            float: Alpha spent up to the fraction
+        """
+        if information_fraction <= 0:
+            return 0.0
+        return float(2 * norm.sf(norm.isf(alpha / 2) / math.sqrt(min(information_fraction, 1.0))))
+
+    @property
+    def decision_alpha(self) -> float:
+        """Significance level of the final decision over the folds scored. A run that scored every fold tests at the full alpha, as a run without checks; a run stopped early tests at the alpha spent up to the check that stopped it, which is the level the checks together were allowed
+        """
+        return self.alpha_spent if self.stopped_early else self.alpha
+
+    def check_decision(self, alpha: float) -> tuple:
+        """Runs the statistical decision over the folds scored so far
+
+        Args:
+            alpha (float): Significance level of this check
+
+        Returns:
+            tuple: Best context and whether the difference is significant, for each performance metric
+        """
+        decision = []
+        for score_target, scores in self.generate_score_service.get_scores_data().items():
+            experimental_pipeline = ExperimentalPipelineService(scores_data={score_target: scores},
+                                                                alpha=alpha,
+                                                                baseline_context=self.baseline_context)
+            experimental_pipeline.run_pipeline()
+            report = experimental_pipeline.get_general_report()
+            decision.append((score_target, report.best_context_index, self.__is_significant(report.best_context_index)))
+        return tuple(decision)
+
+    def __is_significant(self, best_context_index: str) -> bool:
+        """Whether a check found a significant difference. The pipeline reports a message for null results too, so only a chosen best context counts: any context without a champion, a challenger that beats it with one
+
+        Args:
+            best_context_index (str): Best context of the check, None when no difference was significant
+
+        Returns:
+            bool: True if the tests of the check were significant at its level
+        """
+        if best_context_index is None:
+            return False
+        return self.baseline_context is None or best_context_index != self.baseline_context
+
+    def run(self) -> dict:
+        """Scores the folds in increments until the decision is stable or every fold is scored
+
+        Returns:
+            dict: Metric values of each context by performance metric, for the folds scored
+        """
+        last_decision, repeated = None, 0
+        while self.n_folds_scored < self.n_splits:
+            n_folds = self.min_folds if not self.n_folds_scored else self.n_folds_scored + self.folds_per_check
+            n_folds = min(n_folds, self.n_splits)
+            self.generate_score_service.score_folds(folds=list(range(self.n_folds_scored, n_folds)))
+            self.n_folds_scored = n_folds
+
+            cumulative = self.obrien_fleming_spending(self.alpha, self.n_folds_scored / self.n_splits)
+            self.alpha_level, self.alpha_spent = cumulative - self.alpha_spent, cumulative
+            decision = self.check_decision(self.alpha_level)
+            repeated = repeated + 1 if decision == last_decision else 1
+            last_decision = decision
+            self.__logger.info(f"Sequential check at {self.n_folds_scored}/{self.n_splits} folds (alpha {self.alpha_level:.3g}): {decision}")
+
+            if repeated >= self.patience and all(significant for _, _, significant in decision) and self.n_folds_scored < self.n_splits:
+                self.stopped_early = True
+                self.__logger.info(f"Decision stable for {repeated} checks, stopping after {self.n_folds_scored} of {self.n_splits} folds.")
+                break
+        return self.generate_score_service.get_scores_data()
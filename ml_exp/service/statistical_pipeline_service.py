@@ -1,9 +1,9 @@
 import numpy as np
-import statistics
 
 from ml_exp.repository.hypo_test_repository import ABTestRepository
 from ml_exp.model.report import HyphoTestReport, GeneralReportByScore, ScoreDescribed
 from ml_exp.utils.log_config import LogService, handle_exceptions
+from ml_exp.utils.score_matrix import to_score_matrix, describe_score_matrix
 from ml_exp.service.interfaces.interface_statistical_pipeline_service import IStatisticalPipelineService
 
 
@@ -11,15 +11,19 @@ class StatisticalPipelineService(IStatisticalPipelineService):
     """Orchestrates the methodology adopted to articulate Hypho tests based on test results collected from models around a metric. Uses the Hypho test repository to apply the tests.
     """
     __log_service = LogService()
-    def __init__(self, scores_data, score_target, alpha=0.05):
+    def __init__(self, scores_data, score_target, alpha=0.05, baseline_context=None):
         """
         Initializes the pipeline with the data and significance level.
 
         Parameters:
         scores_data (dict): A dictionary containing the data for each campaign.
         alpha (float): The significance level for the statistical tests.
+        baseline_context (str): Champion context. When given, the Mann-Whitney post-hoc compares only the champion against each challenger, correcting for k - 1 tests.
         """
+        if baseline_context is not None and baseline_context not in scores_data:
+            raise ValueError(f"baseline_context need to be one of the contexts {list(scores_data.keys())}. Current baseline_context: {baseline_context}")
         self.scores_data = scores_data
+        self.baseline_context = baseline_context
         self.ab_test_repo = ABTestRepository(alpha=alpha)
         self.ab_test_report_obj = HyphoTestReport(score_target=score_target)
         self.report_by_score = GeneralReportByScore(score_target=score_target)
@@ -27,15 +31,13 @@ class StatisticalPipelineService(IStatisticalPipelineService):
 
     @handle_exceptions(__log_service.get_logger(__name__))
     def _collect_statistical_results(self):
-        for context_name, scores in self.scores_data.items():
+        """Describes the metric values of all contexts at once, from a score matrix with one row per context"""
+        context_names, score_matrix, _ = to_score_matrix(self.scores_data)
+        described = describe_score_matrix(score_matrix)
+        for row, context_name in enumerate(context_names):
             score_model = ScoreDescribed(
                 context_name=context_name,
-                mean=statistics.mean(scores),
-                std=statistics.stdev(scores),
-                median=statistics.median(scores),
-                minimum=min(scores),
-                maximum=max(scores),
-                mode=statistics.mode(scores)
+                **{statistic: float(values[row]) for statistic, values in described.items()}
             )
             self.report_by_score.score_described.append(score_model)
 
@@ -129,18 +131,12 @@ class StatisticalPipelineService(IStatisticalPipelineService):
 
     @handle_exceptions(__log_service.get_logger(__name__))
     def __perform_mann_whitney(self):
-        mannwhitney_results = []
-        models = list(self.scores_data.keys())
-        for i in range(len(models)):
-            for j in range(i + 1, len(models)):
-                model1, model2 = models[i], models[j]
-                context = f"Mann-Whitney between {model1=} and {model2=}"
-                result = self.ab_test_repo.apply_mannwhitney(context=context,
-                                                            context_name_1=model1,
-                                                            context_name_2=model2,
-                                                            values=self.scores_data)
-                mannwhitney_results.append(result)
-        self.ab_test_report_obj.mannwhitney = mannwhitney_results
+        if self.baseline_context is not None:
+            self.ab_test_report_obj.mannwhitney = self.ab_test_repo.apply_mannwhitney_against_baseline(values=self.scores_data,
+                                                                                                        baseline_context=self.baseline_context)
+            self.ab_test_report_obj.pipeline_track.append("compare_against_baseline")
+            return
+        self.ab_test_report_obj.mannwhitney = self.ab_test_repo.apply_mannwhitney_all_pairs(values=self.scores_data)
 
     @handle_exceptions(__log_service.get_logger(__name__))
     def __apply_benjamini_hochberg_correction(self):
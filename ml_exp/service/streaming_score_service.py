@@ -0,0 +1,114 @@
+import numpy as np
+
+from ml_exp.service.interfaces.interface_streaming_score_service import IStreamingScoreService
+from ml_exp.service.interfaces.interface_test_data_service import ILoadTestDataService
+from ml_exp.service.interfaces.interface_prepare_context_service import IPrepareContextService
+from ml_exp.service.context_scoring_service import ContextScoringService
+from ml_exp.utils.fold_assignment import StreamingFoldAssigner
+from ml_exp.utils.fold_statistics import FoldStatisticsAccumulator
+from ml_exp.utils.bootstrap import StreamingBootstrapWeighter
+from ml_exp.utils.log_config import LogService
+
+
+class StreamingScoreService(IStreamingScoreService):
+    """Scores contexts over test data larger than memory. Each streaming test data is read once, chunk by chunk, for all contexts that reference it: the rows of a chunk get their folds on the fly, every model predicts the chunk, and only per-fold sufficient statistics are kept.
+
+    With bootstrap resampling the rows get Poisson(1) weights in every replicate instead of a fold (online bootstrap), so the replicates also come from a single pass over the data.
+    """
+    __log_service = LogService()
+
+    def __init__(self,
+                 load_test_data_service: ILoadTestDataService,
+                 context_scoring_service: ContextScoringService,
+                 scores_target: list[str],
+                 n_splits: int,
+                 random_state: int = 42,
+                 stratified: bool = True,
+                 prepare_context_service: IPrepareContextService = None,
+                 resampling: str = "kfold") -> None:
+        """
+        Args:
+            load_test_data_service (ILoadTestDataService): Service holding the streaming test data
+            context_scoring_service (ContextScoringService): Service used to run the inference of each chunk
+            scores_target (list[str]): Performance metrics to be collected
+            n_splits (int): Number of folds
+            random_state (int, optional): Seed of the fold assignment. Defaults to 42.
+            stratified (bool, optional): Keeps the class proportions in every fold. Defaults to True.
+            prepare_context_service (IPrepareContextService, optional): Service holding the contexts, used to load lazy models while their test data is streamed and release them after it. Defaults to None.
+            resampling (str, optional): "kfold" assigns each row to a fold and "bootstrap" weights each row in n_splits bootstrap replicates. Defaults to "kfold".
+        """
+        self.__logger = self.__log_service.get_logger(__name__)
+        self.load_test_data_service = load_test_data_service
+        self.context_scoring_service = context_scoring_service
+        self.scores_target = scores_target
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.stratified = stratified
+        self.prepare_context_service = prepare_context_service
+        self.resampling = resampling
+        self.fold_sizes = {}
+
+    def score(self, experiments: dict) -> dict:
+        """Scores the contexts whose test data is read chunk by chunk
+
+        Args:
+            experiments (dict): Contexts to be scored, with the model loaded and the name of the streaming test data referenced
+
+        Returns:
+            dict: For each context, the list with the metric value of each fold by performance metric
+        """
+        experiments_by_test_data = {}
+        for experiment_name, experiment_data in experiments.items():
+            experiments_by_test_data.setdefault(experiment_data["test_data_name"], []).append(experiment_name)
+
+        results = {}
+        for test_data_name, experiment_names in experiments_by_test_data.items():
+            fold_assigner = StreamingFoldAssigner(n_splits=self.n_splits,
+                                                  random_state=self.random_state,
+                                                  stratified=self.stratified)
+            bootstrap_weighter = StreamingBootstrapWeighter(n_replicates=self.n_splits, random_state=self.random_state)
+            accumulators = {name: FoldStatisticsAccumulator(self.scores_target, self.n_splits) for name in experiment_names}
+            fold_sizes = np.zeros(self.n_splits, dtype=np.int64)
+
+            # every context of the test data predicts each chunk, so all their models stay loaded during the pass
+            acquired = []
+            try:
+                ml_models = {}
+                for experiment_name in experiment_names:
+                    ml_models[experiment_name] = (self.prepare_context_service.acquire(experiment_name)
+                                                  if self.prepare_context_service is not None
+                                                  else experiments[experiment_name]["ml_model"])
+                    acquired.append(experiment_name)
+
+                n_rows = 0
+                for X_chunk, y_chunk in self.load_test_data_service.iter_streaming_test_data(test_data_name):
+                    Y_chunk = y_chunk.values.ravel()
+                    if self.resampling == "bootstrap":
+                        Y_preds = {experiment_name: self.context_scoring_service.collect_prediction(ml_models[experiment_name], X_chunk)
+                                   for experiment_name in experiment_names}
+                        # each block of weights is generated once and shared by every context
+                        for rows, weights in bootstrap_weighter.assign(len(Y_chunk)):
+                            fold_sizes += weights.sum(axis=1).astype(np.int64)
+                            for experiment_name in experiment_names:
+                                accumulators[experiment_name].update(Y_chunk[rows], Y_preds[experiment_name][rows], weights=weights)
+                    else:
+                        fold_ids = fold_assigner.assign(Y_chunk)
+                        fold_sizes += np.bincount(fold_ids, minlength=self.n_splits)
+                        for experiment_name in experiment_names:
+                            Y_pred = self.context_scoring_service.collect_prediction(ml_models[experiment_name], X_chunk)
+                            accumulators[experiment_name].update(Y_chunk, Y_pred, fold_ids)
+                    n_rows += len(X_chunk)
+            finally:
+                if self.prepare_context_service is not None:
+                    for experiment_name in acquired:
+                        self.prepare_context_service.release(experiment_name)
+
+            self.fold_sizes[test_data_name] = fold_sizes
+            if n_rows < self.n_splits and self.resampling == "kfold":
+                self.__logger.warning(f"Streaming test data '{test_data_name}' has {n_rows} rows, less than {self.n_splits} folds. Empty folds have undefined metrics.")
+            self.__logger.info(f"Scored {len(experiment_names)} contexts over {n_rows} rows streamed from '{test_data_name}'.")
+
+            for experiment_name, accumulator in accumulators.items():
+                results[experiment_name] = {score_target: fold_scores.tolist()
+                                            for score_target, fold_scores in accumulator.compute().items()}
+        return results
@@ -0,0 +1,85 @@
+from typing import Iterator
+import numpy as np
+
+from ml_exp.utils.counter_rng import counter_uniform
+
+# cells (replicates x rows) of the weight matrix materialized at a time
+BOOTSTRAP_BLOCK_CELLS = 2 ** 22
+
+
+def bootstrap_weights(seed: int, n_rows: int, replicates: np.ndarray) -> np.ndarray:
+    """Bootstrap weight matrix: how many times each row is drawn, with replacement, in each replicate. The draws come from a counter-based generator keyed by replicate and draw, so a replicate is the same whichever other replicates are generated with it.
+
+    Args:
+        seed (int): Seed of the generator
+        n_rows (int): Number of rows of the test data, also the number of draws of each replicate
+        replicates (np.ndarray): Index of each replicate to generate
+
+    Returns:
+        np.ndarray: Weight matrix (n_replicates, n_rows), each row summing to n_rows
+    """
+    replicates = np.asarray(replicates, dtype=np.int64)
+    draws = np.arange(n_rows, dtype=np.int64)
+    drawn_rows = (counter_uniform(seed, replicates[:, None], draws[None, :]) * n_rows).astype(np.int64)
+    cells = (np.arange(len(replicates), dtype=np.int64)[:, None] * n_rows + drawn_rows).ravel()
+    return np.bincount(cells, minlength=len(replicates) * n_rows).reshape(len(replicates), n_rows).astype(np.float64)
+
+
+def replicate_blocks(replicates: np.ndarray, n_rows: int) -> list[np.ndarray]:
+    """Splits the replicates in blocks whose weight matrix has at most BOOTSTRAP_BLOCK_CELLS cells"""
+    replicates = np.asarray(replicates, dtype=np.int64)
+    block_size = max(1, BOOTSTRAP_BLOCK_CELLS // max(n_rows, 1))
+    return [replicates[start:start + block_size] for start in range(0, len(replicates), block_size)]
+
+
+# Poisson(1) cumulative distribution up to the count where the remaining mass is below float precision
+_POISSON_1_CDF = np.cumsum(np.exp(-1.0) / np.cumprod(np.concatenate([[1.0], np.arange(1, 20)])))
+
+
+def poisson_weights(seed: int, replicates: np.ndarray, row_positions: np.ndarray) -> np.ndarray:
+    """Poisson(1) bootstrap weights: how many times each row appears in each replicate, drawn independently for every row, so the rows can be weighted as they arrive without knowing the size of the data. The weight of a row depends only on the seed, the replicate and the position of the row.
+
+    Args:
+        seed (int): Seed of the generator
+        replicates (np.ndarray): Index of each replicate
+        row_positions (np.ndarray): Position of each row in the data
+
+    Returns:
+        np.ndarray: Weight matrix (n_replicates, n_rows)
+    """
+    uniform = counter_uniform(seed, np.asarray(replicates, dtype=np.int64)[:, None], np.asarray(row_positions, dtype=np.int64)[None, :])
+    return np.searchsorted(_POISSON_1_CDF, uniform, side="right").astype(np.float64)
+
+
+class StreamingBootstrapWeighter:
+    """Assigns Poisson(1) bootstrap weights to rows that arrive chunk by chunk, keeping the position of the next row. The weights do not depend on the chunk size.
+    """
+    def __init__(self, n_replicates: int, random_state: int = 42) -> None:
+        """
+        Args:
+            n_replicates (int): Number of bootstrap replicates
+            random_state (int, optional): Seed of the weights. Defaults to 42.
+        """
+        self.replicates = np.arange(n_replicates)
+        self.random_state = random_state
+        self.position = 0
+
+    def assign(self, n_rows: int) -> Iterator[tuple]:
+        """Weights of the rows of the next chunk, generated lazily in row blocks whose weight matrix has at most BOOTSTRAP_BLOCK_CELLS cells
+
+        Args:
+            n_rows (int): Number of rows of the chunk
+
+        Returns:
+            Iterator[tuple]: Slice of the chunk rows and its weight matrix (n_replicates, rows of the slice), for each block
+        """
+        first_position = self.position
+        self.position += n_rows
+        return self._blocks(first_position, n_rows)
+
+    def _blocks(self, first_position: int, n_rows: int) -> Iterator[tuple]:
+        block_rows = max(1, BOOTSTRAP_BLOCK_CELLS // max(len(self.replicates), 1))
+        for start in range(0, n_rows, block_rows):
+            rows = slice(start, min(start + block_rows, n_rows))
+            positions = np.arange(first_position + rows.start, first_position + rows.stop)
+            yield rows, poisson_weights(self.random_state, self.replicates, positions)
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+def _timed(loader: Callable) -> tuple:
+    start = time.perf_counter()
+    try:
+        return loader(), None, time.perf_counter() - start
+    except Exception as error:
+        return None, error, time.perf_counter() - start
+
+
+def load_concurrently(loaders: dict, max_workers: int = None) -> tuple[dict, dict, dict]:
+    """Runs every loader on a bounded thread pool, so file reads and model deserializations overlap. Every loader is tried, whatever the others raise.
+
+    Args:
+        loaders (dict): Function without arguments by item name
+        max_workers (int, optional): Number of threads. None uses the ThreadPoolExecutor default. Defaults to None.
+
+    Returns:
+        tuple[dict, dict, dict]: Result of each item that loaded, seconds spent on each item and the exception of each item that failed, by item name in the order of the loaders
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(_timed, loader) for name, loader in loaders.items()}
+    results, timings, errors = {}, {}, {}
+    for name, future in futures.items():
+        result, error, elapsed = future.result()
+        timings[name] = elapsed
+        if error is None:
+            results[name] = result
+        else:
+            errors[name] = error
+    return results, timings, errors
+
+
+def load_errors_message(errors: dict, n_items: int, item_kind: str) -> str:
+    """Message reporting every item that failed to load"""
+    details = "; ".join(f"'{name}': {error.__class__.__name__}: {error}" for name, error in errors.items())
+    return f"{len(errors)} of {n_items} {item_kind} could not be added. {details}"
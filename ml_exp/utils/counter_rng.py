@@ -0,0 +1,50 @@
+import numpy as np
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def splitmix64(values: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer, a bijective mix of 64-bit integers with good statistical quality
+
+    Args:
+        values (np.ndarray): Integers to be mixed
+
+    Returns:
+        np.ndarray: Mixed values as uint64
+    """
+    with np.errstate(over="ignore"):
+        z = np.asarray(values, dtype=np.uint64) + _GOLDEN_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * _MIX_1
+        z = (z ^ (z >> np.uint64(27))) * _MIX_2
+        return z ^ (z >> np.uint64(31))
+
+
+def hash_counters(seed: int, *counters) -> np.ndarray:
+    """Counter-based random bits: the output for a given seed and counters does not depend on how many values were generated before, so rows read in any chunking get the same random values
+
+    Args:
+        seed (int): Seed of the generator
+        counters: Integers or integer arrays (broadcastable) identifying each random value
+
+    Returns:
+        np.ndarray: Random uint64 values
+    """
+    state = splitmix64(np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+    for counter in counters:
+        state = splitmix64(state ^ np.asarray(counter).astype(np.uint64))
+    return state
+
+
+def counter_uniform(seed: int, *counters) -> np.ndarray:
+    """Counter-based uniform values in [0, 1) with 53 bits of precision
+
+    Args:
+        seed (int): Seed of the generator
+        counters: Integers or integer arrays (broadcastable) identifying each random value
+
+    Returns:
+        np.ndarray: Random float64 values
+    """
+    return (hash_counters(seed, *counters) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Union
+import numpy as np
+import pandas as pd
+
+
+def file_fingerprint(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Generates the SHA-256 hash of the bytes of a file, reading it in chunks
+
+    Args:
+        file_path (Union[str, Path]): Path of the file
+        chunk_size (int, optional): Number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: Hexadecimal digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_fingerprint(obj) -> Union[str, None]:
+    """Generates the SHA-256 hash of the pickled object
+
+    Args:
+        obj: Object to be identified, usually a trained model
+
+    Returns:
+        Union[str, None]: Hexadecimal digest of the pickled object, or None if the object can not be pickled
+    """
+    try:
+        return hashlib.sha256(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+    except Exception:
+        return None
+
+
+def dataframe_fingerprint(*frames: pd.DataFrame) -> str:
+    """Generates a content hash of one or more DataFrames, covering column names, dtypes and the values of every row
+
+    Args:
+        frames (pd.DataFrame): DataFrames to be identified together
+
+    Returns:
+        str: Hexadecimal digest of the content
+    """
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(repr([(str(column), str(dtype)) for column, dtype in frame.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def file_identity(file_path: Union[str, Path]) -> tuple:
+    """Cheap identity of a file: its resolved path, size and modification time, so an unchanged file is recognized without reading it
+
+    Args:
+        file_path (Union[str, Path]): Path of the file
+
+    Returns:
+        tuple: Resolved path, size in bytes and modification time in nanoseconds
+    """
+    stat = os.stat(file_path)
+    return str(Path(file_path).resolve()), stat.st_size, stat.st_mtime_ns
+
+
+def dataframe_sample_fingerprint(frame: pd.DataFrame, n_samples: int = 1024) -> str:
+    """Generates a hash of the shape, column names, dtypes and of up to n_samples evenly spaced rows of a DataFrame. Equal frames always get the same hash; frames with the same hash still need a full comparison to be known equal.
+
+    Args:
+        frame (pd.DataFrame): DataFrame to be identified
+        n_samples (int, optional): Number of rows hashed. Defaults to 1024.
+
+    Returns:
+        str: Hexadecimal digest of the sample
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((frame.shape, [(str(column), str(dtype)) for column, dtype in frame.dtypes.items()])).encode())
+    rows = np.unique(np.linspace(0, len(frame) - 1, num=min(n_samples, len(frame)), dtype=np.int64))
+    digest.update(pd.util.hash_pandas_object(frame.iloc[rows], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def model_version(ml_model) -> tuple:
+    """Cheap identity of the current version of a model artifact, computed without reading or pickling it. Models loaded by path use the identity of the file; models loaded by object use the object and the identity of each of its attributes, which sklearn fit replaces, with the length of list and dict attributes, which a warm start grows.
+
+    Args:
+        ml_model (MLModel): Model loaded for a context
+
+    Returns:
+        tuple: Version of the artifact, equal while the artifact is unchanged
+    """
+    if ml_model.model_path is not None:
+        try:
+            return file_identity(ml_model.model_path)
+        except OSError:
+            return (ml_model.model_path,)
+    model_object = ml_model.model_object
+    attributes = getattr(model_object, "__dict__", {})
+    return (id(model_object),) + tuple((name, id(value), len(value) if isinstance(value, (list, dict)) else None)
+                                       for name, value in attributes.items())
+
+
+def model_fingerprint(ml_model, refresh: bool = False) -> Union[str, None]:
+    """Returns the fingerprint of the model artifact, kept in the model after it is computed. Models loaded by path are identified by the file content and models loaded by object by their pickled bytes.
+
+    A model refit in place or a model file replaced keeps its old fingerprint until it is refreshed, so each scoring run refreshes it before using it. A refresh only hashes the artifact again when its model_version changed, so unchanged models are not pickled again; a change made inside an attribute value without replacing it is not seen, and needs model_fingerprint to be set to None.
+
+    Args:
+        ml_model (MLModel): Model loaded for a context
+        refresh (bool, optional): Computes the fingerprint again if the artifact changed since it was computed. Defaults to False.
+
+    Returns:
+        Union[str, None]: Hexadecimal digest of the artifact, or None if the model can not be identified
+    """
+    if ml_model.model_fingerprint is not None and not refresh:
+        return ml_model.model_fingerprint
+    version = model_version(ml_model)
+    if ml_model.model_fingerprint is None or version != ml_model.fingerprint_version:
+        if ml_model.model_path is not None:
+            ml_model.model_fingerprint = file_fingerprint(ml_model.model_path)
+        else:
+            ml_model.model_fingerprint = object_fingerprint(ml_model.model_object)
+        ml_model.fingerprint_version = version
+    return ml_model.model_fingerprint
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from ml_exp.utils.counter_rng import hash_counters
+
+
+def class_codes(y) -> np.ndarray:
+    """Integer code of the class of each row, by hashing instead of sorting. Targets with several columns are coded by row."""
+    y = np.asarray(y)
+    if y.ndim == 2 and y.shape[1] == 1:
+        y = y.ravel()
+    if y.ndim == 2:
+        y = pd.util.hash_pandas_object(pd.DataFrame(y), index=False).to_numpy()
+    codes, _ = pd.factorize(y, use_na_sentinel=False)
+    return codes
+
+
+def fast_fold_ids(y, n_splits: int, random_state: int = 42, stratified: bool = True) -> np.ndarray:
+    """Assigns each row to a fold in O(n): the rows are shuffled by a seeded permutation, grouped by class with a stable radix sort of the class codes, and dealt to the folds round-robin. Every class is spread over the folds with counts differing by at most one, and so are the fold sizes, for any number of classes or folds. Only the fold vector is built, no train/test index pairs.
+
+    Args:
+        y: Expected values of the test data, used for the stratification
+        n_splits (int): Number of folds, may exceed the number of rows of a class
+        random_state (int, optional): Seed of the permutation. Defaults to 42.
+        stratified (bool, optional): Keeps the class proportions in every fold. Defaults to True.
+
+    Returns:
+        np.ndarray: Fold of each row (int32)
+    """
+    n_rows = len(y)
+    order = np.random.default_rng(random_state).permutation(n_rows)
+    if stratified:
+        codes = class_codes(y)[order]
+        # numpy sorts integers of up to 16 bits with a stable radix sort, in linear time
+        code_type = np.int16 if codes.max(initial=0) < np.iinfo(np.int16).max else np.int64
+        order = order[np.argsort(codes.astype(code_type, copy=False), kind="stable")]
+    fold_ids = np.empty(n_rows, dtype=np.int32)
+    fold_ids[order] = np.arange(n_rows, dtype=np.int64) % n_splits
+    return fold_ids
+
+
+class StreamingFoldAssigner:
+    """Assigns folds to rows that arrive chunk by chunk, without knowing the size of the data. Each class keeps a running position, and every block of n_splits consecutive positions of a class receives a random permutation of the folds, so folds stay balanced and stratified at any point of the stream. The permutations come from a counter-based generator, so the assignment does not depend on the chunk size.
+    """
+    def __init__(self, n_splits: int, random_state: int = 42, stratified: bool = True) -> None:
+        """
+        Args:
+            n_splits (int): Number of folds
+            random_state (int, optional): Seed of the fold permutations. Defaults to 42.
+            stratified (bool, optional): Keeps the class proportions in every fold. Defaults to True.
+        """
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.stratified = stratified
+        self.positions = {}
+
+    def _class_keys(self, y: np.ndarray) -> np.ndarray:
+        if not self.stratified:
+            return np.zeros(len(y), dtype=np.uint64)
+        return pd.util.hash_array(np.asarray(y))
+
+    def _block_ranks(self, class_key: np.uint64, first_block: int, n_blocks: int) -> np.ndarray:
+        """Fold of each position of the given blocks, ranking counter-based random keys inside every block"""
+        block_positions = np.arange(first_block * self.n_splits, (first_block + n_blocks) * self.n_splits, dtype=np.uint64)
+        random_keys = hash_counters(self.random_state, class_key, block_positions).reshape(n_blocks, self.n_splits)
+        order = np.argsort(random_keys, axis=1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(self.n_splits), axis=1)
+        return ranks.ravel()
+
+    def assign(self, y: np.ndarray) -> np.ndarray:
+        """Assigns the fold of each row of the next chunk
+
+        Args:
+            y (np.ndarray): Expected values of the rows of the chunk, used for the stratification
+
+        Returns:
+            np.ndarray: Fold of each row (int32)
+        """
+        class_keys = self._class_keys(y)
+        fold_ids = np.empty(len(class_keys), dtype=np.int32)
+        unique_keys, inverse = np.unique(class_keys, return_inverse=True)
+        for class_index, class_key in enumerate(unique_keys):
+            rows = np.flatnonzero(inverse == class_index)
+            start = self.positions.get(class_key, 0)
+            first_block = start // self.n_splits
+            n_blocks = (start + len(rows) - 1) // self.n_splits - first_block + 1
+            positions = np.arange(start, start + len(rows)) - first_block * self.n_splits
+            fold_ids[rows] = self._block_ranks(class_key, first_block, n_blocks)[positions]
+            self.positions[class_key] = start + len(rows)
+        return fold_ids
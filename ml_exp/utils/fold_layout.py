@@ -0,0 +1,46 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+class FoldLayout:
+    """Order of the rows of a test data grouped by fold, computed once and shared by every context, so the rows of any folds are an offset range of the order. The layout keeps only the index arrays and references to the test data: the rows of the folds are gathered when they are selected, once for all contexts scored together, and released after their scoring instead of being kept as a second copy of the test data.
+    """
+    def __init__(self, X_test: pd.DataFrame, y_test: pd.DataFrame, fold_ids: np.ndarray, n_folds: int) -> None:
+        """
+        Args:
+            X_test (pd.DataFrame): Test data used as model input
+            y_test (pd.DataFrame): Expected values of the test data
+            fold_ids (np.ndarray): Fold of each row of the test data
+            n_folds (int): Number of folds
+        """
+        self.X_test = X_test
+        self.y_test = y_test
+        self.order = np.argsort(fold_ids, kind="stable")
+        self.counts = np.bincount(fold_ids, minlength=n_folds)
+        self.bounds = np.concatenate([[0], np.cumsum(self.counts)])
+        # identifies the row order, so predictions cached for the reordered rows are not mixed with the original ones
+        self.key = hashlib.sha256(self.order.tobytes()).hexdigest()[:16]
+
+    def rows(self, folds: np.ndarray) -> np.ndarray:
+        """Positions of the rows of the given folds in the test data, fold after fold in the order given. Consecutive increasing folds are a single range of the order."""
+        folds = np.asarray(folds, dtype=np.int64)
+        if len(folds) and np.all(np.diff(folds) == 1):
+            return self.order[self.bounds[folds[0]]:self.bounds[folds[-1] + 1]]
+        if not len(folds):
+            return np.array([], dtype=np.int64)
+        return np.concatenate([self.order[self.bounds[fold]:self.bounds[fold + 1]] for fold in folds])
+
+    def select(self, folds: np.ndarray) -> tuple:
+        """Rows of the given folds grouped by fold, with the folds renumbered in the order given. The rows are gathered in one copy, to be shared by the contexts scored on them.
+
+        Args:
+            folds (np.ndarray): Folds to be selected
+
+        Returns:
+            tuple: X_test, y_test and the renumbered fold of each row
+        """
+        folds = np.asarray(folds, dtype=np.int64)
+        rows = self.rows(folds)
+        return (self.X_test.iloc[rows].reset_index(drop=True), self.y_test.iloc[rows].reset_index(drop=True),
+                np.repeat(np.arange(len(folds), dtype=np.int32), self.counts[folds]))
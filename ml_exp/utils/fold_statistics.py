@@ -0,0 +1,291 @@
+import numpy as np
+from scipy import sparse
+
+SCORES_FROM_CLASS_COUNTS = ["accuracy", "precision", "recall", "f1", "specificity", "balanced_accuracy", "mcc"]
+SCORES_FROM_CONFUSION = SCORES_FROM_CLASS_COUNTS + ["roc_auc", "precision_recall"]
+SCORES_FROM_MOMENTS = ["mae", "mse", "r2"]
+# bound of the label set of the confusion matrices, each fold keeping max_labels ** 2 counts
+MAX_CONFUSION_LABELS = 1024
+
+
+def check_label_values(values: np.ndarray, values_name: str) -> None:
+    """Rejects continuous values, such as probabilities or regression outputs, before they are taken as the labels of classification metrics
+
+    Args:
+        values (np.ndarray): Expected or predicted values
+        values_name (str): Name of the values in the error message
+
+    Raises:
+        ValueError: If the values are not integral
+    """
+    if values.dtype.kind in "fc" and not np.all(values == np.round(values)):
+        raise ValueError(f"{values_name} need to be class labels to compute classification metrics, as the output of predict. "
+                         f"Continuous values found, such as {values[values != np.round(values)][:3].tolist()}.")
+
+
+def check_label_count(n_labels: int) -> None:
+    """Rejects label sets too large for the class counts of every fold
+
+    Args:
+        n_labels (int): Number of distinct labels
+
+    Raises:
+        ValueError: If there are more than MAX_CONFUSION_LABELS labels
+    """
+    if n_labels > MAX_CONFUSION_LABELS:
+        raise ValueError(f"Classification metrics need at most {MAX_CONFUSION_LABELS} distinct labels. Labels found: {n_labels}")
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that scores 0.0 where the denominator is zero, as sklearn zero_division does"""
+    numerator, denominator = np.asarray(numerator, dtype=np.float64), np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def metric_from_class_counts(score_target: str, labels: np.ndarray, true_positive: np.ndarray, true_count: np.ndarray, pred_count: np.ndarray) -> np.ndarray:
+    """Derives a classification metric of every fold from the per-fold, per-class counts of a confusion matrix: its diagonal (true_positive), row sums (true_count) and column sums (pred_count), all with shape (n_folds, n_labels).
+
+    Targets with up to two labels are scored as binary, the positive class being the label 1 (or the greatest label when 1 is absent). With more labels precision, recall, f1 and specificity are the macro average over the labels present in each fold, as sklearn average="macro" does. Undefined ratios score 0.0.
+
+    Args:
+        score_target (str): One of SCORES_FROM_CLASS_COUNTS
+        labels (np.ndarray): Sorted labels, the columns of the counts
+        true_positive (np.ndarray): Rows of each fold predicted as their own label
+        true_count (np.ndarray): Rows of each fold whose expected value is the label
+        pred_count (np.ndarray): Rows of each fold predicted as the label
+
+    Raises:
+        ValueError: If the metric can not be derived from class counts
+
+    Returns:
+        np.ndarray: Metric value of each fold
+    """
+    if score_target not in SCORES_FROM_CLASS_COUNTS:
+        raise ValueError(f"Metric {score_target} can not be derived from class counts. Only {SCORES_FROM_CLASS_COUNTS} are supported.")
+    true_positive, true_count, pred_count = (np.asarray(counts, dtype=np.float64) for counts in (true_positive, true_count, pred_count))
+    total = true_count.sum(axis=1)
+
+    if score_target == "accuracy":
+        return true_positive.sum(axis=1) / total
+    if score_target == "balanced_accuracy":
+        # recall averaged over the labels expected in each fold
+        expected = true_count > 0
+        return _safe_divide(true_positive, true_count).sum(axis=1, where=expected) / expected.sum(axis=1)
+    if score_target == "mcc":
+        covariance_true_pred = true_positive.sum(axis=1) * total - (true_count * pred_count).sum(axis=1)
+        covariance_pred = total ** 2 - (pred_count ** 2).sum(axis=1)
+        covariance_true = total ** 2 - (true_count ** 2).sum(axis=1)
+        return _safe_divide(covariance_true_pred, np.sqrt(covariance_pred * covariance_true))
+
+    false_positive = pred_count - true_positive
+    false_negative = true_count - true_positive
+    true_negative = total[:, None] - true_count - pred_count + true_positive
+    by_label = {
+        "precision": lambda: _safe_divide(true_positive, true_positive + false_positive),
+        "recall": lambda: _safe_divide(true_positive, true_positive + false_negative),
+        "f1": lambda: _safe_divide(2 * true_positive, 2 * true_positive + false_positive + false_negative),
+        "specificity": lambda: _safe_divide(true_negative, true_negative + false_positive),
+    }[score_target]()
+
+    if len(labels) <= 2:
+        positive_index = np.flatnonzero(labels == 1)
+        positive_index = positive_index[0] if len(positive_index) else len(labels) - 1
+        return by_label[:, positive_index]
+    present = (true_count + pred_count) > 0
+    return by_label.sum(axis=1, where=present) / present.sum(axis=1)
+
+
+class FoldStatisticsAccumulator:
+    """Accumulates per-fold sufficient statistics of the predictions, so the performance metrics of every fold can be computed after any number of chunks without keeping the rows. Classification metrics come from a confusion matrix per fold and regression metrics from running moments per fold.
+
+    roc_auc and precision_recall are derived from the confusion matrix, which is exact for label predictions of binary targets (the output of predict), but not for continuous scores.
+
+    With weighted updates each fold is a bootstrap replicate, every row adding its weight in that replicate to the statistics of the replicate.
+    """
+    def __init__(self, scores_target: list[str], n_folds: int) -> None:
+        """
+        Args:
+            scores_target (list[str]): Performance metrics to be computed
+            n_folds (int): Number of folds
+        """
+        unsupported = [score for score in scores_target if score not in SCORES_FROM_CONFUSION + SCORES_FROM_MOMENTS]
+        if unsupported:
+            raise ValueError(f"Metrics {unsupported} not supported. Only {SCORES_FROM_CONFUSION + SCORES_FROM_MOMENTS} are supported.")
+        self.scores_target = scores_target
+        self.n_folds = n_folds
+
+        self.use_confusion = any(score in SCORES_FROM_CONFUSION for score in scores_target)
+        self.labels = None
+        self.confusion = np.zeros((n_folds, 0, 0), dtype=np.int64)
+
+        self.use_moments = any(score in SCORES_FROM_MOMENTS for score in scores_target)
+        self.count = np.zeros(n_folds)
+        self.mean_true = np.zeros(n_folds)
+        self.m2_true = np.zeros(n_folds)
+        self.sum_absolute_error = np.zeros(n_folds)
+        self.sum_squared_error = np.zeros(n_folds)
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray, fold_ids: np.ndarray = None, weights: np.ndarray = None) -> None:
+        """Adds the rows of a chunk to the statistics of their folds, or to the statistics of every fold with the weight of the row in it
+
+        Args:
+            y_true (np.ndarray): Expected values of the rows
+            y_pred (np.ndarray): Predicted values of the rows
+            fold_ids (np.ndarray, optional): Fold of each row. Defaults to None.
+            weights (np.ndarray, optional): Integer weight of each row in each fold, with shape (n_folds, n_rows), used instead of fold_ids for bootstrap replicates. Defaults to None.
+
+        Raises:
+            ValueError: If not exactly one of fold_ids and weights is given
+        """
+        if (fold_ids is None) == (weights is None):
+            raise ValueError("Exactly one of fold_ids and weights need to be given.")
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            if self.use_confusion:
+                self._update_confusion(y_true, y_pred, weights=weights)
+            if self.use_moments:
+                self._update_moments_weighted(y_true.astype(np.float64), y_pred.astype(np.float64), weights)
+            return
+
+        fold_ids = np.asarray(fold_ids)
+        if self.use_confusion:
+            self._update_confusion(y_true, y_pred, fold_ids=fold_ids)
+        if self.use_moments:
+            self._update_moments(y_true.astype(np.float64), y_pred.astype(np.float64), fold_ids)
+
+    def _update_confusion(self, y_true, y_pred, fold_ids=None, weights=None) -> None:
+        true_labels, pred_labels = np.unique(y_true), np.unique(y_pred)
+        check_label_values(true_labels, "Expected values")
+        check_label_values(pred_labels, "Predicted values")
+        chunk_labels = np.union1d(true_labels, pred_labels)
+        check_label_count(len(chunk_labels) if self.labels is None else len(np.union1d(self.labels, chunk_labels)))
+        if self.labels is None:
+            self.labels = chunk_labels
+            self.confusion = np.zeros((self.n_folds, len(chunk_labels), len(chunk_labels)), dtype=np.int64)
+        new_labels = np.setdiff1d(chunk_labels, self.labels)
+        if len(new_labels):
+            labels = np.union1d(self.labels, new_labels)
+            # keeps the counts already accumulated at the positions of their labels in the grown matrix
+            old_index = np.searchsorted(labels, self.labels)
+            confusion = np.zeros((self.n_folds, len(labels), len(labels)), dtype=np.int64)
+            confusion[:, old_index[:, None], old_index[None, :]] = self.confusion
+            self.labels, self.confusion = labels, confusion
+
+        n_labels = len(self.labels)
+        cells = np.searchsorted(self.labels, y_true) * n_labels + np.searchsorted(self.labels, y_pred)
+        if weights is not None:
+            # weight of each cell in every fold, a product of the weights with the sparse cell indicator of the rows
+            indicator = sparse.csr_matrix((np.ones(len(cells)), (np.arange(len(cells)), cells)), shape=(len(cells), n_labels * n_labels))
+            counts = np.asarray((indicator.T @ weights.T).T)
+            self.confusion += np.rint(counts).astype(np.int64).reshape(self.confusion.shape)
+            return
+        cells += fold_ids.astype(np.int64) * n_labels * n_labels
+        self.confusion += np.bincount(cells, minlength=self.n_folds * n_labels * n_labels).reshape(self.confusion.shape)
+
+    def _update_moments(self, y_true, y_pred, fold_ids) -> None:
+        count = np.bincount(fold_ids, minlength=self.n_folds).astype(np.float64)
+        present = count > 0
+        mean_true = np.zeros(self.n_folds)
+        mean_true[present] = np.bincount(fold_ids, weights=y_true, minlength=self.n_folds)[present] / count[present]
+        m2_true = np.bincount(fold_ids, weights=(y_true - mean_true[fold_ids]) ** 2, minlength=self.n_folds)
+
+        error = y_pred - y_true
+        self._merge_moments(count, mean_true, m2_true,
+                            np.bincount(fold_ids, weights=np.abs(error), minlength=self.n_folds),
+                            np.bincount(fold_ids, weights=error ** 2, minlength=self.n_folds))
+
+    def _update_moments_weighted(self, y_true, y_pred, weights) -> None:
+        count = weights.sum(axis=1)
+        # centered on the chunk mean to limit the cancellation of the weighted variance
+        center = y_true.mean() if len(y_true) else 0.0
+        centered = y_true - center
+        present = count > 0
+        mean_true = np.full(self.n_folds, center)
+        mean_true[present] += (weights @ centered)[present] / count[present]
+        m2_true = np.maximum(weights @ centered ** 2 - count * (mean_true - center) ** 2, 0.0)
+
+        error = y_pred - y_true
+        self._merge_moments(count, mean_true, m2_true, weights @ np.abs(error), weights @ error ** 2)
+
+    def _merge_moments(self, count, mean_true, m2_true, sum_absolute_error, sum_squared_error) -> None:
+        # merges the chunk moments with the accumulated ones (Chan et al. parallel variance)
+        total = self.count + count
+        delta = mean_true - self.mean_true
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(total > 0, count / total, 0.0)
+        self.m2_true += m2_true + delta ** 2 * self.count * weight
+        self.mean_true += delta * weight
+        self.count = total
+        self.sum_absolute_error += sum_absolute_error
+        self.sum_squared_error += sum_squared_error
+
+    def _binary_counts(self, positive_label) -> tuple:
+        """True positives, false positives and number of positive and negative rows of each fold, treating positive_label as the positive class"""
+        if self.labels is None:
+            raise ValueError("No predictions were accumulated.")
+        if len(self.labels) > 2:
+            raise ValueError(f"roc_auc and precision_recall are supported only for binary targets. Labels found: {self.labels.tolist()}")
+        positive_index = np.flatnonzero(self.labels == positive_label)
+        if not len(positive_index):
+            zeros = np.zeros(self.n_folds)
+            return zeros, zeros, zeros, self.confusion.sum(axis=(1, 2)).astype(np.float64)
+        positive_index = positive_index[0]
+        positives = self.confusion[:, positive_index, :].sum(axis=1).astype(np.float64)
+        predicted_positive = self.confusion[:, :, positive_index].sum(axis=1).astype(np.float64)
+        true_positive = self.confusion[:, positive_index, positive_index].astype(np.float64)
+        negatives = self.confusion.sum(axis=(1, 2)) - positives
+        return true_positive, predicted_positive - true_positive, positives, negatives
+
+    def roc_auc(self) -> np.ndarray:
+        # for label predictions the ROC curve has a single threshold, so the area is (TPR + TNR) / 2
+        positive_label = self.labels[-1] if self.labels is not None and len(self.labels) else None
+        true_positive, false_positive, positives, negatives = self._binary_counts(positive_label)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = 0.5 * (1 + true_positive / positives - false_positive / negatives)
+        result[(positives == 0) | (negatives == 0)] = np.nan
+        return result
+
+    def precision_recall(self, positive_label=1) -> np.ndarray:
+        # thresholds of label predictions: the positive predictions first, then every row
+        true_positive, false_positive, positives, negatives = self._binary_counts(positive_label)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision_at_positive = np.where(true_positive + false_positive > 0, true_positive / (true_positive + false_positive), 0.0)
+            result = (true_positive * precision_at_positive + (positives - true_positive) * positives / (positives + negatives)) / positives
+        result[positives == 0] = 0.0
+        return result
+
+    def mae(self) -> np.ndarray:
+        return self.sum_absolute_error / self.count
+
+    def mse(self) -> np.ndarray:
+        return self.sum_squared_error / self.count
+
+    def r2(self) -> np.ndarray:
+        result = np.ones(self.n_folds)
+        valid = self.m2_true != 0
+        result[valid] = 1 - self.sum_squared_error[valid] / self.m2_true[valid]
+        result[~valid & (self.sum_squared_error != 0)] = 0.0
+        return result
+
+    def compute(self) -> dict:
+        """Computes the performance metrics of every fold from the accumulated statistics
+
+        Returns:
+            dict: Metric value of each fold by performance metric
+        """
+        results = {}
+        for score_target in self.scores_target:
+            if score_target in SCORES_FROM_CLASS_COUNTS:
+                if self.labels is None:
+                    raise ValueError("No predictions were accumulated.")
+                results[score_target] = metric_from_class_counts(score_target,
+                                                                 self.labels,
+                                                                 np.diagonal(self.confusion, axis1=1, axis2=2),
+                                                                 self.confusion.sum(axis=2),
+                                                                 self.confusion.sum(axis=1))
+            else:
+                results[score_target] = getattr(self, score_target)()
+        return results
@@ -0,0 +1,75 @@
+import warnings
+import numpy as np
+
+
+def to_score_matrix(scores_data: dict) -> tuple:
+    """Gathers the metric values of every context in a single matrix, one row per context, padding contexts with fewer values with nan
+
+    Args:
+        scores_data (dict): List of metric values by context name
+
+    Returns:
+        tuple: Context names, the score matrix (n_contexts, max number of values) and the number of values of each context
+    """
+    context_names = list(scores_data.keys())
+    lengths = np.array([len(scores) for scores in scores_data.values()], dtype=np.int64)
+    matrix = np.full((len(context_names), lengths.max(initial=0)), np.nan)
+    for row, scores in enumerate(scores_data.values()):
+        matrix[row, :len(scores)] = scores
+    return context_names, matrix, lengths
+
+
+def row_mode(matrix: np.ndarray) -> np.ndarray:
+    """Most common value of each row ignoring nan. Among values equally common, the one that occurs first wins, as statistics.mode does.
+
+    Args:
+        matrix (np.ndarray): Score matrix
+
+    Returns:
+        np.ndarray: Mode of each row, nan for rows without values
+    """
+    n_rows, n_cols = matrix.shape
+    result = np.full(n_rows, np.nan)
+    if not n_cols:
+        return result
+
+    # stable sort: the first cell of each run of equal values is its first occurrence in the row
+    order = np.argsort(matrix, axis=1, kind="stable")
+    sorted_values = np.take_along_axis(matrix, order, axis=1).ravel()
+    new_run = np.ones(n_rows * n_cols, dtype=bool)
+    new_run[1:] = sorted_values[1:] != sorted_values[:-1]
+    new_run[::n_cols] = True
+    run_starts = np.flatnonzero(new_run)
+    run_counts = np.diff(np.append(run_starts, len(sorted_values)))
+    run_rows = run_starts // n_cols
+    first_occurrence = order.ravel()[run_starts]
+
+    # the most common run wins, ties broken by the earliest occurrence; nan runs never win
+    run_key = np.where(np.isnan(sorted_values[run_starts]), -1, run_counts * (n_cols + 1) + (n_cols - first_occurrence))
+    # every row starts a run, so the runs of each row are a contiguous segment; keys are unique inside a row
+    best_key = np.maximum.reduceat(run_key, np.searchsorted(run_rows, np.arange(n_rows)))
+    winners = np.flatnonzero((run_key == best_key[run_rows]) & (run_key >= 0))
+    result[run_rows[winners]] = sorted_values[run_starts[winners]]
+    return result
+
+
+def describe_score_matrix(matrix: np.ndarray) -> dict:
+    """Descriptive statistics of every row of a score matrix in a single pass, ignoring nan (padding or undefined metric values)
+
+    Args:
+        matrix (np.ndarray): Score matrix, one row per context
+
+    Returns:
+        dict: Mean, sample standard deviation, median, minimum, maximum and mode of each row
+    """
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        # rows without values (or a single one, for std) are nan instead of warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {
+            "mean": np.nanmean(matrix, axis=1),
+            "std": np.nanstd(matrix, axis=1, ddof=1),
+            "median": np.nanmedian(matrix, axis=1),
+            "minimum": np.nanmin(matrix, axis=1),
+            "maximum": np.nanmax(matrix, axis=1),
+            "mode": row_mode(matrix),
+        }
@@ -0,0 +1,54 @@
+import numpy as np
+
+from ml_exp.service.experimental_pipeline_service import ExperimentalPipelineService
+from ml_exp.repository.score_matrix_repository import ScoreMatrixRepository
+
+
+def run_champion_pipeline(scores, baseline_context):
+    experimental_pipeline = ExperimentalPipelineService(scores_data={"accuracy": scores}, baseline_context=baseline_context)
+    experimental_pipeline.run_pipeline()
+    return experimental_pipeline.get_general_report()
+
+
+def test_champion_is_replaced_only_by_a_challenger_that_beats_it():
+    rng = np.random.default_rng(0)
+    # skewed values send the pipeline to the non-parametric branch
+    scores = {
+        "champion": list(0.80 - rng.exponential(0.02, 60)),
+        "worse": list(0.70 - rng.exponential(0.02, 60)),
+        "better": list(0.90 - rng.exponential(0.02, 60)),
+    }
+
+    report = run_champion_pipeline(scores, "champion")
+    ab_tests = report.reports_by_score[0].ab_tests
+    assert "compare_against_baseline" in ab_tests.pipeline_track
+    assert [(r.context_name_1, r.context_name_2) for r in ab_tests.mannwhitney] == [("champion", "worse"), ("champion", "better")]
+    assert report.best_context_index == "better"
+
+    del scores["better"]
+    report = run_champion_pipeline(scores, "champion")
+    assert report.best_context_index == "champion"
+    assert report.message_about_significancy == ["No challenger significantly beats the champion champion around accuracy."]
+
+
+def test_pipeline_reruns_from_exported_score_matrix(tmp_path):
+    rng = np.random.default_rng(1)
+    scores_data = {
+        "accuracy": {"a": list(0.80 - rng.exponential(0.02, 60)), "b": list(0.90 - rng.exponential(0.02, 40))},
+        "f1": {"a": [0.5, float("nan"), 0.7] * 20, "b": list(rng.uniform(0.6, 0.8, 40))},
+    }
+    experimental_pipeline = ExperimentalPipelineService(scores_data=scores_data, alpha=0.01, baseline_context="a")
+    experimental_pipeline.run_pipeline()
+    path = experimental_pipeline.export_scores_data(report_path=str(tmp_path),
+                                                    fold_sizes={"a": np.full(60, 10), "b": np.full(40, 15)},
+                                                    metadata={"random_state": 7})
+
+    score_file = ScoreMatrixRepository().load(path)
+    assert score_file["metadata"]["random_state"] == 7
+    np.testing.assert_array_equal(score_file["fold_sizes"]["b"], np.full(40, 15))
+
+    reloaded = ExperimentalPipelineService.from_scores_file(path)
+    np.testing.assert_equal(reloaded.scores_data, scores_data)
+    assert (reloaded.alpha, reloaded.baseline_context) == (0.01, "a")
+    reloaded.run_pipeline()
+    assert reloaded.get_general_report().json() == experimental_pipeline.get_general_report().json()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from sklearn.model_selection import StratifiedKFold
+
+from ml_exp.utils.fold_assignment import StreamingFoldAssigner, fast_fold_ids
+from ml_exp.service.fold_assignment_service import FoldAssignmentService
+from ml_exp.utils.fold_layout import FoldLayout
+
+
+def assign_in_chunks(y, n_splits, n_chunks, stratified=True):
+    fold_assigner = StreamingFoldAssigner(n_splits=n_splits, random_state=7, stratified=stratified)
+    return np.concatenate([fold_assigner.assign(chunk) for chunk in np.array_split(y, n_chunks)])
+
+
+def test_streaming_assignment_does_not_depend_on_chunk_size():
+    y = np.random.default_rng(0).integers(0, 3, size=5000)
+
+    np.testing.assert_array_equal(assign_in_chunks(y, 10, 1), assign_in_chunks(y, 10, 37))
+
+
+@pytest.mark.parametrize("n_chunks", [1, 23])
+def test_streaming_assignment_is_balanced_and_stratified(n_chunks):
+    y = np.random.default_rng(1).choice(["a", "b", "c"], p=[0.7, 0.2, 0.1], size=4003)
+
+    fold_ids = assign_in_chunks(y, 9, n_chunks)
+
+    assert np.ptp(np.bincount(fold_ids, minlength=9)) <= 3
+    for label in ["a", "b", "c"]:
+        assert np.ptp(np.bincount(fold_ids[y == label], minlength=9)) <= 1
+
+
+def test_streaming_assignment_without_stratification_is_balanced():
+    y = np.random.default_rng(2).normal(size=1001)
+
+    fold_ids = assign_in_chunks(y, 10, 7, stratified=False)
+
+    assert np.ptp(np.bincount(fold_ids, minlength=10)) <= 1
+
+
+def test_fold_assignment_service_matches_stratified_kfold_and_is_shared():
+    X = pd.DataFrame({"feature": np.arange(300)})
+    y = pd.DataFrame({"target": np.random.default_rng(1).integers(0, 2, size=300)})
+    fold_assignment_service = FoldAssignmentService(n_splits=10, random_state=5)
+
+    fold_ids = fold_assignment_service.get_fold_ids("test", X, y, data_fingerprint="abc")
+
+    splitter = StratifiedKFold(n_splits=10, shuffle=True, random_state=5)
+    for fold, (_, test_index) in enumerate(splitter.split(X, y)):
+        np.testing.assert_array_equal(np.flatnonzero(fold_ids == fold), test_index)
+    assert fold_ids.dtype == np.int32
+    assert fold_assignment_service.get_fold_ids("test", X, y) is fold_ids
+    assert fold_assignment_service.get_fold_ids("same_content", X, y, data_fingerprint="abc") is fold_ids
+
+
+def test_fold_assignment_service_persists_assignment_by_fingerprint(tmp_path):
+    X = pd.DataFrame({"feature": np.arange(200)})
+    y = pd.DataFrame({"target": np.arange(200) % 3})
+    expected = FoldAssignmentService(n_splits=5, cache_dir=tmp_path).get_fold_ids("test", X, y, data_fingerprint="abc")
+
+    fold_assignment_service = FoldAssignmentService(n_splits=5, cache_dir=tmp_path)
+    with patch.object(FoldAssignmentService, "generate_fold_ids") as generate_fold_ids:
+        fold_ids = fold_assignment_service.get_fold_ids("test", X, y, data_fingerprint="abc")
+
+    generate_fold_ids.assert_not_called()
+    np.testing.assert_array_equal(fold_ids, expected)
+    assert len(list(tmp_path.glob("folds_abc_stratified_5_42.npy"))) == 1
+
+
+def max_proportion_gap(y, fold_ids, n_splits):
+    """Largest difference between the share of a class in a fold and in the whole data"""
+    classes = np.unique(y)
+    shares = np.array([[np.mean(y[fold_ids == fold] == label) for label in classes] for fold in range(n_splits)])
+    return np.abs(shares - np.array([np.mean(y == label) for label in classes])).max()
+
+
+def test_fast_assignment_is_stratified_as_stratified_kfold():
+    y = np.random.default_rng(3).choice(12, p=np.arange(1, 13) / 78, size=20011)
+    X = pd.DataFrame({"feature": np.arange(len(y))})
+    y_test = pd.DataFrame({"target": y})
+
+    fold_ids = FoldAssignmentService(n_splits=10, random_state=4, fold_strategy="fast").generate_fold_ids(X, y_test)
+    sklearn_fold_ids = FoldAssignmentService(n_splits=10, random_state=4).generate_fold_ids(X, y_test)
+
+    assert fold_ids.dtype == np.int32
+    assert np.ptp(np.bincount(fold_ids, minlength=10)) <= 1
+    for label in range(12):
+        assert np.ptp(np.bincount(fold_ids[y == label], minlength=10)) <= 1
+    assert max_proportion_gap(y, fold_ids, 10) <= max_proportion_gap(y, sklearn_fold_ids, 10) + 1e-3
+    np.testing.assert_array_equal(fast_fold_ids(y_test, 10, random_state=4), fold_ids)
+    assert not np.array_equal(fast_fold_ids(y_test, 10, random_state=5), fold_ids)
+
+
+def test_fast_assignment_supports_more_folds_than_class_members():
+    y = np.repeat(["a", "b", "c"], [5000, 300, 7])
+
+    fold_ids = fast_fold_ids(y, n_splits=1000)
+
+    assert np.ptp(np.bincount(fold_ids, minlength=1000)) <= 1
+    assert np.bincount(fold_ids[y == "b"], minlength=1000).max() == 1
+    assert len(np.unique(fold_ids[y == "c"])) == 7
+    assert np.ptp(np.bincount(fast_fold_ids(y, n_splits=7, stratified=False), minlength=7)) <= 1
+
+
+def test_fast_assignment_is_cached_apart_from_sklearn_assignment(tmp_path):
+    X = pd.DataFrame({"feature": np.arange(200)})
+    y = pd.DataFrame({"target": np.arange(200) % 3})
+
+    FoldAssignmentService(n_splits=5, cache_dir=tmp_path).get_fold_ids("test", X, y, data_fingerprint="abc")
+    FoldAssignmentService(n_splits=5, cache_dir=tmp_path, fold_strategy="fast").get_fold_ids("test", X, y, data_fingerprint="abc")
+
+    assert sorted(path.name for path in tmp_path.glob("folds_abc_*")) == ["folds_abc_stratified_5_42.npy",
+                                                                         "folds_abc_stratified_fast_5_42.npy"]
+    with pytest.raises(ValueError):
+        FoldAssignmentService(n_splits=5, fold_strategy="random")
+
+
+def test_fold_layout_selects_folds_without_keeping_a_copy_of_the_test_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": rng.integers(0, 2, 500)})
+    fold_ids = FoldAssignmentService(n_splits=10).generate_fold_ids(X, y)
+    layout = FoldLayout(X, y, fold_ids, n_folds=10)
+    assert layout.X_test is X and layout.y_test is y
+
+    X_rows, y_rows, fold_rows = layout.select([3, 4, 5])
+    # consecutive folds are a single range of the fold order
+    assert np.shares_memory(layout.rows([3, 4, 5]), layout.order)
+    rows = np.flatnonzero(np.isin(fold_ids, [3, 4, 5]))
+    assert sorted(map(tuple, X_rows.to_numpy())) == sorted(map(tuple, X.to_numpy()[rows]))
+    np.testing.assert_array_equal(np.bincount(fold_rows), np.bincount(fold_ids)[[3, 4, 5]])
+
+    # folds out of order are renumbered in the order given
+    X_rows, y_rows, fold_rows = layout.select([7, 1])
+    np.testing.assert_array_equal(X_rows.to_numpy()[fold_rows == 0], X.to_numpy()[fold_ids == 7])
+    np.testing.assert_array_equal(y_rows.to_numpy()[fold_rows == 1], y.to_numpy()[fold_ids == 1])
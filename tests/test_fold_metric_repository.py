@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+from functools import partial
+from sklearn.metrics import (accuracy_score, roc_auc_score, mean_absolute_error, mean_squared_error,
+                             r2_score, average_precision_score, precision_score, recall_score, f1_score,
+                             balanced_accuracy_score, matthews_corrcoef)
+
+from ml_exp.repository.fold_metric_repository import FoldMetricRepository
+from ml_exp.utils.bootstrap import bootstrap_weights
+
+N_FOLDS = 13
+
+
+@pytest.fixture
+def fold_metric_repository():
+    return FoldMetricRepository()
+
+
+@pytest.fixture
+def fold_ids():
+    rng = np.random.default_rng(0)
+    return rng.permutation(np.arange(2000) % N_FOLDS).astype(np.int32)
+
+
+def per_fold_reference(metric, y_true, y_pred, fold_ids):
+    return np.array([metric(y_true[fold_ids == fold], y_pred[fold_ids == fold]) for fold in range(N_FOLDS)])
+
+
+@pytest.mark.parametrize("score_target,metric", [
+    ("mae", mean_absolute_error),
+    ("mse", mean_squared_error),
+    ("r2", r2_score),
+])
+def test_regression_metrics_match_sklearn(fold_metric_repository, fold_ids, score_target, metric):
+    rng = np.random.default_rng(1)
+    y_true = rng.normal(size=len(fold_ids))
+    y_pred = y_true + rng.normal(scale=0.5, size=len(fold_ids))
+
+    result = fold_metric_repository.compute(score_target, y_true, y_pred, fold_ids, N_FOLDS)
+
+    np.testing.assert_allclose(result, per_fold_reference(metric, y_true, y_pred, fold_ids), rtol=1e-10)
+
+
+@pytest.mark.parametrize("score_target,metric", [
+    ("accuracy", accuracy_score),
+    ("roc_auc", roc_auc_score),
+    ("precision_recall", average_precision_score),
+])
+@pytest.mark.parametrize("prediction", ["labels", "probabilities", "tied_scores"])
+def test_classification_metrics_match_sklearn(fold_metric_repository, fold_ids, score_target, metric, prediction):
+    rng = np.random.default_rng(2)
+    y_true = rng.integers(0, 2, size=len(fold_ids))
+    if prediction == "labels":
+        y_pred = np.where(rng.random(len(fold_ids)) < 0.8, y_true, 1 - y_true)
+    elif prediction == "probabilities":
+        y_pred = np.clip(0.3 * y_true + rng.random(len(fold_ids)) * 0.7, 0, 1)
+    else:
+        y_pred = rng.integers(0, 5, size=len(fold_ids)) + y_true
+    if score_target == "accuracy" and prediction == "probabilities":
+        # accuracy is not defined for continuous predictions, as in sklearn
+        with pytest.raises(ValueError, match="Predicted values need to be class labels"):
+            fold_metric_repository.compute_many([score_target], y_true, y_pred, fold_ids, N_FOLDS)
+        with pytest.raises(ValueError, match="Predicted values need to be class labels"):
+            fold_metric_repository.compute_weighted([score_target], y_true, y_pred, bootstrap_weights(seed=0, n_rows=len(y_true), replicates=np.arange(5)))
+        return
+
+    result = fold_metric_repository.compute(score_target, y_true, y_pred, fold_ids, N_FOLDS)
+
+    np.testing.assert_allclose(result, per_fold_reference(metric, y_true, y_pred, fold_ids), rtol=1e-10)
+
+
+def test_multiclass_accuracy_matches_sklearn(fold_metric_repository, fold_ids):
+    rng = np.random.default_rng(3)
+    y_true = rng.integers(0, 4, size=len(fold_ids))
+    y_pred = np.where(rng.random(len(fold_ids)) < 0.6, y_true, rng.integers(0, 4, size=len(fold_ids)))
+
+    result = fold_metric_repository.compute("accuracy", y_true, y_pred, fold_ids, N_FOLDS)
+
+    np.testing.assert_allclose(result, per_fold_reference(accuracy_score, y_true, y_pred, fold_ids))
+
+
+def specificity_score(y_true, y_pred, **kwargs):
+    return recall_score(1 - y_true, 1 - y_pred, **kwargs)
+
+
+@pytest.mark.parametrize("n_classes", [2, 4])
+def test_label_metrics_match_sklearn(fold_metric_repository, fold_ids, n_classes):
+    rng = np.random.default_rng(4)
+    y_true = rng.integers(0, n_classes, size=len(fold_ids))
+    y_pred = np.where(rng.random(len(fold_ids)) < 0.7, y_true, rng.integers(0, n_classes, size=len(fold_ids)))
+    average = "binary" if n_classes == 2 else "macro"
+    references = {
+        "accuracy": accuracy_score,
+        "precision": partial(precision_score, average=average),
+        "recall": partial(recall_score, average=average),
+        "f1": partial(f1_score, average=average),
+        "balanced_accuracy": balanced_accuracy_score,
+        "mcc": matthews_corrcoef,
+    }
+    if n_classes == 2:
+        references["specificity"] = specificity_score
+
+    result = fold_metric_repository.compute_many(list(references), y_true, y_pred, fold_ids, N_FOLDS)
+
+    for score_target, metric in references.items():
+        np.testing.assert_allclose(result[score_target], per_fold_reference(metric, y_true, y_pred, fold_ids), rtol=1e-10)
+
+
+def test_r2_with_constant_fold_follows_sklearn(fold_metric_repository):
+    y_true = np.array([1.0, 1.0, 1.0, 2.0, 2.0, 2.0, 0.0, 1.0])
+    y_pred = np.array([1.0, 1.0, 1.0, 2.0, 2.5, 2.0, 0.5, 1.0])
+    fold_ids = np.array([0, 0, 0, 1, 1, 1, 2, 2])
+
+    result = fold_metric_repository.compute("r2", y_true, y_pred, fold_ids, 3)
+
+    np.testing.assert_allclose(result, [r2_score(y_true[fold_ids == f], y_pred[fold_ids == f]) for f in range(3)])
+
+
+@pytest.mark.parametrize("score_target,metric,target", [
+    ("f1", f1_score, "label"),
+    ("mcc", matthews_corrcoef, "label"),
+    ("roc_auc", roc_auc_score, "score"),
+    ("precision_recall", average_precision_score, "score"),
+    ("r2", r2_score, "continuous"),
+    ("mae", mean_absolute_error, "continuous"),
+])
+def test_weighted_metrics_match_sklearn_on_resampled_rows(fold_metric_repository, score_target, metric, target):
+    rng = np.random.default_rng(5)
+    n_rows = 300
+    y_true = rng.integers(0, 2, size=n_rows)
+    y_pred = {
+        "label": np.where(rng.random(n_rows) < 0.8, y_true, 1 - y_true),
+        "score": np.round(rng.random(n_rows) * 0.6 + 0.3 * y_true, 2),
+    }.get(target)
+    if target == "continuous":
+        y_true = rng.normal(size=n_rows)
+        y_pred = y_true + rng.normal(scale=0.5, size=n_rows)
+    weights = bootstrap_weights(seed=0, n_rows=n_rows, replicates=np.arange(25))
+
+    result = fold_metric_repository.compute_weighted([score_target], y_true, y_pred, weights)[score_target]
+
+    resampled_rows = [np.repeat(np.arange(n_rows), replicate_weights.astype(int)) for replicate_weights in weights]
+    np.testing.assert_allclose(result, [metric(y_true[rows], y_pred[rows]) for rows in resampled_rows], rtol=1e-10)
+
+
+def test_unsupported_metric_raises(fold_metric_repository, fold_ids):
+    with pytest.raises(ValueError, match="Metric f2 not supported"):
+        fold_metric_repository.compute("f2", fold_ids, fold_ids, fold_ids, N_FOLDS)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from ml_exp.utils.fold_statistics import FoldStatisticsAccumulator, MAX_CONFUSION_LABELS
+
+
+def test_label_metrics_reject_continuous_predictions():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, size=100000)
+    fold_ids = rng.integers(0, 10, size=100000)
+    accumulator = FoldStatisticsAccumulator(["accuracy", "f1"], n_folds=10)
+
+    with pytest.raises(ValueError, match="Predicted values need to be class labels"):
+        accumulator.update(y_true, rng.uniform(size=100000), fold_ids=fold_ids)
+    with pytest.raises(ValueError, match=f"at most {MAX_CONFUSION_LABELS} distinct labels"):
+        accumulator.update(y_true, rng.integers(0, 10 * MAX_CONFUSION_LABELS, size=100000), fold_ids=fold_ids)
+    assert accumulator.labels is None
+
+    accumulator.update(y_true, y_true.astype(np.float64), fold_ids=fold_ids)
+    np.testing.assert_array_equal(accumulator.compute()["accuracy"], np.ones(10))
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from sklearn.linear_model import LogisticRegression, LinearRegression
+
+from tests.config.general_fixtures import sklearn_model_repository
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.repository.prediction_cache_repository import PredictionCacheRepository
+from ml_exp.utils.fingerprint import dataframe_fingerprint
+from ml_exp.utils.fold_assignment import StreamingFoldAssigner
+from ml_exp.utils import bootstrap
+from ml_exp.repository.fold_metric_repository import FoldMetricRepository
+from ml_exp.repository.pandas_data_file_repository import PandasDataFileRepository
+from ml_exp.service.load_test_data_service import LoadTestDataService
+
+
+@pytest.fixture
+def classification_experiment(sklearn_model_repository):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(600, 4)), columns=["a", "b", "c", "d"])
+    y = pd.DataFrame({"target": (X["a"] + rng.normal(scale=0.8, size=600) > 0).astype(int)})
+    model = LogisticRegression().fit(X, y.values.ravel())
+    experiments = {
+        "lr": {"ml_model": sklearn_model_repository.load_model_by_obj(context_name="lr", model_obj=model),
+               "test_data_name": "data"}
+    }
+    return experiments, {"data": {"x_test": X, "y_test": y}}
+
+
+@pytest.fixture
+def regression_experiment(sklearn_model_repository):
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(500, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": 2 * X["a"] - X["c"] + rng.normal(size=500)})
+    model = LinearRegression().fit(X, y.values.ravel())
+    experiments = {
+        "linear": {"ml_model": sklearn_model_repository.load_model_by_obj(context_name="linear", model_obj=model),
+                   "test_data_name": "data"}
+    }
+    return experiments, {"data": {"x_test": X, "y_test": y}}
+
+
+def test_predict_once_matches_per_fold_prediction_for_classification(classification_experiment):
+    experiments, test_data = classification_experiment
+    scores_target = ["accuracy", "roc_auc", "precision_recall"]
+
+    # per-fold inference over all folds reads the rows of each fold from the test data, without a fold-ordered copy of it
+    with patch("ml_exp.service.generate_score_service.FoldLayout") as fold_layout:
+        per_fold = GenerateScoreService(experiments, test_data, scores_target, n_splits=20, predict_once=False).get_scores_data()
+    predict_once = GenerateScoreService(experiments, test_data, scores_target, n_splits=20, predict_once=True).get_scores_data()
+
+    fold_layout.assert_not_called()
+    assert predict_once == per_fold
+    assert len(predict_once["accuracy"]["lr"]) == 20
+
+
+def test_predict_once_matches_per_fold_prediction_for_regression(regression_experiment):
+    experiments, test_data = regression_experiment
+    scores_target = ["mae", "mse", "r2"]
+
+    per_fold = GenerateScoreService(experiments, test_data, scores_target, n_splits=10, predict_once=False).get_scores_data()
+    predict_once = GenerateScoreService(experiments, test_data, scores_target, n_splits=10, predict_once=True).get_scores_data()
+
+    for score_target in scores_target:
+        np.testing.assert_allclose(predict_once[score_target]["linear"], per_fold[score_target]["linear"], rtol=1e-12)
+
+
+@pytest.fixture
+def several_contexts_experiment(classification_experiment, sklearn_model_repository):
+    experiments, test_data = classification_experiment
+    X, y = test_data["data"]["x_test"], test_data["data"]["y_test"]
+    for C in [0.001, 0.01, 0.1]:
+        name = f"lr_{C}"
+        model = LogisticRegression(C=C).fit(X[["a", "b"]].join(X[["c", "d"]] * C), y.values.ravel())
+        experiments[name] = {"ml_model": sklearn_model_repository.load_model_by_obj(context_name=name, model_obj=model),
+                             "test_data_name": "data"}
+    return experiments, test_data
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_concurrent_scoring_matches_serial_run(several_contexts_experiment, executor):
+    experiments, test_data = several_contexts_experiment
+    scores_target = ["accuracy", "roc_auc"]
+
+    serial = GenerateScoreService(experiments, test_data, scores_target, n_splits=15).get_scores_data()
+    concurrent = GenerateScoreService(experiments, test_data, scores_target, n_splits=15,
+                                      n_jobs=3, executor=executor).get_scores_data()
+
+    assert concurrent == serial
+    assert list(concurrent["accuracy"].keys()) == list(experiments.keys())
+
+
+def test_bootstrap_scores_replicates_from_a_single_inference(classification_experiment):
+    experiments, test_data = classification_experiment
+    scores_target = ["accuracy", "roc_auc"]
+    model_object = experiments["lr"]["ml_model"].model_object
+
+    with patch.object(model_object, "predict", wraps=model_object.predict) as predict:
+        scores = GenerateScoreService(experiments, test_data, scores_target, n_splits=500, resampling="bootstrap").get_scores_data()
+    assert predict.call_count == 1
+    assert len(scores["accuracy"]["lr"]) == 500
+
+    # replicates are keyed by their index, so scoring them in increments gives the same values
+    deferred = GenerateScoreService(experiments, test_data, scores_target, n_splits=500, resampling="bootstrap", defer_scoring=True)
+    deferred.score_folds(folds=list(range(200)))
+    deferred.score_folds(folds=list(range(200, 500)))
+    assert deferred.get_scores_data() == scores
+
+
+def test_invalid_executor_raises(classification_experiment):
+    experiments, test_data = classification_experiment
+    with pytest.raises(ValueError, match="executor need to be one of"):
+        GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=5, n_jobs=2, executor="gpu")
+
+
+def test_prediction_cache_skips_inference_of_unchanged_models(classification_experiment, tmp_path):
+    experiments, test_data = classification_experiment
+    cache = PredictionCacheRepository(cache_dir=tmp_path)
+    data_fingerprints = {"data": dataframe_fingerprint(test_data["data"]["x_test"], test_data["data"]["y_test"])}
+
+    first_run = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10,
+                                     prediction_cache=cache, data_fingerprints=data_fingerprints).get_scores_data()
+
+    # patched on the class, so the pickled model and its fingerprint stay the same
+    with patch.object(LogisticRegression, "predict", autospec=True, side_effect=LogisticRegression.predict) as predict:
+        second_run = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10,
+                                          prediction_cache=cache, data_fingerprints=data_fingerprints).get_scores_data()
+
+    predict.assert_not_called()
+    assert second_run == first_run
+
+
+def test_prediction_cache_is_not_used_for_a_model_refit_in_place(classification_experiment, tmp_path):
+    experiments, test_data = classification_experiment
+    cache = PredictionCacheRepository(cache_dir=tmp_path)
+    data_fingerprints = {"data": dataframe_fingerprint(test_data["data"]["x_test"], test_data["data"]["y_test"])}
+    GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10,
+                         prediction_cache=cache, data_fingerprints=data_fingerprints).get_scores_data()
+    stale_fingerprint = experiments["lr"]["ml_model"].model_fingerprint
+
+    X, y = test_data["data"]["x_test"], test_data["data"]["y_test"]
+    experiments["lr"]["ml_model"].model_object.fit(X[["b", "c", "d", "a"]].to_numpy(), (X["b"] > 0).astype(int))
+    refit_run = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10,
+                                     prediction_cache=cache, data_fingerprints=data_fingerprints).get_scores_data()
+    uncached_run = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10).get_scores_data()
+
+    assert experiments["lr"]["ml_model"].model_fingerprint != stale_fingerprint
+    assert refit_run == uncached_run
+
+    # an unchanged model is not pickled again to check its fingerprint
+    with patch("ml_exp.utils.fingerprint.object_fingerprint") as object_fingerprint:
+        GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=10,
+                             prediction_cache=cache, data_fingerprints=data_fingerprints).get_scores_data()
+    object_fingerprint.assert_not_called()
+
+
+@pytest.mark.parametrize("scores_target", [["accuracy", "roc_auc", "precision_recall", "f1", "mcc"], ["mae", "mse", "r2"]])
+def test_streaming_scores_match_in_memory_scores_with_same_folds(sklearn_model_repository, tmp_path, scores_target):
+    rng = np.random.default_rng(4)
+    X = pd.DataFrame(rng.normal(size=(1003, 3)), columns=["a", "b", "c"])
+    if scores_target[0] == "accuracy":
+        y = pd.DataFrame({"target": (X["a"] + rng.normal(size=1003) > 0).astype(int)})
+        model = LogisticRegression().fit(X, y.values.ravel())
+    else:
+        y = pd.DataFrame({"target": X["a"] - X["b"] + rng.normal(size=1003)})
+        model = LinearRegression().fit(X, y.values.ravel())
+    # X and y stored with different row groups, so the chunks of both files need to be aligned
+    X.to_parquet(tmp_path / "x.parquet", row_group_size=128)
+    y.to_parquet(tmp_path / "y.parquet", row_group_size=300)
+
+    load_test_data_service = LoadTestDataService(PandasDataFileRepository())
+    load_test_data_service.add_streaming_test_data("stream", str(tmp_path / "x.parquet"), str(tmp_path / "y.parquet"), chunk_size=200)
+    experiments = {"model": {"ml_model": sklearn_model_repository.load_model_by_obj(context_name="model", model_obj=model),
+                             "test_data_name": "stream"}}
+
+    streaming = GenerateScoreService(experiments, {}, scores_target, n_splits=8, random_state=3,
+                                     streaming_test_data_service=load_test_data_service).get_scores_data()
+
+    y_values = y.values.ravel()
+    fold_ids = StreamingFoldAssigner(n_splits=8, random_state=3, stratified=scores_target[0] == "accuracy").assign(y_values)
+    for score_target in scores_target:
+        expected = FoldMetricRepository().compute(score_target, y_values, model.predict(X), fold_ids, 8)
+        np.testing.assert_allclose(streaming[score_target]["model"], expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize("scores_target", [["accuracy", "roc_auc", "precision_recall", "f1", "mcc"], ["mae", "mse", "r2"]])
+def test_streaming_bootstrap_matches_weighted_scores_of_full_data(sklearn_model_repository, tmp_path, monkeypatch, scores_target):
+    rng = np.random.default_rng(5)
+    X = pd.DataFrame(rng.normal(size=(1003, 3)), columns=["a", "b", "c"])
+    if scores_target[0] == "accuracy":
+        y = pd.DataFrame({"target": (X["a"] + rng.normal(size=1003) > 0).astype(int)})
+        model = LogisticRegression().fit(X, y.values.ravel())
+    else:
+        y = pd.DataFrame({"target": X["a"] - X["b"] + rng.normal(size=1003)})
+        model = LinearRegression().fit(X, y.values.ravel())
+    X.to_parquet(tmp_path / "x.parquet")
+    y.to_parquet(tmp_path / "y.parquet")
+    # weight blocks smaller than the chunks, so the rows of a chunk are weighted in several blocks
+    monkeypatch.setattr(bootstrap, "BOOTSTRAP_BLOCK_CELLS", 50 * 64)
+
+    load_test_data_service = LoadTestDataService(PandasDataFileRepository())
+    load_test_data_service.add_streaming_test_data("stream", str(tmp_path / "x.parquet"), str(tmp_path / "y.parquet"), chunk_size=200)
+    experiments = {"model": {"ml_model": sklearn_model_repository.load_model_by_obj(context_name="model", model_obj=model),
+                             "test_data_name": "stream"}}
+
+    streaming = GenerateScoreService(experiments, {}, scores_target, n_splits=50, random_state=3, resampling="bootstrap",
+                                     streaming_test_data_service=load_test_data_service).get_scores_data()
+
+    weights = bootstrap.poisson_weights(seed=3, replicates=np.arange(50), row_positions=np.arange(len(y)))
+    expected = FoldMetricRepository().compute_weighted(scores_target, y.values.ravel(), model.predict(X), weights)
+    for score_target in scores_target:
+        np.testing.assert_allclose(streaming[score_target]["model"], expected[score_target], rtol=1e-9)
+
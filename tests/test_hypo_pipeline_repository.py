@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.stats import mannwhitneyu
 
 from tests.config.general_fixtures import ab_test_repository
 from ml_exp.model.hypho_test_results import (
@@ -58,6 +59,61 @@ def test_apply_mannwhitney_returns_expected_type(ab_test_repository):
     assert result.context_name_2 == "1"
 
 
+def test_apply_mannwhitney_all_pairs_matches_pairwise_scipy(ab_test_repository):
+    rng = np.random.default_rng(0)
+    values = {f"context_{i}": np.round(rng.normal(i * 0.05, 1, rng.integers(20, 40)), 1) for i in range(6)}
+    values["small_without_ties"] = rng.normal(0, 1, 6)
+    values["small_with_ties"] = np.array([0.1, 0.1, 0.2, 0.3, 0.3])
+
+    results = ab_test_repository.apply_mannwhitney_all_pairs(values=values)
+
+    names = list(values)
+    expected_pairs = [(names[i], names[j]) for i in range(len(names)) for j in range(i + 1, len(names))]
+    assert [(r.context_name_1, r.context_name_2) for r in results] == expected_pairs
+    for result in results:
+        expected = ab_test_repository.apply_mannwhitney(context=result.context,
+                                                        context_name_1=result.context_name_1,
+                                                        context_name_2=result.context_name_2,
+                                                        values=values)
+        assert isinstance(result, MannWhitneyTestResult)
+        assert result.context == f"Mann-Whitney between model1={result.context_name_1!r} and model2={result.context_name_2!r}"
+        assert result.stat == expected.stat
+        np.testing.assert_allclose(result.p_value, expected.p_value, rtol=1e-9)
+        assert result.is_significant == expected.is_significant
+
+
+def test_apply_mannwhitney_against_baseline_matches_pairwise_scipy(ab_test_repository):
+    rng = np.random.default_rng(1)
+    values = {f"context_{i}": np.round(rng.normal(i * 0.05, 1, rng.integers(20, 40)), 1) for i in range(5)}
+    values["small_without_ties"] = rng.normal(0, 1, 6)
+
+    results = ab_test_repository.apply_mannwhitney_against_baseline(values=values, baseline_context="context_2")
+
+    assert [(r.context_name_1, r.context_name_2) for r in results] == [("context_2", name) for name in values if name != "context_2"]
+    for result in results:
+        expected = ab_test_repository.apply_mannwhitney(context=result.context,
+                                                        context_name_1=result.context_name_1,
+                                                        context_name_2=result.context_name_2,
+                                                        values=values)
+        assert result.stat == expected.stat
+        np.testing.assert_allclose(result.p_value, expected.p_value, rtol=1e-9)
+        assert result.is_significant == expected.is_significant
+
+
+def test_mannwhitney_of_unbalanced_pairs_matches_scipy(ab_test_repository):
+    rng = np.random.default_rng(2)
+    # contexts eliminated early keep few folds, without ties against the others
+    values = {"few_folds": rng.normal(0.3, 1, 5), "all_folds": rng.normal(0, 1, 40), "some_folds": rng.normal(0, 1, 12)}
+
+    all_pairs = ab_test_repository.apply_mannwhitney_all_pairs(values=values)
+    against_baseline = ab_test_repository.apply_mannwhitney_against_baseline(values=values, baseline_context="all_folds")
+
+    for result in all_pairs + against_baseline:
+        expected = mannwhitneyu(values[result.context_name_1], values[result.context_name_2])
+        assert result.stat == expected.statistic
+        np.testing.assert_allclose(result.p_value, expected.pvalue, rtol=1e-9)
+
+
 def test_apply_t_student_returns_expected_type(ab_test_repository):
     values = {
         "0": np.random.normal(0, 1, 30),
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# cumulative import time allowed for the package itself, which only imports the experiment classes on access
+PACKAGE_IMPORT_BUDGET_SECONDS = 0.5
+BACKEND_MODULES = ["onnxruntime", "mlflow", "statsmodels", "jinja2"]
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    return subprocess.run([sys.executable, *options, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+
+def test_package_import_is_within_budget():
+    result = run_python("import ml_exp", "-X", "importtime")
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    cumulative_us = [int(line.split("|")[1]) for line in result.stderr.splitlines()
+                     if line.startswith("import time:") and line.split("|")[2].strip() == "ml_exp"]
+    assert len(cumulative_us) == 1
+    assert cumulative_us[0] / 1e6 < PACKAGE_IMPORT_BUDGET_SECONDS
+
+
+@pytest.mark.parametrize("code", ["import ml_exp", "from ml_exp.controller.console import main", "from ml_exp import MLExp"])
+def test_backends_are_not_imported_before_use(code):
+    result = run_python(f"{code}\nimport sys\nprint(','.join(m for m in {BACKEND_MODULES!r} if m in sys.modules))")
+    assert result.stdout.strip() == ""
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from ml_exp.repository.pandas_data_file_repository import PandasDataFileRepository
+from ml_exp.service.load_test_data_service import LoadTestDataService
+from ml_exp.service.fold_assignment_service import FoldAssignmentService
+
+
+def test_duplicated_test_data_share_frames_and_folds(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": rng.integers(0, 2, 300)})
+    X.to_csv(tmp_path / "x.csv", index=False)
+    y.to_csv(tmp_path / "y.csv", index=False)
+
+    # pyarrow reads the floats exactly as written, so the frames read equal the in-memory ones
+    repository = PandasDataFileRepository(engine="pyarrow")
+    reads = []
+    read = repository.read
+    repository.read = lambda file_path: reads.append(file_path) or read(file_path)
+    load_test_data_service = LoadTestDataService(repository)
+    load_test_data_service.add_test_data("champion", str(tmp_path / "x.csv"), str(tmp_path / "y.csv"))
+    load_test_data_service.add_test_data("challenger", str(tmp_path / "x.csv"), str(tmp_path / "y.csv"))
+    load_test_data_service.add_test_data("copy", X.copy(), y.copy())
+    load_test_data_service.add_test_data("other", X.assign(a=X["a"] + 1), y)
+    test_data = load_test_data_service.get_all_test_data()
+
+    # each file is read once and the equal in-memory copy reuses the frames read from them
+    assert len(reads) == 2
+    assert test_data["challenger"]["x_test"] is test_data["champion"]["x_test"]
+    assert test_data["copy"]["x_test"] is test_data["champion"]["x_test"]
+    assert test_data["copy"]["y_test"] is test_data["champion"]["y_test"]
+    assert test_data["other"]["x_test"] is not test_data["champion"]["x_test"]
+    assert test_data["other"]["y_test"] is test_data["champion"]["y_test"]
+    assert load_test_data_service.get_fingerprint("copy") == load_test_data_service.get_fingerprint("champion")
+
+    fold_assignment_service = FoldAssignmentService(n_splits=5)
+    fold_ids = {name: fold_assignment_service.get_fold_ids(name, data["x_test"], data["y_test"]) for name, data in test_data.items()}
+    assert fold_ids["challenger"] is fold_ids["champion"] and fold_ids["copy"] is fold_ids["champion"]
+    assert fold_ids["other"] is not fold_ids["champion"]
+
+    for name in ["champion", "challenger", "copy"]:
+        load_test_data_service.remove_test_data(name)
+    assert list(load_test_data_service.frames_by_file.values()) == [test_data["other"]["y_test"]]
+
+
+def test_array_test_data_is_stored_without_copy():
+    X = np.random.default_rng(0).normal(size=(100, 4))
+    y = np.arange(100)
+    load_test_data_service = LoadTestDataService(PandasDataFileRepository())
+    load_test_data_service.add_test_data("arrays", X, y)
+
+    test_data = load_test_data_service.get_test_data("arrays")
+    assert np.shares_memory(test_data["x_test"].to_numpy(), X)
+    assert test_data["y_test"].shape == (100, 1)
+    assert np.shares_memory(test_data["y_test"].to_numpy(), y)
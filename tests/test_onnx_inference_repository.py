@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+import onnxruntime as ort
+from sklearn.linear_model import LinearRegression
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+from ml_exp.repository.onnx_inference_repository import OnnxInferenceRepository
+
+
+def build_session(batch_dim):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(50, 3)), rng.normal(size=50)
+    onnx_model = convert_sklearn(LinearRegression().fit(X, y),
+                                 initial_types=[("float_input", FloatTensorType([batch_dim, 3]))])
+    return ort.InferenceSession(onnx_model.SerializeToString())
+
+
+def predict_row_by_row(session, X):
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    return np.array([session.run([output_name], {input_name: X[i:i+1].astype(np.float32)})[0][0]
+                     for i in range(len(X))])
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64, 1024])
+def test_predict_matches_row_by_row_inference(batch_size):
+    session = build_session(batch_dim=None)
+    X = pd.DataFrame(np.random.default_rng(1).normal(size=(103, 3)))
+
+    result = OnnxInferenceRepository(batch_size=batch_size).predict(session, X)
+
+    np.testing.assert_allclose(result, predict_row_by_row(session, X.to_numpy()), rtol=1e-5, atol=1e-6)
+
+
+def test_predict_pads_models_with_fixed_batch_dimension():
+    session = build_session(batch_dim=8)
+    X = np.random.default_rng(2).normal(size=(21, 3))
+    repository = OnnxInferenceRepository(batch_size=100)
+
+    result = repository.predict(session, X)
+
+    assert repository.get_session_metadata(session)["fixed_batch_size"] == 8
+    assert len(result) == 21
+    np.testing.assert_allclose(result, predict_row_by_row(build_session(batch_dim=None), X), rtol=1e-5, atol=1e-6)
+
+
+def test_session_metadata_is_cached():
+    session = build_session(batch_dim=None)
+    repository = OnnxInferenceRepository()
+
+    assert repository.get_session_metadata(session) is repository.get_session_metadata(session)
+
+
+def test_invalid_batch_size_raises():
+    with pytest.raises(ValueError, match="batch_size need to be a positive integer"):
+        OnnxInferenceRepository(batch_size=0)
@@ -1,10 +1,12 @@
 import pytest
 import pandas as pd
+import os
 import warnings
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from tests.config.general_fixtures import pandas_data_file_repository
+from ml_exp.repository.pandas_data_file_repository import PandasDataFileRepository
 
 def test_remove_suffix(pandas_data_file_repository):
     assert pandas_data_file_repository.remove_suffix("file.csv", ".csv") == "file"
@@ -80,4 +82,87 @@ def test_read_unsupported_tar_raises(pandas_data_file_repository):
         path.write_text("dummy")
 
         with pytest.raises(ValueError, match="tar compression is not supported directly"):
-            pandas_data_file_repository.read(path)
\ No newline at end of file
+            pandas_data_file_repository.read(path)
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".jsonl"])
+def test_read_chunks_returns_all_rows_in_order(pandas_data_file_repository, extension):
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / f"file{extension}"
+        df_original = pd.DataFrame({"a": range(25), "b": [x * 0.5 for x in range(25)]})
+        if extension == ".csv":
+            df_original.to_csv(path, index=False)
+        elif extension == ".parquet":
+            df_original.to_parquet(path)
+        else:
+            df_original.to_json(path, orient="records", lines=True)
+
+        chunks = list(pandas_data_file_repository.read_chunks(path, chunk_size=10))
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df_original)
+
+
+def test_read_chunks_unsupported_format_raises(pandas_data_file_repository):
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "file.xlsx"
+        path.write_text("dummy")
+
+        with pytest.raises(ValueError, match="can not be read in chunks"):
+            next(pandas_data_file_repository.read_chunks(path))
+
+
+def test_read_csv_with_pyarrow_caches_downcast_copy(tmp_path):
+    path = tmp_path / "file.csv"
+    df_original = pd.DataFrame({"a": [0.1, 0.2, 0.3], "b": [1, 2, 300], "c": [1.0, 0.5, 2.0], "d": ["x", "y", "z"]})
+    df_original.to_csv(path, index=False)
+    cache_dir = tmp_path / "cache"
+    repository = PandasDataFileRepository(engine="pyarrow", downcast=True, cache_dir=cache_dir)
+
+    df_loaded = repository.read(path)
+    assert list(df_loaded.dtypes.astype(str)[:3]) == ["float64", "int16", "float32"]
+    pd.testing.assert_frame_equal(df_loaded, df_original, check_dtype=False)
+    cached_files = list(cache_dir.glob("*.feather"))
+    assert len(cached_files) == 1
+    pd.testing.assert_frame_equal(repository.read(path), df_loaded)
+
+    # a changed file gets a new entry, replacing the stale one
+    df_original.assign(b=[4, 5, 6]).to_csv(path, index=False)
+    os.utime(path, ns=(0, 0))
+    assert repository.read(path)["b"].tolist() == [4, 5, 6]
+    assert [file.name for file in cache_dir.glob("*.feather")] != [file.name for file in cached_files]
+    assert len(list(cache_dir.glob("*.feather"))) == 1
+
+
+def test_read_cache_is_kept_apart_by_engine(tmp_path):
+    path = tmp_path / "file.csv"
+    path.write_text("a,b\n1,2024-01-01\n2,2024-01-02\n")
+    cache_dir = tmp_path / "cache"
+    c_repository = PandasDataFileRepository(engine="c", cache_dir=cache_dir)
+    pyarrow_repository = PandasDataFileRepository(engine="pyarrow", cache_dir=cache_dir)
+
+    from_pyarrow = pyarrow_repository.read(path)
+    from_c = c_repository.read(path)
+
+    # pyarrow parses the dates, the c parser keeps them as text
+    assert from_pyarrow["b"].dtype != from_c["b"].dtype
+    assert len(list(cache_dir.glob("*.feather"))) == 2
+    pd.testing.assert_frame_equal(pyarrow_repository.read(path), from_pyarrow)
+    pd.testing.assert_frame_equal(c_repository.read(path), from_c)
+
+
+def test_add_test_data_many_reads_every_file_before_raising(tmp_path):
+    from ml_exp.service.load_test_data_service import LoadTestDataService
+
+    load_test_data_service = LoadTestDataService(PandasDataFileRepository())
+    test_data = {}
+    for i in range(4):
+        pd.DataFrame({"a": range(i + 2)}).to_csv(tmp_path / f"x_{i}.csv", index=False)
+        pd.DataFrame({"y": range(i + 2)}).to_csv(tmp_path / f"y_{i}.csv", index=False)
+        test_data[f"data_{i}"] = (str(tmp_path / f"x_{i}.csv"), str(tmp_path / f"y_{i}.csv"))
+    test_data["broken"] = (str(tmp_path / "missing.csv"), str(tmp_path / "y_0.csv"))
+
+    with pytest.raises(ValueError, match="1 of 5 test data could not be added. 'broken'"):
+        load_test_data_service.add_test_data_many(test_data, max_workers=3)
+    loaded = load_test_data_service.get_all_test_data()
+    assert list(loaded) == [f"data_{i}" for i in range(4)]
+    assert [len(data["x_test"]) for data in loaded.values()] == [2, 3, 4, 5]
@@ -0,0 +1,51 @@
+import os
+import numpy as np
+import pytest
+
+from ml_exp.repository.prediction_cache_repository import PredictionCacheRepository
+
+
+@pytest.fixture
+def prediction_cache_repository(tmp_path):
+    return PredictionCacheRepository(cache_dir=tmp_path / "cache")
+
+
+def test_put_and_get_roundtrip(prediction_cache_repository):
+    predictions = np.array([0, 1, 1, 0], dtype=np.int64)
+
+    assert prediction_cache_repository.get("model", "data") is None
+    assert prediction_cache_repository.put("model", "data", predictions) is True
+    np.testing.assert_array_equal(prediction_cache_repository.get("model", "data"), predictions)
+
+
+def test_object_predictions_are_not_cached(prediction_cache_repository):
+    assert prediction_cache_repository.put("model", "data", np.array(["a", None], dtype=object)) is False
+    assert prediction_cache_repository.get("model", "data") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    repository = PredictionCacheRepository(cache_dir=tmp_path, max_bytes=2500)
+    predictions = np.zeros(100)  # 800 bytes plus the .npy header
+    for i, model in enumerate(["m1", "m2"]):
+        repository.put(model, "data", predictions)
+        os.utime(repository._entry_path(model, "data"), ns=(i, i))
+
+    repository.get("m1", "data")  # m1 becomes the most recently used
+    repository.put("m3", "data", predictions)
+
+    assert repository.get("m2", "data") is None
+    assert repository.get("m1", "data") is not None
+    assert repository.get("m3", "data") is not None
+    assert repository.size() <= 2500
+
+
+def test_invalidate_by_model_data_and_all(prediction_cache_repository):
+    for model in ["m1", "m2"]:
+        for data in ["d1", "d2"]:
+            prediction_cache_repository.put(model, data, np.arange(3))
+
+    assert prediction_cache_repository.invalidate(model_fingerprint="m1") == 2
+    assert prediction_cache_repository.invalidate(data_fingerprint="d2") == 1
+    assert prediction_cache_repository.get("m2", "d1") is not None
+    assert prediction_cache_repository.clear() == 1
+    assert prediction_cache_repository.size() == 0
@@ -0,0 +1,81 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from ml_exp.service.prepare_context_service import PrepareContextService
+from ml_exp.service.generate_score_service import GenerateScoreService
+
+
+@pytest.fixture
+def pickled_classifiers(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": (X["a"] + rng.normal(scale=0.8, size=400) > 0).astype(int)})
+    model_paths = []
+    for i, C in enumerate([0.01, 0.1, 1.0, 10.0]):
+        model_path = tmp_path / f"model_{i}.pkl"
+        with open(model_path, "wb") as fp:
+            pickle.dump(LogisticRegression(C=C).fit(X, y.values.ravel()), fp)
+        model_paths.append(str(model_path))
+    return model_paths, {"data": {"x_test": X, "y_test": y}}
+
+
+def build_contexts(model_paths, scores_target, **kwargs):
+    prepare_context_service = PrepareContextService(scores_target=scores_target, **kwargs)
+    for i, model_path in enumerate(model_paths):
+        prepare_context_service.add_context(context_name=f"model_{i}", model_trained=model_path, ref_data_test="data")
+    return prepare_context_service
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_lazy_models_match_eager_scores_and_respect_residency(pickled_classifiers, n_jobs):
+    model_paths, test_data = pickled_classifiers
+    eager = build_contexts(model_paths, ["accuracy"])
+    lazy = build_contexts(model_paths, ["accuracy"], lazy_loading=True, max_resident_models=1)
+    assert all(context["ml_model"].model_object is None for context in lazy.get_contexts().values())
+
+    peak_resident = []
+    acquire = lazy.acquire
+    def tracked_acquire(context_name):
+        ml_model = acquire(context_name)
+        peak_resident.append(len(lazy.resident_models))
+        return ml_model
+    lazy.acquire = tracked_acquire
+
+    expected = GenerateScoreService(eager.get_contexts(), test_data, ["accuracy"], n_splits=10).get_scores_data()
+    result = GenerateScoreService(lazy.get_contexts(), test_data, ["accuracy"], n_splits=10,
+                                  n_jobs=n_jobs, prepare_context_service=lazy).get_scores_data()
+
+    assert result == expected
+    assert max(peak_resident) <= n_jobs
+    assert len(lazy.resident_models) == 1
+    assert not lazy.pinned_models
+    assert sum(context["ml_model"].model_object is not None for context in lazy.get_contexts().values()) == 1
+
+
+def test_lazy_model_is_validated_when_loaded(pickled_classifiers):
+    model_paths, _ = pickled_classifiers
+    lazy = build_contexts(model_paths[:1], ["mae"], lazy_loading=True)
+
+    with pytest.raises(ValueError, match="scores_target must be valid"):
+        lazy.acquire("model_0")
+    assert lazy.get_contexts()["model_0"]["ml_model"].model_object is None
+    assert not lazy.resident_models
+
+
+def test_add_contexts_many_loads_concurrently_and_raises_failures_at_the_end(pickled_classifiers, tmp_path):
+    model_paths, _ = pickled_classifiers
+    prepare_context_service = PrepareContextService(scores_target=["accuracy"])
+    contexts = {f"model_{i}": (model_path, "data") for i, model_path in enumerate(model_paths)}
+    contexts["missing"] = (str(tmp_path / "missing.pkl"), "data")
+
+    with pytest.raises(ValueError, match="1 of 5 contexts could not be added. 'missing': FileNotFoundError"):
+        prepare_context_service.add_contexts_many(contexts, max_workers=2)
+    assert list(prepare_context_service.get_contexts()) == [f"model_{i}" for i in range(len(model_paths))]
+
+    timings = prepare_context_service.add_contexts_many({"copy": (model_paths[0], "data")})
+    assert list(timings) == ["copy"] and timings["copy"] >= 0
+    with pytest.raises(ValueError, match="already exists"):
+        prepare_context_service.add_contexts_many({"copy": (model_paths[0], "data")})
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from tests.config.general_fixtures import sklearn_model_repository
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.service.racing_experiment_service import RacingExperimentService
+
+
+@pytest.fixture
+def candidate_pool(sklearn_model_repository):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(3000, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": (X["a"] + rng.normal(scale=0.5, size=3000) > 0).astype(int)})
+    models = {f"good_{C}": LogisticRegression(C=C).fit(X, y.values.ravel()) for C in [0.1, 1.0]}
+    X_without_signal = X.assign(a=0)
+    models.update({f"weak_{i}": LogisticRegression(C=C).fit(X_without_signal, y.values.ravel())
+                   for i, C in enumerate([0.001, 0.01, 0.1, 1.0])})
+    experiments = {name: {"ml_model": sklearn_model_repository.load_model_by_obj(context_name=name, model_obj=model),
+                          "test_data_name": "data"}
+                   for name, model in models.items()}
+    return experiments, {"data": {"x_test": X, "y_test": y}}
+
+
+def test_race_drops_losing_contexts_early(candidate_pool):
+    experiments, test_data = candidate_pool
+    full = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=30).get_scores_data()
+    generate_score_service = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=30, defer_scoring=True)
+    racing_experiment = RacingExperimentService(generate_score_service, n_splits=30, min_folds=5)
+
+    scores = racing_experiment.run()["accuracy"]
+
+    assert set(racing_experiment.eliminated_contexts) == {f"weak_{i}" for i in range(4)}
+    for context_name, values in scores.items():
+        n_folds = racing_experiment.eliminated_contexts.get(context_name, 30)
+        assert n_folds < 30 or context_name.startswith("good")
+        np.testing.assert_allclose(values, full["accuracy"][context_name][:n_folds])
+
+
+def test_equivalent_contexts_are_not_eliminated(candidate_pool):
+    experiments, test_data = candidate_pool
+    racing_experiment = RacingExperimentService(GenerateScoreService(experiments, test_data, ["mae"], n_splits=10, defer_scoring=True),
+                                                n_splits=10)
+    score_matrix = np.random.default_rng(1).normal(size=(20, 5))
+
+    assert not racing_experiment.find_eliminated(score_matrix).any()
+    score_matrix[:, 2] += 3
+    eliminated = racing_experiment.find_eliminated(score_matrix)
+    assert eliminated[2] and not eliminated.all()
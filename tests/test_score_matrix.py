@@ -0,0 +1,32 @@
+import statistics
+import numpy as np
+import pytest
+
+from ml_exp.utils.score_matrix import to_score_matrix, describe_score_matrix
+
+
+def test_describe_score_matrix_matches_statistics_module():
+    rng = np.random.default_rng(0)
+    scores_data = {f"context_{i}": np.round(rng.random(rng.integers(2, 40)), 2).tolist() for i in range(50)}
+    scores_data["tied_mode"] = [3.0, 1.0, 1.0, 3.0, 2.0]
+
+    context_names, score_matrix, lengths = to_score_matrix(scores_data)
+    described = describe_score_matrix(score_matrix)
+
+    assert context_names == list(scores_data)
+    assert lengths.tolist() == [len(scores) for scores in scores_data.values()]
+    references = {"mean": statistics.mean, "std": statistics.stdev, "median": statistics.median,
+                  "minimum": min, "maximum": max, "mode": statistics.mode}
+    for statistic, reference in references.items():
+        expected = [reference(scores) for scores in scores_data.values()]
+        np.testing.assert_allclose(described[statistic], expected, rtol=1e-12)
+
+
+def test_describe_score_matrix_ignores_undefined_values():
+    _, score_matrix, _ = to_score_matrix({"with_nan": [0.5, np.nan, 0.7, 0.7], "single": [0.2]})
+
+    described = describe_score_matrix(score_matrix)
+
+    assert described["mean"][0] == pytest.approx(1.9 / 3)
+    assert described["mode"].tolist() == [0.7, 0.2]
+    assert np.isnan(described["std"][1])
@@ -0,0 +1,44 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from tests.config.general_fixtures import sklearn_model_repository
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.service.scoring_worker_pool import ScoringWorkerPool
+
+
+@pytest.fixture
+def experiment(sklearn_model_repository):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": (X["a"] + rng.normal(scale=0.8, size=500) > 0).astype(int)})
+    experiments = {}
+    for C in [0.01, 0.1, 1.0]:
+        model = LogisticRegression(C=C).fit(X, y.values.ravel())
+        experiments[f"lr_{C}"] = {"ml_model": sklearn_model_repository.load_model_by_obj(context_name=f"lr_{C}", model_obj=model),
+                                  "test_data_name": "data"}
+    return experiments, {"data": {"x_test": X, "y_test": y}}
+
+
+def test_worker_pool_is_reused_across_runs_with_cached_models(experiment):
+    experiments, test_data = experiment
+    serial = GenerateScoreService(experiments, test_data, ["accuracy", "roc_auc"], n_splits=10).get_scores_data()
+
+    with ScoringWorkerPool(max_workers=1) as pool:
+        first_run = GenerateScoreService(experiments, test_data, ["accuracy", "roc_auc"], n_splits=10,
+                                         n_jobs=2, executor=pool).get_scores_data()
+        spilled = os.listdir(pool.spill_dir)
+        assert len(spilled) == len(experiments)
+
+        # the single worker keeps the models, so their artifacts are no longer needed
+        for file_name in spilled:
+            os.remove(os.path.join(pool.spill_dir, file_name))
+        second_run = GenerateScoreService(experiments, test_data, ["accuracy", "roc_auc"], n_splits=10,
+                                          n_jobs=2, executor=pool).get_scores_data()
+        spill_dir = pool.spill_dir
+
+    assert first_run == serial
+    assert second_run == serial
+    assert not os.path.exists(spill_dir)
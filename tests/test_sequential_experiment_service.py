@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.dummy import DummyClassifier
+
+from tests.config.general_fixtures import sklearn_model_repository
+from ml_exp.service.generate_score_service import GenerateScoreService
+from ml_exp.service.sequential_experiment_service import SequentialExperimentService
+
+
+@pytest.fixture
+def clear_win_experiment(sklearn_model_repository):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(4000, 3)), columns=["a", "b", "c"])
+    y = pd.DataFrame({"target": (X["a"] + rng.normal(scale=0.5, size=4000) > 0).astype(int)})
+    models = {
+        "good": LogisticRegression().fit(X, y.values.ravel()),
+        "weak": LogisticRegression().fit(X[["b", "c"]].assign(a=0)[["a", "b", "c"]], y.values.ravel()),
+        "dummy": DummyClassifier(strategy="most_frequent").fit(X, y.values.ravel()),
+    }
+    experiments = {name: {"ml_model": sklearn_model_repository.load_model_by_obj(context_name=name, model_obj=model),
+                          "test_data_name": "data"}
+                   for name, model in models.items()}
+    return experiments, {"data": {"x_test": X, "y_test": y}}
+
+
+def test_incremental_folds_match_the_full_run(clear_win_experiment):
+    experiments, test_data = clear_win_experiment
+    full = GenerateScoreService(experiments, test_data, ["accuracy", "f1"], n_splits=40).get_scores_data()
+
+    incremental = GenerateScoreService(experiments, test_data, ["accuracy", "f1"], n_splits=40, defer_scoring=True)
+    incremental.score_folds(folds=list(range(0, 15)))
+    incremental.score_folds(folds=list(range(15, 40)))
+
+    for score_target in full:
+        for context_name in full[score_target]:
+            np.testing.assert_allclose(incremental.get_scores_data()[score_target][context_name], full[score_target][context_name])
+
+
+def test_obrien_fleming_spending_is_increasing_and_spends_alpha():
+    fractions = np.linspace(0.1, 1, 10)
+    spent = [SequentialExperimentService.obrien_fleming_spending(0.05, fraction) for fraction in fractions]
+
+    assert all(np.diff(spent) > 0)
+    assert spent[0] < 1e-4
+    assert spent[-1] == pytest.approx(0.05)
+
+
+def test_clear_win_stops_before_all_folds(clear_win_experiment):
+    experiments, test_data = clear_win_experiment
+    generate_score_service = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=100, defer_scoring=True)
+    sequential_experiment = SequentialExperimentService(generate_score_service, n_splits=100,
+                                                        folds_per_check=10, min_folds=20, patience=2)
+
+    scores = sequential_experiment.run()
+
+    assert sequential_experiment.stopped_early
+    assert sequential_experiment.n_folds_scored < 100
+    assert all(len(values) == sequential_experiment.n_folds_scored for values in scores["accuracy"].values())
+    assert sequential_experiment.check_decision(sequential_experiment.alpha_level)[0][1] == "good"
+    # the final decision uses the alpha spent up to the stop, more than the last increment and at most alpha
+    assert sequential_experiment.alpha_level < sequential_experiment.decision_alpha < 0.05
+    assert sequential_experiment.decision_alpha == pytest.approx(
+        SequentialExperimentService.obrien_fleming_spending(0.05, sequential_experiment.n_folds_scored / 100))
+
+
+def test_null_result_scores_every_fold(clear_win_experiment, sklearn_model_repository):
+    experiments, test_data = clear_win_experiment
+    X, y = test_data["data"]["x_test"], test_data["data"]["y_test"].values.ravel()
+    # near-identical models, the stable decision of every check is the lack of significance
+    experiments = {name: {"ml_model": sklearn_model_repository.load_model_by_obj(context_name=name, model_obj=LogisticRegression(C=C).fit(X, y)),
+                          "test_data_name": "data"}
+                   for name, C in [("lr", 1.0), ("lr_twin", 0.99)]}
+    generate_score_service = GenerateScoreService(experiments, test_data, ["accuracy"], n_splits=100, defer_scoring=True)
+    sequential_experiment = SequentialExperimentService(generate_score_service, n_splits=100,
+                                                        folds_per_check=10, min_folds=20, patience=2)
+
+    scores = sequential_experiment.run()
+
+    assert not sequential_experiment.stopped_early
+    assert sequential_experiment.n_folds_scored == 100
+    assert all(len(values) == 100 for values in scores["accuracy"].values())
+    assert sequential_experiment.check_decision(sequential_experiment.alpha_level) == (("accuracy", None, False),)
+    assert sequential_experiment.decision_alpha == 0.05
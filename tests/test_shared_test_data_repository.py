@@ -0,0 +1,54 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_exp.repository.shared_test_data_repository import SharedTestDataRepository
+
+
+@pytest.fixture
+def shared_test_data_repo(tmp_path):
+    repo = SharedTestDataRepository(base_dir=str(tmp_path))
+    yield repo
+    repo.close()
+
+
+def test_shared_frame_unpickles_as_read_only_view(shared_test_data_repo):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"a": rng.normal(size=100), "b": rng.integers(0, 5, size=100), "c": rng.normal(size=100)},
+                         index=np.arange(100, 200))
+    handle = shared_test_data_repo.share_frame(frame)
+
+    attached = pickle.loads(pickle.dumps(handle))
+    pd.testing.assert_frame_equal(attached, frame)
+    assert not attached["a"].to_numpy().flags.writeable
+    # one block per dtype, written once however many contexts share the frame
+    assert shared_test_data_repo.share_frame(frame) is handle
+    assert len(os.listdir(shared_test_data_repo.shared_dir)) == 2
+    assert len(pickle.dumps(handle)) < frame.memory_usage().sum()
+
+    fold_ids = rng.integers(0, 10, size=100).astype(np.int32)
+    attached_fold_ids = pickle.loads(pickle.dumps(shared_test_data_repo.share_array(fold_ids)))
+    np.testing.assert_array_equal(attached_fold_ids, fold_ids)
+
+
+@pytest.mark.parametrize("columns", [["a", "b", "a"], ["a", "a", "a"]])
+def test_shared_frame_keeps_repeated_column_names(shared_test_data_repo, columns):
+    rng = np.random.default_rng(1)
+    frame = pd.concat([pd.DataFrame({"x": rng.normal(size=50)}), pd.DataFrame({"y": rng.integers(0, 5, size=50)}),
+                       pd.DataFrame({"z": rng.normal(size=50)})], axis=1)
+    frame.columns = columns
+
+    attached = pickle.loads(pickle.dumps(shared_test_data_repo.share_frame(frame)))
+
+    pd.testing.assert_frame_equal(attached, frame)
+
+
+def test_non_numeric_frame_is_not_shared(shared_test_data_repo):
+    frame = pd.DataFrame({"a": [1.0, 2.0], "b": ["x", "y"]})
+    assert shared_test_data_repo.share_frame(frame) is frame
+
+    shared_dir = shared_test_data_repo.shared_dir
+    shared_test_data_repo.close()
+    assert not os.path.exists(shared_dir)